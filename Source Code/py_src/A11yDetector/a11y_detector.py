@@ -1,20 +1,30 @@
 import asyncio
 import base64
 import binascii
+import fcntl
 import inspect
 import json
 import os
 import re
 import textwrap
-from openai import OpenAI
+import time
+from openai import AsyncOpenAI, OpenAI
 from dotenv import dotenv_values
-from consts import JSON_FORMAT
-from A11yDetector.helper import chunk_data, aggregate_responses, check_url_status
+from consts import CONTRAST_JSON_FORMAT, JSON_FORMAT, REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE
+from A11yDetector.helper import chunk_data, aggregate_responses, check_url_status, estimate_request_tokens
+from A11yDetector.contrast import CONTRAST_LEVELS, contrast_violations, css_color, estimated_contrast_violations, \
+    large_text, measure_contrast
+from metrics import count_llm_chunks, record_llm_request
+from A11yDetector.rate_limiter import RateBudget, llm_slot, llm_slot_async, set_rate_budget, \
+    wait_for_rate_budget, wait_for_rate_budget_async
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 env_path = os.path.join(script_dir, '.env')
 config = dotenv_values(env_path)
 client = OpenAI(api_key=config["OPENAI_API_KEY"])
+# Created at import, before the executor starts its processes, so the whole run shares one budget
+set_rate_budget(RateBudget(int(config.get("OPENAI_REQUESTS_PER_MINUTE", REQUESTS_PER_MINUTE)),
+                           int(config.get("OPENAI_TOKENS_PER_MINUTE", TOKENS_PER_MINUTE))))
 sys_message = ("You are an Accessibility Expert (WCAG Specialist) responsible for detecting WCAG 2.2 violations on "
                "websites.Your expertise is crucial in making the web more accessible for everyone. Please analyze the "
                "provided, related HTML and CSS elements for compliance with the"
@@ -45,16 +55,90 @@ sys_message = ("You are an Accessibility Expert (WCAG Specialist) responsible fo
                )
 
 
+# Test rules of the lang attribute criteria, in the order they are given to the model
+LANG_RULES = {
+    "3.1.1": (
+        "The HTML page should have a lang attribute. If you see the message 'Could not find the lang attribute on "
+        "this page', it's a violation.",
+        "The lang attribute must have a valid language tag. For example, if the value of the lang attribute is "
+        "'#1', it is not valid.",
+        "The lang and xml:lang attributes, if both present, should have matching values. You can ignore this case "
+        "if xml:lang is not present.",
+        "The language subtag in the lang attribute should match the default language.",
+    ),
+    "3.1.2": (
+        "The language specified by the lang and xml:lang attributes for any element must accurately reflect the "
+        "language of the content within that element. Determine the language of the text in the HTML snippet without "
+        "considering the lang and xml:lang attributes, then compare your identification with the declared language.",
+        "For portions of content in a different language from the default, use the lang attribute to specify the "
+        "language. Ensure that the text direction is appropriate for the specified language.",
+    ),
+}
+# When each images of text criterion lets an image contain visible text
+IMAGES_OF_TEXT_EXCEPTIONS = {
+    "1.4.5": ("1. The image is purely decorative.\n"
+              "2. The text is not a significant part of the image.\n"
+              "3. The presentation of the text is essential.\n"),
+    "1.4.9": ("1. The image is purely decorative.\n"
+              "2. The presentation of the text is essential.\n"),
+}
+
+
 def send_request_to_model(model_name: str, system_message: str, user_message):
     """ Send a request to the OpenAI model with the specified messages. """
-    completion = client.chat.completions.create(model=model_name,
-                                                response_format=JSON_FORMAT,
-                                                messages=[{"role": "system", "content": system_message},
-                                                          {"role": "user", "content": user_message}],
-                                                temperature=0.0, )
+    count_llm_chunks(1)
+    wait_for_rate_budget(estimate_request_tokens(system_message, user_message))
+    with llm_slot():
+        start_time = time.time()
+        completion = client.chat.completions.create(model=model_name,
+                                                    response_format=JSON_FORMAT,
+                                                    messages=[{"role": "system", "content": system_message},
+                                                              {"role": "user", "content": user_message}],
+                                                    temperature=0.0, )
+        record_llm_request(time.time() - start_time, completion.usage)
+    return completion
+
+
+async def send_request_to_model_async(async_client: AsyncOpenAI, model_name: str, system_message: str,
+                                      user_message, response_format: dict = JSON_FORMAT):
+    """ Send a request to the OpenAI model without blocking the other requests of the event loop. """
+    await wait_for_rate_budget_async(estimate_request_tokens(system_message, user_message))
+    async with llm_slot_async():
+        start_time = time.time()
+        completion = await async_client.chat.completions.create(model=model_name,
+                                                                response_format=response_format,
+                                                                messages=[{"role": "system",
+                                                                           "content": system_message},
+                                                                          {"role": "user", "content": user_message}],
+                                                                temperature=0.0, )
+        record_llm_request(time.time() - start_time, completion.usage)
     return completion
 
 
+def send_requests_to_model(model_name: str, system_message: str, user_messages: list,
+                           response_format: dict = JSON_FORMAT) -> list:
+    """
+    Send one request per user message concurrently and return the response contents in the order of the
+    messages. Raises an exception if any request fails, once all of them are over: an aggregate of the other
+    chunks could report no violation for elements the model never saw.
+    """
+    async def send_all():
+        async with AsyncOpenAI(api_key=config["OPENAI_API_KEY"]) as async_client:
+            return await asyncio.gather(*(send_request_to_model_async(async_client, model_name, system_message,
+                                                                      user_message, response_format)
+                                          for user_message in user_messages), return_exceptions=True)
+
+    if not user_messages:
+        return []
+    count_llm_chunks(len(user_messages))
+    method_name = inspect.currentframe().f_back.f_code.co_name
+    completions = asyncio.run(send_all())
+    errors = [completion for completion in completions if isinstance(completion, Exception)]
+    if errors:
+        raise Exception(f"{len(errors)} of {len(completions)} requests failed in {method_name}: {errors[0]}")
+    return [completion.choices[0].message.content for completion in completions]
+
+
 def detect_title_violation(page_title_dict: dict):
     """
     Determine if a webpage's title violates WCAG Success Criterion 2.4.2.
@@ -76,27 +160,21 @@ def detect_title_violation(page_title_dict: dict):
     return detection_result
 
 
-def detect_lang_violation(page_title_dict: dict, elements_with_lang: dict):
+def detect_lang_violation(page_title_dict: dict, elements_with_lang: dict, criteria=("3.1.1", "3.1.2")):
     """
-    Detect violations of WCAG Success Criteria 3.1.1 and 3.1.2 regarding the use of the lang attribute.
+    Detect violations of WCAG Success Criteria 3.1.1 and 3.1.2, or only of those in criteria, regarding the use of
+    the lang attribute.
     """
+    rules = [rule for criterion in criteria for rule in LANG_RULES[criterion]]
     user_message = (
         "You will be provided with HTML elements that have a lang attribute from a webpage, as well as "
-        "relevant portion text, to determine if there is any violation of WCAG SC 3.1.1 and SC 3.1.2. "
+        "relevant portion text, to determine if there is any violation of "
+        f"{' and '.join('WCAG SC ' + criterion for criterion in criteria)}. "
         "Please focus only on these criteria. Determine whether the elements comply with the specific WCAG criterion, "
-        "and provide a description of any issues if found. Follow the six test rules below: \n"
-        "1. The HTML page should have a lang attribute. If you see the message 'Could not find the lang attribute on "
-        "this page', it's a violation. \n"
-        "2. The lang attribute must have a valid language tag. For example, if the value of the lang attribute is "
-        "'#1', it is not valid. \n"
-        "3. The lang and xml:lang attributes, if both present, should have matching values. You can ignore this case "
-        "if xml:lang is not present. \n"
-        "4. The language subtag in the lang attribute should match the default language. \n"
-        "5. The language specified by the lang and xml:lang attributes for any element must accurately reflect the "
-        "language of the content within that element. Determine the language of the text in the HTML snippet without "
-        "considering the lang and xml:lang attributes, then compare your identification with the declared language. \n"
-        "6. For portions of content in a different language from the default, use the lang attribute to specify the "
-        "language. Ensure that the text direction is appropriate for the specified language. \n"
+        f"and provide a description of any issues if found. Follow the {len(rules)} test rules below: \n"
+    )
+    user_message += "".join(f"{number}. {rule} \n" for number, rule in enumerate(rules, 1))
+    user_message += (
         "The related information for you to assess starts after the dashed line. \n"
         "------------------ \n"
     )
@@ -140,19 +218,14 @@ def detect_non_text_content_violation(visual_elements_dict: dict):
     # Chunk the visual elements data
     chunks = chunk_data(visual_elements_dict, threshold_tokens=20000, max_chunk_tokens=5000)
 
-    # Initialize a list to collect responses
-    all_responses = []
-
-    for chunk in chunks:
-        # Construct the user message for the current chunk
-        chunk_message = user_message_template + "\n".join(
-            f"{key}: {value}" for key, value in chunk.items()
-        )
+    # Construct the user message of each chunk
+    chunk_messages = [
+        user_message_template + "\n".join(f"{key}: {value}" for key, value in chunk.items())
+        for chunk in chunks
+    ]
 
-        # Send request to the model (assuming send_request_to_model is defined)
-        completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, chunk_message)
-        response_json = completion.choices[0].message.content
-        all_responses.append(response_json)
+    # Send the chunks to the model together
+    all_responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, chunk_messages)
 
     # Aggregate all responses
     aggregated_response = aggregate_responses(all_responses)
@@ -215,7 +288,7 @@ def detect_non_text_alt_text_not_descriptive(visual_elements_dict: dict):
     }
 
     chunked_elements = chunk_data(elements_with_status_200, threshold_tokens=20000, max_chunk_tokens=5000)
-    responses = []
+    user_messages = []
 
     for chunk in chunked_elements:
         try:
@@ -225,13 +298,14 @@ def detect_non_text_alt_text_not_descriptive(visual_elements_dict: dict):
                 user_message.append({"type": "image_url", "image_url": {"url": value}})
                 user_message.append({"type": "text", "text": "------------------\n"})
 
-            completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-            responses.append(completion.choices[0].message.content)
+            user_messages.append(user_message)
         except Exception as e:
             method_name = inspect.currentframe().f_code.co_name
             print(f"Error in {method_name}: {e}")
             continue
 
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
+
     if responses:
         aggregated_response = aggregate_responses(responses)
         final_response = json.dumps(aggregated_response, indent=2)
@@ -251,21 +325,21 @@ def detect_non_text_content_aggregated_violation(visual_elements_dict: dict):
     return final_response
 
 
-def detect_misuse_images_of_text(image_urls: set):
+def detect_misuse_images_of_text(image_urls: set, criteria=("1.4.5", "1.4.9")):
     """
-        Detect misuse of images of text based on WCAG SC 1.4.5 criteria.
+        Detect misuse of images of text based on WCAG SC 1.4.5 and 1.4.9 criteria, or only on those in criteria.
     """
+    conditions = "".join(
+        f"According to WCAG SC {criterion}, images should not contain visible text unless one of the following "
+        f"conditions is met:\n{IMAGES_OF_TEXT_EXCEPTIONS[criterion]}" for criterion in criteria)
     user_message_base = {
         "type": "text",
         "text": (
             "You will be provided with image URLs from a webpage. Your task is to assess whether these images "
-            "comply with WCAG SC 1.4.5, focusing only on this specific criterion. Determine if the images contain "
-            "visible text and describe any issues if found.\n"
-            "According to WCAG SC 1.4.5, images should not contain visible text unless one of the following "
-            "conditions is met:\n"
-            "1. The image is purely decorative.\n"
-            "2. The text is not a significant part of the image.\n"
-            "3. The presentation of the text is essential.\n"
+            f"comply with {' and '.join('WCAG SC ' + criterion for criterion in criteria)}, focusing only on "
+            f"{'this specific criterion' if len(criteria) == 1 else 'these criteria'}. Determine if the images "
+            "contain visible text and describe any issues if found.\n"
+            f"{conditions}"
             "Use your judgment to determine whether each image meets these exceptions.\n"
             "The relevant information for your assessment begins after the dashed line.\n"
             "------------------\n"
@@ -282,20 +356,21 @@ def detect_misuse_images_of_text(image_urls: set):
     # Chunk the valid image URLs
     chunked_image_urls = chunk_data(list(valid_image_urls))
 
-    responses = []
+    user_messages = []
 
     for chunk in chunked_image_urls:
         try:
             user_message = [user_message_base.copy()]  # Start with the base message
             for url in chunk:
                 user_message.append({"type": "image_url", "image_url": {"url": url}})
-            completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-            responses.append(completion.choices[0].message.content)
+            user_messages.append(user_message)
         except Exception as e:
             method_name = inspect.currentframe().f_code.co_name
             print(f"Error in {method_name}: {e}")
             continue
 
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
+
     if responses:
         aggregated_response = aggregate_responses(responses)
         final_response = json.dumps(aggregated_response, indent=2)
@@ -386,15 +461,16 @@ def detect_label_in_name_violation(element_with_label: set):
     # Chunk the elements with labels if they exceed a certain size
     chunked_elements = chunk_data(list(element_with_label))
 
-    responses = []
+    user_messages = []
 
     for chunk in chunked_elements:
         user_message = user_message_base  # Start with the base message
         for element in chunk:
             user_message += f"{element}\n-------------\n"
 
-        completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-        responses.append(completion.choices[0].message.content)
+        user_messages.append(user_message)
+
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
 
     if responses:
         aggregated_response = aggregate_responses(responses)
@@ -694,14 +770,15 @@ def detect_link_purpose_violation_a(link_purpose_list: list):
     # Chunk the data
     chunked_link_purpose_list = chunk_data(link_purpose_list)
 
-    responses = []
+    user_messages = []
 
     for chunk in chunked_link_purpose_list:
         user_message = user_message_base
         for element in chunk:
             user_message += f"{element}\n-------------\n"
-        completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-        responses.append(completion.choices[0].message.content)
+        user_messages.append(user_message)
+
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
 
     if responses:
         aggregated_response = aggregate_responses(responses)
@@ -737,15 +814,16 @@ def detect_link_purpose_violation_aaa(link_purpose_list: list):
     # Chunk the data
     chunked_link_purpose_list = chunk_data(link_purpose_list)
 
-    responses = []
+    user_messages = []
 
     for chunk in chunked_link_purpose_list:
         user_message = user_message_base
         for element in chunk:
             user_message += f"{element}\n-------------\n"
 
-        completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-        responses.append(completion.choices[0].message.content)
+        user_messages.append(user_message)
+
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
 
     if responses:
         aggregated_response = aggregate_responses(responses)
@@ -755,164 +833,125 @@ def detect_link_purpose_violation_aaa(link_purpose_list: list):
     return {}
 
 
-def detect_color_contrast_violation_aa(color_contrast_list: list, color_contrast_dict: dict):
-    """
-    Detect violations related to color contrast as per WCAG SC 1.4.3.
-    """
-    user_message_base = [
-        {
-            "type": "text",
-            "text": (
-                "You will be provided with text elements and their corresponding color values in rgb or rgba format "
-                "from a webpage"
-                "to assess compliance with WCAG SC 1.4.3. If a text element has an image background, you will also "
-                "receive"
-                "a screenshot of the text over the background image. Each text element will be separated by "
-                "'-------------'."
-                "Please focus solely on this criterion. Determine whether the elements comply with WCAG SC 1.4.3 and "
-                "describe"
-                "any issues identified.\n"
-                "Test rules for this criterion include:\n"
-                "1. Text and its background must have a contrast ratio of at least 4.5:1.\n"
-                "2. Large text (defined as at least 18 point for regular text or 14 point for bold text) and its "
-                "background must have a contrast ratio of at least 3:1."
-                "You will be provided with font-size information.\n"
-                "3. When background images are used, they must provide sufficient contrast with the foreground text "
-                "to ensure readability."
-                "Examine the provided screenshot to determine if the text is readable.\n"
-                "A common failure for this criterion includes:\n"
-                "- **F24**: Failure due to specifying foreground colors without specifying background colors or vice "
-                "versa.\n"
-                "The relevant information for your assessment begins after the dashed line.\n"
-                "----------------------\n"
-            )
-        }
-    ]
-
-    # Combine data from both parameters
-    text_elements = [{'type': 'text', 'content': text} for text in color_contrast_list]
-    image_elements = [{'type': 'image', 'text': key, 'image': value} for key, value in color_contrast_dict.items()]
-
-    combined_data = text_elements + image_elements
+contrast_sys_message = ("You are an Accessibility Expert (WCAG Specialist) measuring the contrast of text displayed "
+                        "over background images on websites. For each numbered text element, look at the screenshot of "
+                        "the text over its background and estimate the lowest contrast ratio, as defined by WCAG, "
+                        "between the text color and the part of the background image directly behind the text. "
+                        "Answer with one entry per element, using the number it was given. Do not judge whether the "
+                        "ratio is sufficient, only estimate it.")
 
-    # Chunk the combined data
-    chunked_data = chunk_data(combined_data)
 
-    responses = []
+def estimate_background_image_contrast(text_colors: dict) -> tuple:
+    """
+    Ask the model for the contrast ratio of each text element over a background image or gradient:
+    ([{"html", "text", "ratio", "large", "reason"}], complete). Ratios are estimated once, whatever level they are
+    judged at. complete is False if an answer was invalid or an element was left without an estimate.
+    """
+    elements = text_colors["background_image_elements"]
+    items = [{"index": index,
+              "text": f"Element {index}: {element['html']}\ntext: {element['text']}; color: "
+                      f"{css_color(element['color'])}; font-size: {element['fontSize']:g}px; font-weight: "
+                      f"{element['fontWeight']}; background-image: {element['backgroundImage']}\n",
+              "image": element["image"]}
+             for index, element in enumerate(elements)]
 
-    for chunk in chunked_data:
+    user_messages = []
+    for chunk in chunk_data(items):
+        user_message = [{"type": "text", "text": "Text elements over background images:\n----------------------\n"}]
+        for item in chunk:
+            user_message.append({"type": "text", "text": item["text"]})
+            user_message.append({"type": "image_url", "image_url": {"url": f"data:image/png;base64,{item['image']}"}})
+            user_message.append({"type": "text", "text": "\n-------------\n"})
+        user_messages.append(user_message)
+
+    large = large_text([element["fontSize"] for element in elements], [element["fontWeight"] for element in elements])
+    responses = send_requests_to_model("gpt-4o-2024-08-06", contrast_sys_message, user_messages,
+                                       CONTRAST_JSON_FORMAT)
+    complete = True
+    estimated = {}
+    for response in responses:
         try:
-            user_message = user_message_base.copy()
-
-            # Add text elements together
-            user_message.append({"type": "text", "text": "\nText elements:\n----------------------\n"})
-            for item in chunk:
-                if item['type'] == 'text':
-                    user_message.append({"type": "text", "text": f"{item['content']}\n-------------\n"})
-
-            # Add image elements together
-            user_message.append({"type": "text", "text": "\nImage elements (with background "
-                                                         "images):\n----------------------\n"})
-            for item in chunk:
-                if item['type'] == 'image':
-                    user_message.append({"type": "text", "text": f"{item['text']}\n"})
-                    user_message.append(
-                        {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{item['image']}"}})
-                    user_message.append({"type": "text", "text": "\n-------------\n"})
-
-            completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-            responses.append(completion.choices[0].message.content)
-        except Exception as e:
-            method_name = inspect.currentframe().f_code.co_name
-            print(f"Error in {method_name}: {e}")
+            answers = json.loads(response)["elements"]
+        except (json.JSONDecodeError, KeyError) as e:
+            print(f"Invalid contrast estimate response: {e}")
+            complete = False
             continue
-
-    if responses:
-        aggregated_response = aggregate_responses(responses)
-        final_response = json.dumps(aggregated_response, indent=2)
-        return final_response
-
-    return {}
+        for answer in answers:
+            index = answer["index"]
+            if 0 <= index < len(elements) and index not in estimated:
+                estimated[index] = {"html": elements[index]["html"], "text": elements[index]["text"],
+                                    "ratio": answer["estimated_contrast_ratio"], "large": bool(large[index]),
+                                    "reason": answer["reason"]}
+    if len(estimated) < len(elements):
+        print(f"The contrast of {len(elements) - len(estimated)} text elements over background images was not "
+              f"estimated.")
+        complete = False
+    return [estimated[index] for index in sorted(estimated)], complete
+
+
+def background_image_contrast(text_colors: dict, levels) -> list:
+    """
+    The estimates of estimate_background_image_contrast(). When a scan session runs the checks of 1.4.3 and 1.4.6
+    as two detectors, it names a file in text_colors["estimate_file"] through which they share one model call:
+    the detector that comes first estimates and leaves its estimates there, the second one reads them and deletes
+    the file and its lock, which no other detector opens. Incomplete estimates are not shared, the second detector
+    estimates again.
+    """
+    if not text_colors["background_image_elements"]:
+        return []
+    path = text_colors.get("estimate_file")
+    if path is None or set(CONTRAST_LEVELS) <= set(levels):
+        return estimate_background_image_contrast(text_colors)[0]
+    with open(f"{path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not os.path.exists(path):
+            estimates, complete = estimate_background_image_contrast(text_colors)
+            write_estimates(path, estimates if complete else None)
+            return estimates
+        with open(path) as f:
+            shared = json.load(f)["estimates"]
+        os.remove(path)
+        os.remove(f"{path}.lock")
+    return shared if shared is not None else estimate_background_image_contrast(text_colors)[0]
+
+
+def write_estimates(path: str, estimates):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump({"estimates": estimates}, f)
+    os.replace(temp_path, path)
+
+
+def detect_color_contrast_violations(text_colors: dict, levels=CONTRAST_LEVELS) -> dict:
+    """
+    Detect color contrast violations of text at each level, by criterion. Text over a background color is
+    measured locally; the contrast of text over a background image or gradient is estimated by the model. Both
+    are measured once and judged against the thresholds of every level.
+    """
+    measured = measure_contrast(text_colors["text_elements"])
+    estimated = background_image_contrast(text_colors, levels)
+    results = {}
+    for level in levels:
+        violations = contrast_violations(measured, level) + estimated_contrast_violations(estimated, level)
+        results[CONTRAST_LEVELS[level]] = json.dumps({
+            "overall_violation": "Yes" if violations else "No",
+            "violated_elements_and_reasons": violations
+        }, indent=2)
+    return results
+
+
+def detect_color_contrast_violation_aa(text_colors: dict):
+    """
+    Detect violations related to color contrast as per WCAG SC 1.4.3.
+    """
+    return detect_color_contrast_violations(text_colors, ("AA",))["1.4.3"]
 
 
-def detect_color_contrast_violation_aaa(color_contrast_list: list, color_contrast_dict: dict):
+def detect_color_contrast_violation_aaa(text_colors: dict):
     """
     Detect violations related to color contrast as per WCAG SC 1.4.6.
     """
-    user_message_base = [
-        {
-            "type": "text",
-            "text": (
-                "You will be provided with text elements and their corresponding color values in rgb or rgba format "
-                "from a webpage"
-                "to assess compliance with WCAG SC 1.4.6. If a text element uses an image as a background, "
-                "you will also receive"
-                "a screenshot showing the text over the background image. Each text element will be separated by "
-                "'-------------'."
-                "Please **only focus on this criterion**. Your task is to determine whether the elements comply with "
-                "WCAG SC 1.4.6"
-                "and describe any issues identified.\n"
-                "Test rules for this criterion include:\n"
-                "1. Text and its background must have a contrast ratio of at least 7:1.\n"
-                "2. Large text (defined as at least 18 point for regular text or 14 point for bold text) and its "
-                "background must have a contrast ratio of at least 4.5:1."
-                "You will be provided with font-size information.\n"
-                "3. When background images are used, they must provide sufficient contrast with the foreground text "
-                "to ensure readability."
-                "Examine the provided screenshot to determine if the text is readable.\n"
-                "A common failure for this criterion includes:\n"
-                "- **F24**: Failure due to specifying foreground colors without specifying background colors or vice "
-                "versa.\n"
-                "The relevant information for your assessment begins after the dashed line.\n"
-                "----------------------\n"
-            )
-        }
-    ]
-
-    # Combine data from both parameters
-    text_elements = [{'type': 'text', 'content': text} for text in color_contrast_list]
-    image_elements = [{'type': 'image', 'text': key, 'image': value} for key, value in color_contrast_dict.items()]
-
-    combined_data = text_elements + image_elements
-
-    # Chunk the combined data
-    chunked_data = chunk_data(combined_data)
-
-    responses = []
-
-    for chunk in chunked_data:
-        try:
-            user_message = user_message_base.copy()  # Copy the base message structure
-
-            # Add text elements together
-            user_message.append({"type": "text", "text": "\nText elements:\n----------------------\n"})
-            for item in chunk:
-                if item['type'] == 'text':
-                    user_message.append({"type": "text", "text": f"{item['content']}\n-------------\n"})
-
-            # Add image elements together
-            user_message.append({"type": "text", "text": "\nImage elements (with background "
-                                                         "images):\n----------------------\n"})
-            for item in chunk:
-                if item['type'] == 'image':
-                    user_message.append({"type": "text", "text": f"{item['text']}\n"})
-                    user_message.append(
-                        {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{item['image']}"}})
-                    user_message.append({"type": "text", "text": "\n-------------\n"})
-
-            completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-            responses.append(completion.choices[0].message.content)
-        except Exception as e:
-            method_name = inspect.currentframe().f_code.co_name
-            print(f"Error in {method_name}: {e}")
-            continue
-
-    if responses:
-        aggregated_response = aggregate_responses(responses)
-        final_response = json.dumps(aggregated_response, indent=2)
-        return final_response
-
-    return {}
+    return detect_color_contrast_violations(text_colors, ("AAA",))["1.4.6"]
 
 
 def detect_heading_label_description_violation(input_dict: dict, heading_list: list):
@@ -939,7 +978,7 @@ def detect_heading_label_description_violation(input_dict: dict, heading_list: l
     # Chunk the combined data
     chunked_data = chunk_data(combined_data)
 
-    responses = []
+    user_messages = []
 
     for chunk in chunked_data:
         user_message = user_message_base
@@ -965,8 +1004,9 @@ def detect_heading_label_description_violation(input_dict: dict, heading_list: l
             if item['type'] == 'input_label':
                 user_message += f"{item['content']}\n-------------\n"
 
-        completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-        responses.append(completion.choices[0].message.content)
+        user_messages.append(user_message)
+
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
 
     if responses:
         aggregated_response = aggregate_responses(responses)
@@ -1003,7 +1043,7 @@ def detect_section_heading_violation(section_heading_list: list, screenshot_list
         }
     ]
 
-    responses = []
+    user_messages = []
 
     # Prepare combined data with categorized elements
     headings_data = [{'type': 'heading', 'content': heading} for heading in section_heading_list]
@@ -1045,13 +1085,14 @@ def detect_section_heading_violation(section_heading_list: list, screenshot_list
                         "type": "text",
                         "text": "-------------\n"
                     })
-            completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-            responses.append(completion.choices[0].message.content)
+            user_messages.append(user_message)
         except Exception as e:
             method_name = inspect.currentframe().f_code.co_name
             print(f"Error in {method_name}: {e}")
             continue
 
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
+
     if responses:
         aggregated_response = aggregate_responses(responses)
         final_response = json.dumps(aggregated_response, indent=2)
@@ -1131,7 +1172,7 @@ def detect_info_relation_violation(info_dict: dict):
     # Chunk the combined data
     chunked_data = list(chunk_data(combined_data))
 
-    responses = []
+    user_messages = []
 
     for chunk in chunked_data:
         try:
@@ -1143,13 +1184,14 @@ def detect_info_relation_violation(info_dict: dict):
                 user_message += f"{key.capitalize()}:\n"
                 user_message += f"{item[key]}\n-------------\n"
 
-            completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-            responses.append(completion.choices[0].message.content)
+            user_messages.append(user_message)
         except Exception as e:
             method_name = inspect.currentframe().f_code.co_name
             print(f"Error in {method_name}: {e}")
             continue
 
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
+
     if responses:
         aggregated_response = aggregate_responses(responses)
         final_response = json.dumps(aggregated_response, indent=2)
@@ -1198,7 +1240,7 @@ def detect_info_relation_part_b_violation(info_dict: dict, screenshot_list: list
     # Chunk the combined data
     chunked_data = list(chunk_data(combined_data))
 
-    responses = []
+    user_messages = []
 
     for chunk in chunked_data:
         try:
@@ -1216,13 +1258,14 @@ def detect_info_relation_part_b_violation(info_dict: dict, screenshot_list: list
                     user_message.append({"type": "text", "text": f"{element_type}s:\n"})
                     user_message.append({"type": "text", "text": f"{item['content']}\n-------------\n"})
 
-            completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-            responses.append(completion.choices[0].message.content)
+            user_messages.append(user_message)
         except Exception as e:
             method_name = inspect.currentframe().f_code.co_name
             print(f"Error in {method_name}: {e}")
             continue
 
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
+
     if responses:
         aggregated_response = aggregate_responses(responses)
         final_response = json.dumps(aggregated_response, indent=2)
@@ -1266,7 +1309,7 @@ def detect_meaningful_sequence_violation(meaningful_sequence_list: list, white_s
     # Chunk the combined data
     chunked_data = list(chunk_data(combined_data))
 
-    responses = []
+    user_messages = []
 
     for chunk in chunked_data:
         user_message = user_message_base
@@ -1287,8 +1330,9 @@ def detect_meaningful_sequence_violation(meaningful_sequence_list: list, white_s
                 user_message += f"{item['content']}\n"
                 user_message += "-------------\n"
 
-        completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-        responses.append(completion.choices[0].message.content)
+        user_messages.append(user_message)
+
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
 
     if responses:
         aggregated_response = aggregate_responses(responses)
@@ -1341,7 +1385,7 @@ def detect_name_role_value_violation(name_role_value_dict: dict, form_dict: dict
     # Chunk the combined data
     chunked_data = list(chunk_data(combined_data))
 
-    responses = []
+    user_messages = []
 
     for chunk in chunked_data:
         user_message = user_message_base
@@ -1351,8 +1395,9 @@ def detect_name_role_value_violation(name_role_value_dict: dict, form_dict: dict
             user_message += f"{item['content']}\n"
             user_message += "-------------\n"
 
-        completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-        responses.append(completion.choices[0].message.content)
+        user_messages.append(user_message)
+
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
 
     if responses:
         aggregated_response = aggregate_responses(responses)
@@ -1398,7 +1443,7 @@ def detect_moving_updating_element_violation(moving_updating_dict: dict):
     # Chunk the combined data
     chunked_data = list(chunk_data(combined_data))
 
-    responses = []
+    user_messages = []
 
     for chunk in chunked_data:
         try:
@@ -1418,13 +1463,14 @@ def detect_moving_updating_element_violation(moving_updating_dict: dict):
                     user_message.append({"type": "text", "text": f"{element_type} elements:\n"})
                     user_message.append({"type": "text", "text": f"{item['content']}\n-------------\n"})
 
-            completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-            responses.append(completion.choices[0].message.content)
+            user_messages.append(user_message)
         except Exception as e:
             method_name = inspect.currentframe().f_code.co_name
             print(f"Error in {method_name}: {e}")
             continue
 
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
+
     if responses:
         aggregated_response = aggregate_responses(responses)
         final_response = json.dumps(aggregated_response, indent=2)
@@ -1484,7 +1530,7 @@ def detect_bypass_blocks_violation(bypass_block_dict: dict):
     # Chunk the combined data
     chunked_data = list(chunk_data(combined_data))
 
-    responses = []
+    user_messages = []
 
     for chunk in chunked_data:
         user_message = user_message_base
@@ -1494,8 +1540,9 @@ def detect_bypass_blocks_violation(bypass_block_dict: dict):
             user_message += f"{item['content']}\n"
             user_message += "-------------\n"
 
-        completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-        responses.append(completion.choices[0].message.content)
+        user_messages.append(user_message)
+
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
 
     if responses:
         aggregated_response = aggregate_responses(responses)
@@ -1562,7 +1609,7 @@ def detect_sensory_characteristics_violation(sensory_dict: dict):
     # Chunk the combined data
     chunked_data = list(chunk_data(combined_data))
 
-    responses = []
+    user_messages = []
 
     for chunk in chunked_data:
         user_message = user_message_base
@@ -1575,8 +1622,9 @@ def detect_sensory_characteristics_violation(sensory_dict: dict):
             user_message += f"{item['content']}\n"
             user_message += "-------------\n"
 
-        completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-        responses.append(completion.choices[0].message.content)
+        user_messages.append(user_message)
+
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
 
     if responses:
         aggregated_response = aggregate_responses(responses)
@@ -1616,7 +1664,7 @@ def detect_use_of_color_violation(color_dict: dict):
     # Chunk the combined data
     chunked_data = list(chunk_data(combined_data))
 
-    responses = []
+    user_messages = []
 
     for chunk in chunked_data:
         try:
@@ -1631,13 +1679,14 @@ def detect_use_of_color_violation(color_dict: dict):
                     {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{item['content']}"}})
                 user_message.append({"type": "text", "text": "-------------\n"})
 
-            completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-            responses.append(completion.choices[0].message.content)
+            user_messages.append(user_message)
         except Exception as e:
             method_name = inspect.currentframe().f_code.co_name
             print(f"Error in {method_name}: {e}")
             continue
 
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
+
     if responses:
         aggregated_response = aggregate_responses(responses)
         final_response = json.dumps(aggregated_response, indent=2)
@@ -1683,7 +1732,7 @@ def detect_target_size_minimum_violation(target_size_dict: dict):
     # Chunk the combined data
     chunked_data = list(chunk_data(combined_data))
 
-    responses = []
+    user_messages = []
 
     for chunk in chunked_data:
         try:
@@ -1699,13 +1748,14 @@ def detect_target_size_minimum_violation(target_size_dict: dict):
                 user_message.append(
                     {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{element['full']}"}})
 
-            completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-            responses.append(completion.choices[0].message.content)
+            user_messages.append(user_message)
         except Exception as e:
             method_name = inspect.currentframe().f_code.co_name
             print(f"Error in {method_name}: {e}")
             continue
 
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
+
     if responses:
         aggregated_response = aggregate_responses(responses)
         final_response = json.dumps(aggregated_response, indent=2)
@@ -1746,7 +1796,7 @@ def detect_target_size_enhanced_violation(target_size_dict: dict):
     # Chunk the combined data
     chunked_data = list(chunk_data(combined_data))
 
-    responses = []
+    user_messages = []
 
     for chunk in chunked_data:
         try:
@@ -1760,13 +1810,14 @@ def detect_target_size_enhanced_violation(target_size_dict: dict):
                     {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{element['full']}"}})
                 user_message.append({"type": "text", "text": "-------------\n"})
 
-            completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-            responses.append(completion.choices[0].message.content)
+            user_messages.append(user_message)
         except Exception as e:
             method_name = inspect.currentframe().f_code.co_name
             print(f"Error in {method_name}: {e}")
             continue
 
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
+
     if responses:
         aggregated_response = aggregate_responses(responses)
         final_response = json.dumps(aggregated_response, indent=2)
@@ -1809,7 +1860,7 @@ def detect_visual_presentation_violation(visual_list: list):
              "------------------\n"
          )}
     ]
-    responses = []
+    user_messages = []
 
     # Chunk the data
     chunked_data = list(chunk_data(visual_list))
@@ -1830,13 +1881,14 @@ def detect_visual_presentation_violation(visual_list: list):
                             {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{block['screenshot']}"}})
                 user_message.append({"type": "text", "text": message_text})
                 user_message.append({"type": "text", "text": "-------------\n"})
-            completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-            responses.append(completion.choices[0].message.content)
+            user_messages.append(user_message)
         except Exception as e:
             method_name = inspect.currentframe().f_code.co_name
             print(f"Error in {method_name}: {e}")
             continue
 
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
+
     if responses:
         aggregated_response = aggregate_responses(responses)
         final_response = json.dumps(aggregated_response, indent=2)
@@ -1861,7 +1913,7 @@ def detect_text_spacing_violation(text_spacing_list: list):
              "------------------\n"
          )}
     ]
-    responses = []
+    user_messages = []
 
     # Chunk the data
     chunked_data = list(chunk_data(text_spacing_list))
@@ -1876,13 +1928,14 @@ def detect_text_spacing_violation(text_spacing_list: list):
                     {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{text_spacing}"}})
                 user_message.append({"type": "text", "text": "-------------\n"})
 
-            completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-            responses.append(completion.choices[0].message.content)
+            user_messages.append(user_message)
         except Exception as e:
             method_name = inspect.currentframe().f_code.co_name
             print(f"Error in {method_name}: {e}")
             continue
 
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
+
     if responses:
         aggregated_response = aggregate_responses(responses)
         final_response = json.dumps(aggregated_response, indent=2)
@@ -1911,7 +1964,7 @@ def detect_error_identified_violation(error_identified_screenshot: list):
              "------------------\n"
          )}
     ]
-    responses = []
+    user_messages = []
 
     # Chunk the data
     chunked_data = list(chunk_data(error_identified_screenshot))
@@ -1925,13 +1978,14 @@ def detect_error_identified_violation(error_identified_screenshot: list):
                 user_message.append({"type": "image_url", "image_url": {"url": f"data:image/png;base64,{screenshot}"}})
                 user_message.append({"type": "text", "text": "-------------\n"})
 
-            completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-            responses.append(completion.choices[0].message.content)
+            user_messages.append(user_message)
         except Exception as e:
             method_name = inspect.currentframe().f_code.co_name
             print(f"Error in {method_name}: {e}")
             continue
 
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
+
     if responses:
         aggregated_response = aggregate_responses(responses)
         final_response = json.dumps(aggregated_response, indent=2)
@@ -1959,7 +2013,7 @@ def detect_error_suggestion_violation(error_suggestion_screenshot: list):
              "------------------\n"
          )}
     ]
-    responses = []
+    user_messages = []
 
     # Chunk the data
     chunked_data = list(chunk_data(error_suggestion_screenshot))
@@ -1973,13 +2027,14 @@ def detect_error_suggestion_violation(error_suggestion_screenshot: list):
                 user_message.append({"type": "image_url", "image_url": {"url": f"data:image/png;base64,{screenshot}"}})
                 user_message.append({"type": "text", "text": "-------------\n"})
 
-            completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-            responses.append(completion.choices[0].message.content)
+            user_messages.append(user_message)
         except Exception as e:
             method_name = inspect.currentframe().f_code.co_name
             print(f"Error in {method_name}: {e}")
             continue
 
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
+
     if responses:
         aggregated_response = aggregate_responses(responses)
         final_response = json.dumps(aggregated_response, indent=2)
@@ -2007,7 +2062,7 @@ def detect_abbreviations_violation(abbreviations_list: list):
              "------------------\n"
          )}
     ]
-    responses = []
+    user_messages = []
 
     # Chunk the data
     chunked_data = list(chunk_data(abbreviations_list))
@@ -2021,13 +2076,14 @@ def detect_abbreviations_violation(abbreviations_list: list):
                 user_message.append({"type": "image_url", "image_url": {"url": f"data:image/png;base64,{screenshot}"}})
                 user_message.append({"type": "text", "text": "-------------\n"})
 
-            completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-            responses.append(completion.choices[0].message.content)
+            user_messages.append(user_message)
         except Exception as e:
             method_name = inspect.currentframe().f_code.co_name
             print(f"Error in {method_name}: {e}")
             continue
 
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
+
     if responses:
         aggregated_response = aggregate_responses(responses)
         final_response = json.dumps(aggregated_response, indent=2)
@@ -2054,7 +2110,7 @@ def detect_non_text_contrast_violation(focusable_elements: list):
         "for your assessment starts after the dashed line.\n"
         "------------------\n"
     )
-    responses = []
+    user_messages = []
 
     # Chunk the data
     chunked_data = list(chunk_data(focusable_elements))
@@ -2070,8 +2126,9 @@ def detect_non_text_contrast_violation(focusable_elements: list):
                 "------------------\n"
             )
 
-        completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-        responses.append(completion.choices[0].message.content)
+        user_messages.append(user_message)
+
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
 
     if responses:
         aggregated_response = aggregate_responses(responses)
@@ -2098,7 +2155,7 @@ def detect_on_input_violation(special_input_dict, other_input_dict):
         "The relevant information for your assessment starts after the dashed line.\n"
         "------------------\n"
     )
-    responses = []
+    user_messages = []
 
     # Combine data for chunking
     combined_data = [
@@ -2137,8 +2194,9 @@ def detect_on_input_violation(special_input_dict, other_input_dict):
                     "------------------\n"
                 )
 
-        completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-        responses.append(completion.choices[0].message.content)
+        user_messages.append(user_message)
+
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
 
     if responses:
         aggregated_response = aggregate_responses(responses)
@@ -2167,7 +2225,7 @@ def detect_change_on_request_violation(onclick_dict: dict, onblur_dict: dict):
         "The relevant information for your assessment starts after the dashed line.\n"
         "------------------\n"
     )
-    responses = []
+    user_messages = []
 
     # Combine data for chunking
     combined_data = [
@@ -2205,8 +2263,9 @@ def detect_change_on_request_violation(onclick_dict: dict, onblur_dict: dict):
                     "------------------\n"
                 )
 
-        completion = send_request_to_model("gpt-4o-2024-08-06", sys_message, user_message)
-        responses.append(completion.choices[0].message.content)
+        user_messages.append(user_message)
+
+    responses = send_requests_to_model("gpt-4o-2024-08-06", sys_message, user_messages)
 
     if responses:
         aggregated_response = aggregate_responses(responses)
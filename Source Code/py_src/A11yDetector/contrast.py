@@ -0,0 +1,91 @@
+import numpy as np
+
+# Minimum contrast ratios by conformance level: (normal text, large text)
+CONTRAST_THRESHOLDS = {"AA": (4.5, 3.0), "AAA": (7.0, 4.5)}
+# Criterion of each level
+CONTRAST_LEVELS = {"AA": "1.4.3", "AAA": "1.4.6"}
+# Large text is at least 18pt, or 14pt when bold. Computed font sizes are in CSS pixels, 1pt = 4/3px.
+LARGE_TEXT_PX = 18 * 4 / 3
+LARGE_BOLD_TEXT_PX = 14 * 4 / 3
+BOLD_WEIGHT = 700
+# Weights of the red, green and blue channels in the relative luminance
+LUMINANCE_WEIGHTS = np.array([0.2126, 0.7152, 0.0722])
+
+
+def relative_luminance(colors: np.ndarray) -> np.ndarray:
+    """ The WCAG relative luminance of an (n, 3) array of sRGB colors in 0-255. """
+    channels = colors / 255
+    linear = np.where(channels <= 0.04045, channels / 12.92, ((channels + 0.055) / 1.055) ** 2.4)
+    return linear @ LUMINANCE_WEIGHTS
+
+
+def contrast_ratios(foregrounds, backgrounds) -> np.ndarray:
+    foreground = relative_luminance(np.asarray(foregrounds, dtype=float).reshape(-1, 3))
+    background = relative_luminance(np.asarray(backgrounds, dtype=float).reshape(-1, 3))
+    return (np.maximum(foreground, background) + 0.05) / (np.minimum(foreground, background) + 0.05)
+
+
+def large_text(font_sizes, font_weights) -> np.ndarray:
+    font_sizes = np.asarray(font_sizes, dtype=float)
+    font_weights = np.asarray(font_weights, dtype=float)
+    return (font_sizes >= LARGE_TEXT_PX) | ((font_weights >= BOLD_WEIGHT) & (font_sizes >= LARGE_BOLD_TEXT_PX))
+
+
+def measure_contrast(text_elements: list) -> list:
+    """
+    The text elements of read_text_colors() that have a background color, each with its contrast "ratio" and
+    whether it is "large" text.
+    """
+    measurable = [element for element in text_elements if element["background"] is not None]
+    if not measurable:
+        return []
+    ratios = contrast_ratios([element["color"] for element in measurable],
+                             [element["background"] for element in measurable])
+    large = large_text([element["fontSize"] for element in measurable],
+                       [element["fontWeight"] for element in measurable])
+    return [dict(element, ratio=float(ratio), large=bool(is_large))
+            for element, ratio, is_large in zip(measurable, ratios, large)]
+
+
+def css_color(color) -> str:
+    return f"rgb({', '.join(str(round(channel)) for channel in color)})"
+
+
+def contrast_violations(measured: list, level: str) -> list:
+    """ Violation entries, in the format of the model answers, for the measured elements below the level. """
+    normal_threshold, large_threshold = CONTRAST_THRESHOLDS[level]
+    violations = []
+    for element in measured:
+        required = large_threshold if element["large"] else normal_threshold
+        # Ratios are compared unrounded: 4.499:1 does not meet 4.5:1
+        if element["ratio"] >= required:
+            continue
+        violations.append({
+            "element": element["html"],
+            "reason": f"The text \"{element['text']}\" ({css_color(element['color'])} on "
+                      f"{css_color(element['background'])}, {element['fontSize']:g}px, weight "
+                      f"{element['fontWeight']}) has a contrast ratio of {element['ratio']:.2f}:1, below the "
+                      f"{required:g}:1 required for {'large' if element['large'] else 'normal'} text.",
+            "recommendation": f"Change the text or background color so that their contrast ratio is at least "
+                              f"{required:g}:1."
+        })
+    return violations
+
+
+def estimated_contrast_violations(estimated: list, level: str) -> list:
+    """ Violation entries for the text over background images whose estimated contrast is below the level. """
+    normal_threshold, large_threshold = CONTRAST_THRESHOLDS[level]
+    violations = []
+    for element in estimated:
+        required = large_threshold if element["large"] else normal_threshold
+        if element["ratio"] >= required:
+            continue
+        violations.append({
+            "element": element["html"],
+            "reason": f"The text \"{element['text']}\" over a background image has an estimated contrast ratio of "
+                      f"{element['ratio']:.2f}:1, below the {required:g}:1 required for "
+                      f"{'large' if element['large'] else 'normal'} text. {element['reason']}",
+            "recommendation": f"Change the text color, add a solid backdrop behind the text or darken or lighten the "
+                              f"background image so that the contrast ratio is at least {required:g}:1."
+        })
+    return violations
@@ -5,6 +5,9 @@ from transformers import GPT2Tokenizer
 
 # Initialize the tokenizer
 tokenizer = GPT2Tokenizer.from_pretrained("gpt2")
+# Tokens charged against the rate limit for an image and for the answer, neither is known before the request
+IMAGE_TOKEN_ESTIMATE = 1000
+COMPLETION_TOKEN_ESTIMATE = 1000
 
 
 def count_tokens(message: str) -> int:
@@ -13,6 +16,18 @@ def count_tokens(message: str) -> int:
     return len(tokens)
 
 
+def estimate_request_tokens(system_message: str, user_message) -> int:
+    """Estimate the tokens of a request, with the user message given as text or as a list of content parts."""
+    parts = user_message if isinstance(user_message, list) else [{"type": "text", "text": user_message}]
+    tokens = count_tokens(system_message) + COMPLETION_TOKEN_ESTIMATE
+    for part in parts:
+        if part.get("type") == "text":
+            tokens += count_tokens(part["text"])
+        else:
+            tokens += IMAGE_TOKEN_ESTIMATE
+    return tokens
+
+
 def chunk_dict(data: dict, chunk_size: int):
     """Chunk a dictionary into smaller dictionaries of a specified size."""
     keys = list(data.keys())
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from multiprocessing import Array
+
+# Slots shared by every process that sends requests to the model, None means no limit
+_llm_slots = None
+# Requests and tokens per minute budget shared by every process, None means no limit
+_rate_budget = None
+
+
+class ConcurrencySlots:
+    """
+    A counting semaphore shared between processes. Each slot records the pid that holds it, so a scheduler
+    that terminates a hung process can hand the slots of that process back to the others.
+    """
+
+    def __init__(self, size: int):
+        self._pids = Array('i', size)
+
+    def acquire(self):
+        while True:
+            with self._pids.get_lock():
+                for index, pid in enumerate(self._pids):
+                    if pid == 0:
+                        self._pids[index] = os.getpid()
+                        return
+            time.sleep(0.05)
+
+    def release(self):
+        self.reclaim(os.getpid(), release_all=False)
+
+    def reclaim(self, pid: int, release_all: bool = True):
+        with self._pids.get_lock():
+            for index, holder in enumerate(self._pids):
+                if holder == pid:
+                    self._pids[index] = 0
+                    if not release_all:
+                        return
+
+
+class RateBudget:
+    """
+    Requests per minute and tokens per minute budget shared between processes. Both refill continuously, so a
+    burst is spread over the minute instead of being rejected by the API. Create it before the worker processes
+    start so that all of them draw from the same budget.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        # Time of the last refill, requests left, tokens left
+        self._state = Array('d', [time.time(), requests_per_minute, tokens_per_minute])
+
+    def reserve(self, tokens: int) -> float:
+        """ Take a request and its tokens from the budget. Returns 0 on success, or the seconds to wait. """
+        # A request larger than the whole budget would never fit, let it through once the budget is full
+        tokens = min(tokens, self.tokens_per_minute)
+        with self._state.get_lock():
+            now = time.time()
+            elapsed = now - self._state[0]
+            requests_left = min(self.requests_per_minute,
+                                self._state[1] + elapsed * self.requests_per_minute / 60)
+            tokens_left = min(self.tokens_per_minute, self._state[2] + elapsed * self.tokens_per_minute / 60)
+            self._state[0] = now
+            if requests_left >= 1 and tokens_left >= tokens:
+                self._state[1] = requests_left - 1
+                self._state[2] = tokens_left - tokens
+                return 0
+            self._state[1] = requests_left
+            self._state[2] = tokens_left
+        return max((1 - requests_left) * 60 / self.requests_per_minute,
+                   (tokens - tokens_left) * 60 / self.tokens_per_minute)
+
+    def wait(self, tokens: int):
+        while (delay := self.reserve(tokens)) > 0:
+            time.sleep(delay)
+
+    async def wait_async(self, tokens: int):
+        while (delay := self.reserve(tokens)) > 0:
+            await asyncio.sleep(delay)
+
+
+def set_rate_budget(budget):
+    """ Set the requests and tokens per minute budget. Must be called before the worker processes start. """
+    global _rate_budget
+    _rate_budget = budget
+
+
+def wait_for_rate_budget(tokens: int):
+    """ Block until the budget allows a request of the given size, if a budget is configured. """
+    if _rate_budget is not None:
+        _rate_budget.wait(tokens)
+
+
+async def wait_for_rate_budget_async(tokens: int):
+    if _rate_budget is not None:
+        await _rate_budget.wait_async(tokens)
+
+
+def set_llm_slots(slots):
+    """ Bound the number of concurrent model requests. Must be called before the worker processes start. """
+    global _llm_slots
+    _llm_slots = slots
+
+
+@contextmanager
+def llm_slot():
+    """ Hold one of the model request slots, if a limit is configured. """
+    if _llm_slots is None:
+        yield
+        return
+    _llm_slots.acquire()
+    try:
+        yield
+    finally:
+        _llm_slots.release()
+
+
+@asynccontextmanager
+async def llm_slot_async():
+    """ Hold one of the model request slots from a coroutine without blocking the event loop. """
+    if _llm_slots is None:
+        yield
+        return
+    await asyncio.to_thread(_llm_slots.acquire)
+    try:
+        yield
+    finally:
+        _llm_slots.release()
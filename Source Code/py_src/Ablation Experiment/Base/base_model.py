@@ -1,6 +1,5 @@
 import json
 import os
-import time
 
 import pandas as pd
 from dotenv import dotenv_values
@@ -9,6 +8,7 @@ from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 
 from consts import ABLATION_JSON_FORMAT
+from ElementExtraction.page_readiness import install_mutation_observer, track_network, wait_for_page_ready
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 env_path = os.path.join(script_dir, '..', '..', 'A11yDetector', '.env')
@@ -18,28 +18,16 @@ sys_message = ("Use your knowledge about WCAG to determine if the website has an
                "accessibility issues."
                )
 
-def wait_for_load(driver):
-    """ Wait for the page to fully load by checking the loadEventEnd timing. """
-    start_time = time.time()
-    while True:
-        timing = driver.execute_script("""
-            return window.performance.timing;
-        """)
-        if timing['loadEventEnd'] > 0:
-            return timing['loadEventEnd'] - timing['navigationStart']
-        if time.time() - start_time > 30:
-            raise Exception("Timed out waiting for page load.")
-        time.sleep(0.5)
-
-
 def prepare_driver(url: str):
     options = Options()
     options.add_argument("--headless")
     options.add_argument("--autoplay-policy=no-user-gesture-required")
     driver = webdriver.Chrome(options=options)
+    install_mutation_observer(driver)
+    track_network(driver)
     driver.maximize_window()
     driver.get(url)
-    wait_for_load(driver)
+    wait_for_page_ready(driver)
     return driver
 
 
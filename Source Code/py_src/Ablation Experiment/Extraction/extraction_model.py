@@ -1,6 +1,5 @@
 import json
 import os
-import time
 import pandas as pd
 from dotenv import dotenv_values
 from openai import OpenAI
@@ -20,6 +19,7 @@ from ElementExtraction.extract_related_elements import extract_related_visual_el
     extract_target_size, extract_lang_attr, find_related_screenshots, extract_event_handlers, \
     extract_change_on_request_element, extract_form_elements, extract_name_role_elements
 from consts import JSON_FORMAT, TEMP_FILE_FOLDER
+from ElementExtraction.page_readiness import install_mutation_observer, track_network, wait_for_page_ready
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 env_path = os.path.join(script_dir, '..', '..', 'A11yDetector', '.env')
@@ -27,28 +27,16 @@ config = dotenv_values(env_path)
 client = OpenAI(api_key=config["OPENAI_API_KEY"])
 
 
-def wait_for_load(driver):
-    """ Wait for the page to fully load by checking the loadEventEnd timing. """
-    start_time = time.time()
-    while True:
-        timing = driver.execute_script("""
-            return window.performance.timing;
-        """)
-        if timing['loadEventEnd'] > 0:
-            return timing['loadEventEnd'] - timing['navigationStart']
-        if time.time() - start_time > 30:
-            raise Exception("Timed out waiting for page load.")
-        time.sleep(0.5)
-
-
 def prepare_driver(url: str):
     options = Options()
     options.add_argument("--headless")
     options.add_argument("--autoplay-policy=no-user-gesture-required")
     driver = webdriver.Chrome(options=options)
+    install_mutation_observer(driver)
+    track_network(driver)
     driver.maximize_window()
     driver.get(url)
-    wait_for_load(driver)
+    wait_for_page_ready(driver)
     return driver
 
 
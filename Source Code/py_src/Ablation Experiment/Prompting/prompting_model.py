@@ -1,12 +1,12 @@
 import json
 import os
-import time
 import pandas as pd
 from dotenv import dotenv_values
 from openai import OpenAI
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from consts import JSON_FORMAT
+from ElementExtraction.page_readiness import install_mutation_observer, track_network, wait_for_page_ready
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 env_path = os.path.join(script_dir, '..', '..', 'A11yDetector', '.env')
@@ -43,28 +43,16 @@ sys_message = ("You are an Accessibility Expert (WCAG Specialist) responsible fo
                )
 
 
-def wait_for_load(driver):
-    """ Wait for the page to fully load by checking the loadEventEnd timing. """
-    start_time = time.time()
-    while True:
-        timing = driver.execute_script("""
-            return window.performance.timing;
-        """)
-        if timing['loadEventEnd'] > 0:
-            return timing['loadEventEnd'] - timing['navigationStart']
-        if time.time() - start_time > 30:
-            raise Exception("Timed out waiting for page load.")
-        time.sleep(0.5)
-
-
 def prepare_driver(url: str):
     options = Options()
     options.add_argument("--headless")
     options.add_argument("--autoplay-policy=no-user-gesture-required")
     driver = webdriver.Chrome(options=options)
+    install_mutation_observer(driver)
+    track_network(driver)
     driver.maximize_window()
     driver.get(url)
-    wait_for_load(driver)
+    wait_for_page_ready(driver)
     return driver
 
 
@@ -0,0 +1,111 @@
+import re
+from selenium import webdriver
+from ElementExtraction.page_model import PageModel, capture_page_model, escape_attribute, get_page_model, \
+    remove_attribute
+
+# The last index built by this process, for the page model it was built on
+_cached = None
+
+
+def accessibility_entry(node: dict) -> dict:
+    """ The role, name, description and states of a node of Accessibility.getFullAXTree. """
+    return {
+        "role": node.get("role", {}).get("value", ""),
+        "name": node.get("name", {}).get("value", ""),
+        "description": node.get("description", {}).get("value", ""),
+        "states": {prop["name"]: prop.get("value", {}).get("value") for prop in node.get("properties", [])},
+        "ignored": node.get("ignored", False),
+    }
+
+
+def document_elements(root: dict) -> tuple:
+    """
+    The backend node ids and tags of the elements of a DOM.getDocument tree, in document order. Template
+    contents, shadow roots and frames are separate fields of a node, so like the page model this only lists the
+    elements of the document itself.
+    """
+    backend_ids = []
+    tags = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.get("nodeType") == 1:
+            backend_ids.append(node["backendNodeId"])
+            tags.append(node["localName"])
+        stack.extend(reversed(node.get("children", [])))
+    return backend_ids, tags
+
+
+class AccessibilityIndex:
+    """
+    The accessibility tree the browser computed for the page, indexed by the elements of a PageModel: the role,
+    accessible name, description and states of each element, with aria-labelledby, aria-label, labels, alt text
+    and content already resolved the way assistive technologies see them.
+    """
+
+    def __init__(self, model: PageModel, backend_ids: list, nodes: list):
+        self.model = model
+        by_backend_id = {}
+        for node in nodes:
+            backend_id = node.get("backendDOMNodeId")
+            if backend_id is None:
+                continue
+            # An element can have an ignored node next to the one exposed to assistive technologies
+            if backend_id not in by_backend_id or by_backend_id[backend_id]["ignored"]:
+                by_backend_id[backend_id] = accessibility_entry(node)
+        self._entries = {element: by_backend_id.get(backend_id)
+                         for element, backend_id in zip(model.elements, backend_ids)}
+
+    def get(self, element: int):
+        return self._entries.get(element)
+
+    def role(self, element: int) -> str:
+        entry = self.get(element)
+        return entry["role"] if entry else ""
+
+    def name(self, element: int) -> str:
+        entry = self.get(element)
+        return entry["name"] if entry else ""
+
+    def named_start_tag(self, element: int) -> str:
+        """
+        The start tag of an element, with aria-labelledby replaced by an aria-label holding the name the browser
+        computed from it, so the model reads the name without looking up the referenced elements.
+        """
+        start = self.model.nodes[element]["start"]
+        if self.model.attribute(element, "aria-labelledby") is None:
+            return start
+        aria_label = f' aria-label="{escape_attribute(self.name(element))}"'
+        return re.sub(r'\saria-labelledby="[^"]*"', lambda match: aria_label, remove_attribute(start, "aria-label"),
+                      count=1)
+
+    def named_outer_html(self, element: int) -> str:
+        """ The outerHTML of an element, with the names of the elements of its subtree as in named_start_tag(). """
+        return self.model.outer_html(element, self.named_start_tag)
+
+
+def capture_accessibility_index(driver: webdriver.Chrome, model: PageModel) -> AccessibilityIndex:
+    """
+    Read the accessibility tree and the DOM tree in two DevTools calls and join them on the backend node ids.
+    The elements of the DOM tree are matched to the elements of the model by their position in document order;
+    if the page changed since the model was taken, the model is taken again.
+    """
+    for attempt in range(2):
+        backend_ids, tags = document_elements(driver.execute_cdp_cmd("DOM.getDocument", {"depth": -1})["root"])
+        if tags == [model.tag(element) for element in model.elements]:
+            break
+        model = capture_page_model(driver)
+    else:
+        print("The page kept changing while its accessibility tree was read, names are left unresolved.")
+        return AccessibilityIndex(model, [], [])
+    nodes = driver.execute_cdp_cmd("Accessibility.getFullAXTree", {})["nodes"]
+    return AccessibilityIndex(model, backend_ids, nodes)
+
+
+def get_accessibility_index(driver: webdriver.Chrome) -> AccessibilityIndex:
+    """ The accessibility index of the current page model, shared by the extractors like the model itself. """
+    global _cached
+    model = get_page_model(driver)
+    if _cached is None or _cached.model is not model:
+        _cached = capture_accessibility_index(driver, model)
+    return _cached
@@ -0,0 +1,118 @@
+import json
+import queue
+import threading
+import time
+import requests
+import websocket
+from selenium import webdriver
+
+
+class DevToolsSession:
+    """
+    A DevTools protocol connection to the page of a Selenium Chrome driver, or to the browser itself for the
+    commands that manage targets and browser contexts. Unlike driver.execute_cdp_cmd, it receives protocol
+    events: handlers registered with on() are called, one at a time, from a thread of their own, so they may
+    send commands themselves.
+    """
+
+    def __init__(self, driver: webdriver.Chrome, browser: bool = False):
+        url = browser_websocket_url(driver) if browser else page_websocket_url(driver)
+        self._socket = websocket.create_connection(url, timeout=None, suppress_origin=True)
+        self._next_id = 0
+        self._pending = {}
+        self._handlers = {}
+        self._events = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        threading.Thread(target=self._read, daemon=True).start()
+        threading.Thread(target=self._dispatch, daemon=True).start()
+
+    def send(self, method: str, params: dict = None, timeout: float = 30) -> dict:
+        """ Send a command and wait for its result. Raises an exception if the browser reports an error. """
+        return self.send_many([(method, params)], timeout)[0]
+
+    def send_many(self, commands: list, timeout: float = 30) -> list:
+        """
+        Send (method, params) commands without waiting between them, then wait for all of their results, in order.
+        The browser works on them back to back, so a batch costs one round trip instead of one per command.
+        """
+        waiters = []
+        with self._lock:
+            for method, params in commands:
+                self._next_id += 1
+                waiter = {"id": self._next_id, "method": method, "event": threading.Event()}
+                self._pending[waiter["id"]] = waiter
+                self._socket.send(json.dumps({"id": waiter["id"], "method": method, "params": params or {}}))
+                waiters.append(waiter)
+
+        deadline = time.time() + timeout
+        results = []
+        for waiter in waiters:
+            if not waiter["event"].wait(max(deadline - time.time(), 0)):
+                for pending in waiters:
+                    self._pending.pop(pending["id"], None)
+                raise TimeoutError(f"No answer to {waiter['method']} within {timeout} seconds")
+            message = waiter["message"]
+            if "error" in message:
+                raise Exception(f"{waiter['method']} failed: {message['error'].get('message')}")
+            results.append(message.get("result", {}))
+        return results
+
+    def on(self, event: str, handler):
+        """ Call handler(params) for every event of the given name. """
+        self._handlers[event] = handler
+
+    def close(self):
+        self._closed = True
+        self._events.put(None)
+        try:
+            self._socket.close()
+        except Exception:
+            pass
+
+    def _read(self):
+        while not self._closed:
+            try:
+                message = json.loads(self._socket.recv())
+            except Exception:
+                break
+            if "id" in message:
+                waiter = self._pending.pop(message["id"], None)
+                if waiter is not None:
+                    waiter["message"] = message
+                    waiter["event"].set()
+            else:
+                self._events.put(message)
+        self._events.put(None)
+
+    def _dispatch(self):
+        while True:
+            message = self._events.get()
+            if message is None:
+                break
+            handler = self._handlers.get(message.get("method"))
+            if handler is not None:
+                try:
+                    handler(message.get("params", {}))
+                except Exception as e:
+                    print(f"Error handling {message.get('method')}: {e}")
+
+
+def debugger_address(driver: webdriver.Chrome) -> str:
+    return driver.capabilities["goog:chromeOptions"]["debuggerAddress"]
+
+
+def browser_websocket_url(driver: webdriver.Chrome) -> str:
+    """ Find the DevTools websocket of the browser the driver controls. """
+    return requests.get(f"http://{debugger_address(driver)}/json/version").json()["webSocketDebuggerUrl"]
+
+
+def page_websocket_url(driver: webdriver.Chrome) -> str:
+    """ Find the DevTools websocket of the page the driver controls. """
+    targets = requests.get(f"http://{debugger_address(driver)}/json").json()
+    pages = [target for target in targets if target.get("type") == "page"]
+    handle = driver.current_window_handle
+    for target in pages:
+        if handle.endswith(target["id"]):
+            return target["webSocketDebuggerUrl"]
+    return pages[0]["webSocketDebuggerUrl"]
@@ -0,0 +1,324 @@
+import json
+from selenium import webdriver
+from selenium.common import JavascriptException, NoSuchElementException, StaleElementReferenceException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webelement import WebElement
+from ElementExtraction.devtools import DevToolsSession
+
+# Defined at the start of every expression the facade evaluates. Elements found through the facade are kept in
+# window.__genA11yFound, one array per batch, and referred to from Python as (batch, index).
+PRELUDE_SCRIPT = """
+const registry = window.__genA11yFound || (window.__genA11yFound = []);
+function register(nodes) {
+    registry.push(nodes);
+    return [registry.length - 1, nodes.length];
+}
+function ref(reference) {
+    const batch = registry[reference[0]];
+    if (!batch || !batch[reference[1]] || !batch[reference[1]].isConnected) {
+        throw new Error('stale element reference');
+    }
+    return batch[reference[1]];
+}
+function displayed(el) {
+    return el.checkVisibility ? el.checkVisibility() : el.getClientRects().length > 0;
+}
+function attribute(el, name) {
+    if (['outerHTML', 'innerHTML', 'textContent', 'innerText'].includes(name)) {
+        return el[name];
+    }
+    if (name === 'style' && el.style) {
+        // As Selenium: the declarations of the style attribute, serialized by the browser
+        return el.style.cssText;
+    }
+    const property = el[name];
+    if (property !== undefined && property !== null && typeof property !== 'object' && typeof property !== 'function') {
+        return typeof property === 'boolean' ? (property ? 'true' : null) : String(property);
+    }
+    return el.getAttribute(name);
+}
+function field(el, f) {
+    switch (f[0]) {
+        case 'attribute': return attribute(el, f[1]);
+        case 'css': return getComputedStyle(el).getPropertyValue(f[1]);
+        case 'pseudo': return getComputedStyle(el, f[1]).getPropertyValue(f[2]);
+        case 'text': return displayed(el) ? (el.innerText ?? el.textContent) : '';
+        case 'tag': return el.tagName.toLowerCase();
+        case 'displayed': return displayed(el);
+        case 'rect': {
+            const r = el.getBoundingClientRect();
+            return {x: r.left + window.scrollX, y: r.top + window.scrollY, width: r.width, height: r.height};
+        }
+    }
+}
+function find(by, value, root) {
+    if (by === 'xpath') {
+        const result = document.evaluate(value, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        const nodes = [];
+        for (let i = 0; i < result.snapshotLength; i++) {
+            if (result.snapshotItem(i).nodeType === Node.ELEMENT_NODE) {
+                nodes.push(result.snapshotItem(i));
+            }
+        }
+        return nodes;
+    }
+    return Array.from(root.querySelectorAll(value));
+}
+function wrap(value) {
+    if (value instanceof Element) {
+        return {__genA11yElement: [register([value])[0], 0]};
+    }
+    if (Array.isArray(value) || value instanceof NodeList || value instanceof HTMLCollection) {
+        return Array.from(value, wrap);
+    }
+    if (value && Object.getPrototypeOf(value) === Object.prototype) {
+        return Object.fromEntries(Object.entries(value).map(([key, item]) => [key, wrap(item)]));
+    }
+    return value;
+}
+function unwrap(value) {
+    if (value && value.__genA11yElement) {
+        return ref(value.__genA11yElement);
+    }
+    if (Array.isArray(value)) {
+        return value.map(unwrap);
+    }
+    return value;
+}
+"""
+
+
+def css_selector(by: str, value: str):
+    """ The CSS selector equivalent to a Selenium locator, or None if it has none. """
+    if by == By.CSS_SELECTOR:
+        return value
+    if by == By.TAG_NAME:
+        return value
+    if by == By.ID:
+        return f'[id="{value}"]'
+    if by == By.NAME:
+        return f'[name="{value}"]'
+    if by == By.CLASS_NAME:
+        return f".{value}"
+    return None
+
+
+class ElementBatch:
+    """ Elements found together. A value is read for all of them at once, the first time one of them needs it. """
+
+    def __init__(self, facade, batch_id: int, size: int):
+        self.facade = facade
+        self.batch_id = batch_id
+        self.size = size
+        self.values = {}
+
+    def get(self, field: tuple) -> list:
+        if field not in self.values:
+            self.facade.prefetch_batch(self, [field])
+        return self.values[field]
+
+
+class DevToolsElement:
+    """
+    An element found through DevToolsDriver. Reads are answered from the values of its batch; anything else,
+    such as click() or screenshot(), goes to the Selenium element it stands for.
+    """
+
+    def __init__(self, batch: ElementBatch, index: int):
+        self._batch = batch
+        self._index = index
+        # Values read again after a script changed the element, which no longer match the batch
+        self._values = None
+
+    @property
+    def reference(self) -> list:
+        return [self._batch.batch_id, self._index]
+
+    def _get(self, field: tuple):
+        if self._values is None:
+            return self._batch.get(field)[self._index]
+        if field not in self._values:
+            self._values[field] = self._batch.facade.evaluate(
+                f"field(ref({json.dumps(self.reference)}), {json.dumps(field)})")
+        return self._values[field]
+
+    def invalidate(self):
+        """ Stop answering from the batch, after a script may have changed the element. """
+        self._values = {}
+
+    def get_attribute(self, name: str):
+        return self._get(("attribute", name))
+
+    def computed_style(self, name: str, pseudo: str = None) -> str:
+        """ The value of getComputedStyle(), unlike value_of_css_property() which converts colors to rgba. """
+        return self._get(("pseudo", pseudo, name) if pseudo else ("css", name))
+
+    def value_of_css_property(self, name: str) -> str:
+        return self._get(("css", name))
+
+    def is_displayed(self) -> bool:
+        return self._get(("displayed",))
+
+    @property
+    def text(self) -> str:
+        return self._get(("text",))
+
+    @property
+    def tag_name(self) -> str:
+        return self._get(("tag",))
+
+    @property
+    def rect(self) -> dict:
+        return self._get(("rect",))
+
+    @property
+    def location(self) -> dict:
+        rect = self.rect
+        return {"x": round(rect["x"]), "y": round(rect["y"])}
+
+    @property
+    def size(self) -> dict:
+        rect = self.rect
+        return {"height": rect["height"], "width": rect["width"]}
+
+    def find_elements(self, by=By.ID, value: str = None) -> list:
+        return self._batch.facade.find_elements(by, value, self)
+
+    def find_element(self, by=By.ID, value: str = None):
+        return self._batch.facade.find_element(by, value, self)
+
+    def to_webelement(self) -> WebElement:
+        return self._batch.facade.to_webelement(self)
+
+    def __getattr__(self, name: str):
+        return getattr(self.to_webelement(), name)
+
+
+class DevToolsDriver:
+    """
+    A facade over a Selenium Chrome driver that answers element lookups, element reads and scripts over a
+    persistent DevTools connection instead of one WebDriver request each. Elements found together are read in
+    batches: the first get_attribute('style') of an element reads the style of every element found with it, and
+    prefetch() reads several values for all of them in one pipelined round trip. Values are snapshots; a script
+    run through the facade makes the elements passed to it read their values again. Everything else goes to the
+    wrapped driver, so extractors written for Selenium work unchanged.
+    """
+
+    def __init__(self, driver: webdriver.Chrome):
+        self._driver = driver
+        self._session = DevToolsSession(driver)
+
+    def __getattr__(self, name: str):
+        return getattr(self._driver, name)
+
+    def close(self):
+        """ Release the elements found through the facade, then the connection. """
+        try:
+            self._session.send("Runtime.evaluate", {"expression": "delete window.__genA11yFound"})
+        except Exception as e:
+            print(f"Error releasing the elements of the DevTools facade: {e}")
+        finally:
+            self._session.close()
+
+    def _expression(self, body: str) -> dict:
+        return {"expression": f"(() => {{ {PRELUDE_SCRIPT}\nreturn {body}; }})()", "returnByValue": True}
+
+    @staticmethod
+    def _value(result: dict):
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            message = details.get("exception", {}).get("description") or details.get("text") or \
+                "JavaScript exception"
+            if "stale element reference" in message:
+                raise StaleElementReferenceException(message)
+            raise JavascriptException(message)
+        return result["result"].get("value")
+
+    def evaluate(self, body: str):
+        """ Evaluate an expression, with the prelude functions defined, and return its value. """
+        return self._value(self._session.send("Runtime.evaluate", self._expression(body)))
+
+    def evaluate_many(self, bodies: list) -> list:
+        results = self._session.send_many([("Runtime.evaluate", self._expression(body)) for body in bodies])
+        return [self._value(result) for result in results]
+
+    def find_elements(self, by=By.ID, value: str = None, context: DevToolsElement = None) -> list:
+        if by != By.XPATH and css_selector(by, value) is None:
+            # Link text locators have no DOM equivalent, let Selenium find them
+            root = context.to_webelement() if context is not None else self._driver
+            return root.find_elements(by, value)
+        locator = ["xpath", value] if by == By.XPATH else ["css", css_selector(by, value)]
+        root = f"ref({json.dumps(context.reference)})" if context is not None else "document"
+        batch_id, size = self.evaluate(f"register(find({json.dumps(locator[0])}, {json.dumps(locator[1])}, {root}))")
+        batch = ElementBatch(self, batch_id, size)
+        return [DevToolsElement(batch, index) for index in range(size)]
+
+    def find_element(self, by=By.ID, value: str = None, context: DevToolsElement = None):
+        elements = self.find_elements(by, value, context)
+        if not elements:
+            raise NoSuchElementException(f"No element matches {by} {value}")
+        return elements[0]
+
+    def prefetch(self, elements: list, fields: list):
+        """ Read the given fields, e.g. ("css", "color") or ("attribute", "style"), for all the batches of elements. """
+        batches = {element._batch.batch_id: element._batch for element in elements
+                   if isinstance(element, DevToolsElement)}
+        for batch in batches.values():
+            self.prefetch_batch(batch, fields)
+
+    def prefetch_batch(self, batch: ElementBatch, fields: list):
+        missing = [field for field in fields if field not in batch.values]
+        values = self.evaluate_many([f"registry[{batch.batch_id}].map(el => field(el, {json.dumps(field)}))"
+                                     for field in missing])
+        batch.values.update(zip(missing, values))
+
+    def _encode(self, value):
+        if isinstance(value, DevToolsElement):
+            return {"__genA11yElement": value.reference}
+        if isinstance(value, (list, tuple)):
+            return [self._encode(item) for item in value]
+        return value
+
+    def _decode(self, value):
+        if isinstance(value, dict):
+            if "__genA11yElement" in value and len(value) == 1:
+                batch_id, index = value["__genA11yElement"]
+                return DevToolsElement(ElementBatch(self, batch_id, 1), index)
+            return {key: self._decode(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._decode(item) for item in value]
+        return value
+
+    def execute_script(self, script: str, *args):
+        if any(isinstance(arg, WebElement) for arg in args):
+            return self._driver.execute_script(script, *[self._to_selenium(arg) for arg in args])
+        for arg in args:
+            if isinstance(arg, DevToolsElement):
+                arg.invalidate()
+        body = f"wrap((function () {{ {script}\n}}).apply(window, unwrap({json.dumps(self._encode(list(args)))})))"
+        return self._decode(self.evaluate(body))
+
+    def execute_async_script(self, script: str, *args):
+        return self._driver.execute_async_script(script, *[self._to_selenium(arg) for arg in args])
+
+    def _to_selenium(self, value):
+        if isinstance(value, DevToolsElement):
+            value.invalidate()
+            return value.to_webelement()
+        return value
+
+    def to_webelement(self, element: DevToolsElement) -> WebElement:
+        """ The Selenium element a facade element stands for. """
+        return self._driver.execute_script("return window.__genA11yFound[arguments[0]][arguments[1]];",
+                                           *element.reference)
+
+
+def devtools_facade(driver: webdriver.Chrome):
+    """ Wrap the driver in a DevToolsDriver, or return it as it is if the browser has no DevTools endpoint. """
+    if isinstance(driver, DevToolsDriver):
+        return driver
+    try:
+        return DevToolsDriver(driver)
+    except Exception as e:
+        print(f"DevTools transport not available, using WebDriver: {e}")
+        return driver
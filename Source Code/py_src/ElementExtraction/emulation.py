@@ -0,0 +1,54 @@
+from selenium import webdriver
+
+# Screen orientations of the orientation check, as a tablet held either way
+PORTRAIT = {"width": 768, "height": 1024, "orientation": {"type": "portraitPrimary", "angle": 0}}
+LANDSCAPE = {"width": 1024, "height": 768, "orientation": {"type": "landscapePrimary", "angle": 90}}
+
+WAIT_FOR_LAYOUT_SCRIPT = """
+const done = arguments[arguments.length - 1];
+requestAnimationFrame(() => requestAnimationFrame(done));
+"""
+
+
+def wait_for_layout(driver: webdriver.Chrome):
+    """ Wait until the browser has painted two frames, so the page has laid itself out again. """
+    driver.execute_async_script(WAIT_FOR_LAYOUT_SCRIPT)
+
+
+def emulate_viewport(driver: webdriver.Chrome, width: int, height: int, scale_factor: float = 1,
+                     orientation: dict = None):
+    """
+    Give the page a viewport of width x height CSS pixels, drawn with scale_factor device pixels per CSS pixel,
+    through the DevTools emulation. The page sees the new size, media queries and orientation as on a real device,
+    without the window being resized.
+    """
+    params = {"width": width, "height": height, "deviceScaleFactor": scale_factor, "mobile": False}
+    if orientation is not None:
+        params["screenOrientation"] = orientation
+    driver.execute_cdp_cmd("Emulation.setDeviceMetricsOverride", params)
+    wait_for_layout(driver)
+
+
+def emulate_zoom(driver: webdriver.Chrome, level: int, width: int = None, height: int = None):
+    """
+    Emulate browser zoom at level percent of a window of width x height CSS pixels, the current window by default.
+    As with the zoom of the browser, the viewport shrinks by the zoom factor and each CSS pixel gets bigger, so
+    the page reflows and its breakpoints apply.
+    """
+    clear_emulation(driver)
+    window_width, window_height, pixel_ratio = driver.execute_script(
+        "return [window.innerWidth, window.innerHeight, window.devicePixelRatio];")
+    width, height = width or window_width, height or window_height
+    factor = level / 100
+    emulate_viewport(driver, round(width / factor), round(height / factor), (pixel_ratio or 1) * factor)
+
+
+def emulate_orientation(driver: webdriver.Chrome, orientation: dict):
+    """ Emulate a screen held in one of the orientations, PORTRAIT or LANDSCAPE. """
+    emulate_viewport(driver, orientation["width"], orientation["height"], orientation=orientation["orientation"])
+
+
+def clear_emulation(driver: webdriver.Chrome):
+    """ Give the page the size and scale of the window back. """
+    driver.execute_cdp_cmd("Emulation.clearDeviceMetricsOverride", {})
+    wait_for_layout(driver)
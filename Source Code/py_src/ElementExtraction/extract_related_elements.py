@@ -7,39 +7,43 @@ import os
 import re
 import time
 from io import BytesIO
-from urllib.parse import urlparse
+from urllib.parse import urljoin, urlparse
 import cv2
 import imagehash
 import numpy as np
 from PIL import Image
 from bs4 import BeautifulSoup
 from selenium import webdriver
-from selenium.common import NoSuchElementException, StaleElementReferenceException
+from selenium.common import NoSuchElementException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from consts import TEMP_FILE_FOLDER
+from metrics import add_time, timed_extractor
+from ElementExtraction.page_readiness import wait_for_page_ready
+from ElementExtraction.devtools_driver import DevToolsElement, devtools_facade
+from ElementExtraction.accessibility_tree import AccessibilityIndex, get_accessibility_index
+from ElementExtraction.page_model import PageModel, get_page_model, set_attribute
+from ElementExtraction.stabilization import stabilize_rendering
+from ElementExtraction.text_colors import read_text_colors
+from ElementExtraction.virtual_time import media_playback_rate, page_clock
+from ElementExtraction.emulation import LANDSCAPE, PORTRAIT, clear_emulation, emulate_orientation, emulate_zoom
 from A11yDetector.llm_helper import detect_sensory_instructions
 
 
-def wait_for_load(driver, timeout=30):
-    """ Wait for the page to fully load, including dynamic content. """
-    start_time = time.time()
+# Most viewports captured for one full-page screenshot
+MAX_SCROLL_SCREENSHOTS = 10
 
-    def is_page_loaded():
-        return driver.execute_script("""
-            return document.readyState === 'complete' && 
-                   (typeof jQuery === 'undefined' || jQuery.active === 0) &&
-                   (typeof angular === 'undefined' || !angular.element(document).injector() || !angular.element(document).injector().get('$http').pendingRequests.length) &&
-                   (typeof Ext === 'undefined' || !Ext.Ajax.isLoading()) &&
-                   (!window.performance.timing || window.performance.timing.loadEventEnd > 0);
-        """)
 
-    while True:
-        if is_page_loaded():
-            return time.time() - start_time
-        if time.time() - start_time > timeout:
-            raise Exception("Timed out waiting for page load.")
-        time.sleep(0.5)
+def wait_for_load(driver, timeout=30, eager=False):
+    """
+    Wait for the page to be ready for extraction: DOM parsed, network idle and DOM mutations settled
+    (see page_readiness.py). In eager mode only the DOM is awaited, for extractors that do not need images.
+    """
+    start_time = time.time()
+    try:
+        return wait_for_page_ready(driver, timeout, eager=eager)
+    finally:
+        add_time("wait_for_load", time.time() - start_time)
 
 
 async def extract_elements_long_delay(url: str) -> dict:
@@ -216,6 +220,7 @@ def extract_related_elements(url) -> dict:
     return results
 
 
+@timed_extractor
 def extract_page_title(driver: webdriver.Chrome) -> dict:
     """ Extract the page title as well as the related plain text from the HTML content."""
 
@@ -226,6 +231,20 @@ def extract_page_title(driver: webdriver.Chrome) -> dict:
     plain_text = driver.find_element(By.TAG_NAME, 'body').text
     # Remove newline characters and make it one line
     plain_text = plain_text.replace('\n', ' ')
+    return page_title_portion(title, plain_text)
+
+
+def page_title_from_model(model: PageModel) -> dict:
+    # The first title element outside of SVG images gives the title, like document.title
+    titles = [title for title in model.by_tag('title')
+              if not any(model.tag(ancestor) == 'svg' for ancestor in model.ancestors(title))]
+    title = model.text_content(titles[0]) if titles else ""
+    bodies = model.by_tag('body')
+    plain_text = model.rendered_text(bodies[0]) if bodies else ""
+    return page_title_portion(title, plain_text)
+
+
+def page_title_portion(title: str, plain_text: str) -> dict:
     length = len(plain_text)
     portion_length = int(length * 0.5)
     page_title_dict = {
@@ -256,6 +275,7 @@ def convert_to_absolute(base, relative):
     return base + relative
 
 
+@timed_extractor
 def extract_related_visual_elements(driver: webdriver.Chrome) -> dict:
     """Extract various visual elements from the HTML content."""
 
@@ -291,30 +311,29 @@ def extract_related_visual_elements(driver: webdriver.Chrome) -> dict:
     else:
         base_url = current_url
 
-    # Extract elements
-    applet_elements = [clean_html(elem.get_attribute('outerHTML')) for elem in
-                       driver.find_elements(By.TAG_NAME, 'applet')]
-    img_elements = [clean_html(elem.get_attribute('outerHTML')) for elem in driver.find_elements(By.TAG_NAME, 'img')]
-    svg_elements = [clean_html(elem.get_attribute('outerHTML')) for elem in driver.find_elements(By.TAG_NAME, 'svg')]
-    canvas_elements = [clean_html(elem.get_attribute('outerHTML')) for elem in
-                       driver.find_elements(By.TAG_NAME, 'canvas')]
-    img_within_a_elements = [clean_html(img.find_element(By.XPATH, './..').get_attribute('outerHTML')) for img in
-                             driver.find_elements(By.XPATH, '//a//img')]
-    area_within_map_elements = [clean_html(elem.get_attribute('outerHTML')) for elem in
-                                driver.find_elements(By.XPATH, '//map//area')]
-    graphics_role_elements = [clean_html(elem.get_attribute('outerHTML')) for elem in
-                              driver.find_elements(By.XPATH, '//*[@role="graphics"]')]
-    img_role_elements = [clean_html(elem.get_attribute('outerHTML')) for elem in
-                         driver.find_elements(By.XPATH, '//*[@role="img"]')]
-    input_image_elements = [clean_html(elem.get_attribute('outerHTML')) for elem in
-                            driver.find_elements(By.XPATH, '//input[@type="image"]')]
-    map_elements = [clean_html(elem.get_attribute('outerHTML')) for elem in driver.find_elements(By.TAG_NAME, 'map')]
-    object_elements = [clean_html(elem.get_attribute('outerHTML')) for elem in
-                       driver.find_elements(By.TAG_NAME, 'object')]
-    audio_elements = [clean_html(elem.get_attribute('outerHTML')) for elem in
-                      driver.find_elements(By.TAG_NAME, 'audio')]
-    video_elements = [clean_html(elem.get_attribute('outerHTML')) for elem in
-                      driver.find_elements(By.TAG_NAME, 'video')]
+    # Extract elements from the snapshot of the page
+    model = get_page_model(driver)
+
+    def outer_htmls(elements):
+        return [clean_html(model.outer_html(elem)) for elem in elements]
+
+    def has_ancestor(elem, tag):
+        return any(model.tag(ancestor) == tag for ancestor in model.ancestors(elem))
+
+    applet_elements = outer_htmls(model.by_tag('applet'))
+    img_elements = outer_htmls(model.by_tag('img'))
+    svg_elements = outer_htmls(model.by_tag('svg'))
+    canvas_elements = outer_htmls(model.by_tag('canvas'))
+    img_within_a_elements = outer_htmls([model.parent(img) for img in model.by_tag('img') if has_ancestor(img, 'a')])
+    area_within_map_elements = outer_htmls([area for area in model.by_tag('area') if has_ancestor(area, 'map')])
+    graphics_role_elements = outer_htmls(model.with_attribute('role', 'graphics'))
+    img_role_elements = outer_htmls(model.with_attribute('role', 'img'))
+    input_image_elements = outer_htmls([elem for elem in model.by_tag('input')
+                                        if model.attribute(elem, 'type') == 'image'])
+    map_elements = outer_htmls(model.by_tag('map'))
+    object_elements = outer_htmls(model.by_tag('object'))
+    audio_elements = outer_htmls(model.by_tag('audio'))
+    video_elements = outer_htmls(model.by_tag('video'))
     background_image_elements = driver.execute_script('''
         return Array.from(document.querySelectorAll('*'))
             .filter(el => {
@@ -338,10 +357,7 @@ def extract_related_visual_elements(driver: webdriver.Chrome) -> dict:
     background_image_elements = [html.replace('&quot;', '') for html in background_image_elements]
 
     # Extract associated aria-label or aria-labelledby attributes for img role elements
-    img_role_aria_labels = [
-        (clean_html(elem.get_attribute('outerHTML')))
-        for elem in driver.find_elements(By.XPATH, '//*[@role="img"]')
-    ]
+    img_role_aria_labels = img_role_elements
 
     img_str_elements = [str(img) for img in img_elements]
 
@@ -389,27 +405,32 @@ def extract_related_visual_elements(driver: webdriver.Chrome) -> dict:
     return all_elements
 
 
+@timed_extractor
 def extract_lang_attr(driver: webdriver.Chrome) -> dict:
     """ Extract the lang attribute from the HTML content. """
+    return lang_attr_from_model(get_page_model(driver))
+
+
+def lang_attr_from_model(model: PageModel) -> dict:
     lang_only_elements = []
     lang_and_xml_lang_elements = []
 
     # Extract the lang attribute of the <html> tag without its children
-    html_tag = driver.find_element(By.TAG_NAME, 'html')
-    html_tag_lang = html_tag.get_attribute('lang')
-    html_tag_xml_lang = html_tag.get_attribute('xml:lang')
+    html_tag = model.elements[0]
+    html_tag_lang = model.attribute(html_tag, 'lang')
+    html_tag_xml_lang = model.attribute(html_tag, 'xml:lang')
     if html_tag_lang and html_tag_xml_lang:
         lang_and_xml_lang_elements.append(f'<html lang="{html_tag_lang}" xml:lang="{html_tag_xml_lang}"></html>')
     elif html_tag_lang:
         lang_only_elements.append(f'<html lang="{html_tag_lang}"></html>')
 
     # Find all elements with the lang attribute
-    elements_with_lang = driver.find_elements(By.XPATH, '//*[@lang and not(self::html)]')
+    elements_with_lang = [element for element in model.with_attribute('lang') if model.tag(element) != 'html']
 
     # Process elements to separate those with only lang and those with both lang and xml:lang
     for element in elements_with_lang:
-        outer_html = element.get_attribute('outerHTML')
-        if element.get_attribute('xml:lang'):
+        outer_html = model.outer_html(element)
+        if model.attribute(element, 'xml:lang'):
             lang_and_xml_lang_elements.append(outer_html)
         else:
             lang_only_elements.append(outer_html)
@@ -422,6 +443,7 @@ def extract_lang_attr(driver: webdriver.Chrome) -> dict:
             "lang_and_xml": lang_and_xml_lang_output}
 
 
+@timed_extractor
 def extract_img_urls(driver: webdriver.Chrome) -> set:
     current_url = driver.current_url
     parsed_url = urlparse(current_url)
@@ -452,104 +474,88 @@ def extract_img_urls(driver: webdriver.Chrome) -> set:
     return absolute_image_sources
 
 
+@timed_extractor
 def extract_input_elements(driver: webdriver.Chrome) -> dict:
     """ Extract input elements from the HTML content. """
+    return input_elements_from_model(get_page_model(driver))
+
 
+def input_elements_from_model(model: PageModel) -> dict:
     # Find all label elements that have a 'for' attribute
-    labels = driver.find_elements(By.XPATH, "//label[@for]")
+    labels = [element for element in model.with_attribute('for') if model.tag(element) == 'label']
 
     # Initialize a dictionary to hold label-input pairs
     label_input_pairs = {}
 
     # Loop through each label and find the corresponding input by its id
     for label in labels:
-        try:
-            input_id = label.get_attribute('for')
-            input_element = driver.find_element(By.ID, input_id)
-            label_text = label.text
-            input_html = input_element.get_attribute('outerHTML')
-
-            # Store the label text and the entire HTML of the input in the dictionary
-            label_input_pairs[label_text] = input_html
-        except:
+        input_element = model.element_by_id(model.attribute(label, 'for'))
+        if input_element is None:
             continue
+        # Store the label text and the entire HTML of the input in the dictionary
+        label_input_pairs[model.rendered_text(label)] = model.outer_html(input_element)
     return label_input_pairs
 
 
-def get_label_html_with_inline_styles(label):
+def get_label_start_tag_with_inline_styles(model: PageModel, element: int) -> str:
     """
-    Retrieves a label's HTML with relevant CSS properties applied as inline styles.
+    The start tag of an element, or for a label with a 'for' attribute, a label start tag with relevant CSS
+    properties applied as inline styles.
     """
+    if model.tag(element) != 'label' or not model.attribute(element, 'for'):
+        return model.nodes[element]['start']
     css_properties = ['display', 'visibility', 'opacity', 'position', 'left', 'top', 'right', 'bottom', 'z-index']
-    style_str = "; ".join(f"{prop}: {label.value_of_css_property(prop)}" for prop in css_properties)
+    style_str = "; ".join(f"{prop}: {model.style(element, prop)}" for prop in css_properties)
+    return f'<label style="{style_str}" for="{model.attribute(element, "for")}">'
 
-    # Include the 'for' attribute if it exists
-    for_attribute = label.get_attribute('for')
-    if for_attribute:
-        for_attribute_str = f' for="{for_attribute}"'
-    else:
-        for_attribute_str = ''
 
-    return f'<label style="{style_str}"{for_attribute_str}>{label.get_attribute("innerHTML")}</label>'
+def find_form_containers(model: PageModel) -> list:
+    """ The outermost containers of form fields, in the order of the selectors that find them """
+    field_tags = ('input', 'textarea', 'select')
 
+    def has_fields(element):
+        return any(model.tag(descendant) in field_tags for descendant in model.descendants(element))
 
-def extract_form_elements(driver: webdriver.Chrome) -> list:
     # Define the selectors for potential root containers
     container_selectors = [
-        "form",
-        "div[role='form']",
-        "div[role='radiogroup']",
-        "div[role='group']",
-        "fieldset",
-        "section:has(input, textarea, select)",
-        "article:has(input, textarea, select)"
+        lambda element: model.tag(element) == 'form',
+        lambda element: model.tag(element) == 'div' and model.attribute(element, 'role') == 'form',
+        lambda element: model.tag(element) == 'div' and model.attribute(element, 'role') == 'radiogroup',
+        lambda element: model.tag(element) == 'div' and model.attribute(element, 'role') == 'group',
+        lambda element: model.tag(element) == 'fieldset',
+        lambda element: model.tag(element) == 'section' and has_fields(element),
+        lambda element: model.tag(element) == 'article' and has_fields(element)
     ]
+    containers = [element for selector in container_selectors for element in model.elements if selector(element)]
+
+    # Filter out the containers nested in another container
+    container_set = set(containers)
+    return [container for container in containers
+            if not any(ancestor in container_set for ancestor in model.ancestors(container))]
+
+
+@timed_extractor
+def extract_form_elements(driver: webdriver.Chrome) -> list:
+    return form_elements_from_model(get_page_model(driver))
 
-    all_containers = []
-    all_containers_html = []
-
-    # Iterate over selectors to find all containers
-    for selector in container_selectors:
-        containers = driver.find_elements(By.CSS_SELECTOR, selector)
-        for container in containers:
-            # Modify the labels within each container
-            labels = container.find_elements(By.TAG_NAME, 'label')
-            container_html = container.get_attribute('outerHTML')
-            for label in labels:
-                if label.get_attribute('for'):  # Check if label has 'for' attribute
-                    # Update label with inline styles for visibility
-                    new_label_html = get_label_html_with_inline_styles(label)
-                    # Replace old label HTML with new HTML in the container's HTML
-                    old_label_html = label.get_attribute('outerHTML')
-                    container_html = container_html.replace(old_label_html, new_label_html)
-
-            # Add container HTML to all_containers list
-            all_containers.append(container)
-            all_containers_html.append(container_html)
-
-    # Filter out nested containers by checking containment in outerHTML
-    root_containers_html = []
-    for i, html in enumerate(all_containers_html):
-        is_root = True
-        for j, other_html in enumerate(all_containers_html):
-            if i != j and other_html.find(html) != -1:
-                is_root = False
-                break
-        if is_root:
-            root_containers_html.append(html)
 
-    return root_containers_html
+def form_elements_from_model(model: PageModel) -> list:
+    # The container HTML, with the labels updated with inline styles for visibility
+    return [model.outer_html(container, lambda element: get_label_start_tag_with_inline_styles(model, element))
+            for container in find_form_containers(model)]
 
 
+@timed_extractor
 def extract_label_in_name(driver: webdriver.Chrome) -> set:
-    # Specific HTML elements and ARIA roles with tag mapping
+    # Specific HTML elements and ARIA roles with tag mapping, as (tag, attribute it must have, attribute value)
     html_elements = {
-        'button': ['button', 'input[type="button"]', 'input[type="submit"]', 'input[type="reset"]'],
-        'checkbox': ['input[type="checkbox"]'],
-        'radio': ['input[type="radio"]'],
-        'link': ['a[href]'],
-        'option': ['option'],
-        'searchbox': ['input[type="search"]']
+        'button': [('button', None, None), ('input', 'type', 'button'), ('input', 'type', 'submit'),
+                   ('input', 'type', 'reset')],
+        'checkbox': [('input', 'type', 'checkbox')],
+        'radio': [('input', 'type', 'radio')],
+        'link': [('a', 'href', None)],
+        'option': [('option', None, None)],
+        'searchbox': [('input', 'type', 'search')]
     }
 
     aria_roles = [
@@ -558,50 +564,39 @@ def extract_label_in_name(driver: webdriver.Chrome) -> set:
         'searchbox', 'switch', 'tab', 'treeitem'
     ]
 
-    def process_elements(elements, unique_elements_html):
-        for element in elements:
-            if meets_criteria(element):
-                # Check if aria-labelledby needs to be converted to aria-label
-                aria_labelledby = element.get_attribute('aria-labelledby')
-                if aria_labelledby:
-                    # Replace aria-labelledby with aria-label
-                    labelled_element = driver.find_element(By.ID, aria_labelledby)
-                    if labelled_element:
-                        text_content = labelled_element.text.strip()
-                        driver.execute_script("arguments[0].setAttribute('aria-label', arguments[1])", element,
-                                              text_content)
-                        driver.execute_script("arguments[0].removeAttribute('aria-labelledby')", element)
-
-                # Add to set if not already included based on its outerHTML
-                unique_elements_html.add(element.get_attribute('outerHTML'))
-
-    # Set to store unique outerHTML
+    accessibility = get_accessibility_index(driver)
+    model = accessibility.model
+
+    def matches(element, selector):
+        tag, attribute, value = selector
+        if model.tag(element) != tag or attribute is None:
+            return model.tag(element) == tag
+        return model.attribute(element, attribute) is not None if value is None else \
+            model.attribute(element, attribute) == value
+
+    # Set to store unique outerHTML, with aria-labelledby replaced by the name the browser computed from it
     unique_elements_html = set()
 
     # Extract elements by HTML tag
     for element_type, selectors in html_elements.items():
         for selector in selectors:
-            try:
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                process_elements(elements, unique_elements_html)
-            except Exception as e:
-                pass
+            for element in model.elements:
+                if matches(element, selector) and meets_criteria(model, element):
+                    unique_elements_html.add(accessibility.named_outer_html(element))
 
     # Extract elements by ARIA role
     for role in aria_roles:
-        try:
-            elements = driver.find_elements(By.XPATH, f"//*[@role='{role}']")
-            process_elements(elements, unique_elements_html)
-        except Exception as e:
-            pass
+        for element in model.with_attribute('role', role):
+            if meets_criteria(model, element):
+                unique_elements_html.add(accessibility.named_outer_html(element))
 
     return unique_elements_html
 
 
-def meets_criteria(element):
-    """Check if the element has visible text and either an aria-label or aria-labelledby attribute."""
-    text = element.text.strip()
-    value = element.get_attribute('value')
+def meets_criteria(model: PageModel, element: int):
+    """Check if the element has visible text or a value."""
+    text = model.rendered_text(element).strip()
+    value = model.attribute(element, 'value')
 
     return bool(text) or bool(value)
 
@@ -628,91 +623,112 @@ def is_vertical_scrolling_needed(driver):
 
 
 # Function to take screenshots while scrolling to the bottom
-def take_screenshots_while_scrolling(driver, prefix):
+def take_screenshots_while_scrolling(driver, prefix) -> list:
+    """
+    Fallback capture for browsers without full-page screenshots: one screenshot per viewport, scrolling down
+    until the bottom of the page or MAX_SCROLL_SCREENSHOTS. Returns (file, scroll offset in device pixels) pairs.
+    """
     screenshots = []
-    total_height = driver.execute_script("return document.documentElement.scrollHeight")
     view_height = driver.execute_script("return window.innerHeight")
-    scroll_position = 0
-
-    if "after" or 'before' in prefix:
-        if 'after' in prefix:
-            threshold_length = 10
-        else:
-            threshold_length = 5
-        while scroll_position < total_height or len(screenshots) < threshold_length:
-            screenshot_name = os.path.join(TEMP_FILE_FOLDER, f"{prefix}_{len(screenshots)}.png")
-            driver.save_screenshot(screenshot_name)
-            screenshots.append(screenshot_name)
-
-            scroll_position += view_height
-            driver.execute_script(f"window.scrollTo(0, {scroll_position});")
-            time.sleep(2)  # Wait for scrolling to complete
-
-            current_scroll_position = driver.execute_script("return window.pageYOffset")
-            if current_scroll_position + view_height >= total_height:
-                # Take a final screenshot at the very bottom
-                screenshot_name = os.path.join(TEMP_FILE_FOLDER, f"{prefix}_{len(screenshots)}.png")
-                driver.save_screenshot(screenshot_name)
-                screenshots.append(screenshot_name)
-                break
-
-            # Break the loop if the limit of 30 screenshots is reached
-            if len(screenshots) >= 10:
-                break
-    else:
-        while scroll_position < total_height:
-            screenshot_name = os.path.join(TEMP_FILE_FOLDER, f"{prefix}_{len(screenshots)}.png")
-            driver.save_screenshot(screenshot_name)
-            screenshots.append(screenshot_name)
-
-            scroll_position += view_height
-            driver.execute_script(f"window.scrollTo(0, {scroll_position});")
-            time.sleep(2)  # Wait for scrolling to complete
-
-            current_scroll_position = driver.execute_script("return window.pageYOffset")
-            if current_scroll_position + view_height >= total_height:
-                # Take a final screenshot at the very bottom
-                screenshot_name = os.path.join(TEMP_FILE_FOLDER, f"{prefix}_{len(screenshots)}.png")
-                driver.save_screenshot(screenshot_name)
-                screenshots.append(screenshot_name)
-                break
+    pixel_ratio = driver.execute_script("return window.devicePixelRatio") or 1
+    previous_offset = None
+
+    while len(screenshots) < MAX_SCROLL_SCREENSHOTS:
+        driver.execute_script(f"window.scrollTo(0, {len(screenshots) * view_height});")
+        # Wait for two frames to be painted rather than a fixed delay
+        driver.execute_async_script("""
+            const done = arguments[arguments.length - 1];
+            requestAnimationFrame(() => requestAnimationFrame(done));
+        """)
+        offset = driver.execute_script("return window.pageYOffset")
+        if offset == previous_offset:
+            # The page cannot scroll any further, the last screenshot already shows its bottom
+            break
+        screenshot_name = os.path.join(TEMP_FILE_FOLDER, f"{prefix}_{len(screenshots)}.png")
+        driver.save_screenshot(screenshot_name)
+        screenshots.append((screenshot_name, int(offset * pixel_ratio)))
+        previous_offset = offset
 
+    driver.execute_script("window.scrollTo(0, 0);")
     return screenshots
 
 
 # Function to stitch screenshots together vertically
 def stitch_screenshots(screenshots, output_filename):
-    # Open all the images
-    images = [Image.open(screenshot) for screenshot in screenshots]
-
-    # Assuming all images have the same size
-    width, height = images[0].size
+    """
+    Paste (file, scroll offset) screenshots at their offsets, so the overlap of the last screenshot, which
+    stops at the bottom of the page, is drawn once instead of repeated.
+    """
+    images = [(Image.open(screenshot), offset) for screenshot, offset in screenshots]
+    width = images[0][0].size[0]
+    last_image, last_offset = images[-1]
+    stitched_image = Image.new('RGB', (width, last_offset + last_image.size[1]))
+    for image, offset in images:
+        stitched_image.paste(image, (0, offset))
 
-    # Calculate the total height of the stitched image
-    total_height = height * len(images)
+    # Save the stitched image to the specified output file
+    stitched_image.save(output_filename)
 
-    # Create a new blank image with the calculated dimensions
-    stitched_image = Image.new('RGB', (width, total_height))
 
-    # Initialize the vertical offset
-    y_offset = 0
+def capture_beyond_viewport(driver: webdriver.Chrome, output_filename: str, max_height: int):
+    """ Capture the page, up to max_height CSS pixels, in one DevTools screenshot. """
+    metrics = driver.execute_cdp_cmd("Page.getLayoutMetrics", {})
+    content_size = metrics.get("cssContentSize", metrics["contentSize"])
+    viewport = metrics.get("cssLayoutViewport", metrics["layoutViewport"])
+    result = driver.execute_cdp_cmd("Page.captureScreenshot", {
+        "format": "png",
+        "captureBeyondViewport": True,
+        # The width of the viewport, as the scrolled screenshots had
+        "clip": {"x": 0, "y": 0, "width": viewport["clientWidth"],
+                 "height": min(content_size["height"], max_height), "scale": 1}
+    })
+    with open(output_filename, "wb") as f:
+        f.write(base64.b64decode(result["data"]))
 
-    # Paste each image into the new blank image at the appropriate position
-    for image in images:
-        stitched_image.paste(image, (0, y_offset))
-        y_offset += height
 
-    # Save the stitched image to the specified output file
-    stitched_image.save(output_filename)
+def slice_screenshot(image_path: str, prefix: str, view_height: int) -> list:
+    """
+    Cut a full-page screenshot into viewport-high slices named like the scrolled screenshots. The last slice
+    is aligned with the bottom of the page instead of running past it.
+    """
+    image = Image.open(image_path)
+    width, height = image.size
+    slice_height = min(view_height, height)
+    tops = list(range(0, height - slice_height + 1, slice_height))
+    if tops[-1] + slice_height < height:
+        tops.append(height - slice_height)
+
+    slices = []
+    for index, top in enumerate(tops):
+        slice_name = os.path.join(TEMP_FILE_FOLDER, f"{prefix}_{index}.png")
+        image.crop((0, top, width, top + slice_height)).save(slice_name)
+        slices.append(slice_name)
+    return slices
+
+
+def capture_full_page(driver: webdriver.Chrome, prefix: str, output_filename: str):
+    """
+    Save a screenshot of the whole page to output_filename and its viewport-high slices as {prefix}_{i}.png.
+    Uses the DevTools capture beyond the viewport, and scrolls and stitches if the browser does not support it.
+    """
+    view_height, pixel_ratio = driver.execute_script("return [window.innerHeight, window.devicePixelRatio];")
+    try:
+        capture_beyond_viewport(driver, output_filename, view_height * MAX_SCROLL_SCREENSHOTS)
+        # The capture is in device pixels, which the emulated zoom makes bigger than CSS pixels
+        slice_screenshot(output_filename, prefix, round(view_height * (pixel_ratio or 1)))
+    except Exception as e:
+        print(f"Full-page capture failed, scrolling instead: {e}")
+        stitch_screenshots(take_screenshots_while_scrolling(driver, prefix), output_filename)
 
 
+@timed_extractor
 def extract_original_screenshot(driver: webdriver.Chrome) -> list:
     screenshot_list = []
+    stabilize_rendering(driver)
     # Check if vertical scrolling is needed before zooming
     before_scroll_needed = is_vertical_scrolling_needed(driver)
     if before_scroll_needed:
-        before_screenshots = take_screenshots_while_scrolling(driver, 'before')
-        stitch_screenshots(before_screenshots, os.path.join(TEMP_FILE_FOLDER, 'screenshot_original.png'))
+        capture_full_page(driver, 'before', os.path.join(TEMP_FILE_FOLDER, 'screenshot_original.png'))
     else:
         driver.save_screenshot(os.path.join(TEMP_FILE_FOLDER, 'screenshot_original.png'))
     files_with_before = []
@@ -727,16 +743,14 @@ def extract_original_screenshot(driver: webdriver.Chrome) -> list:
     return screenshot_list
 
 
-def extract_zoomed_screenshot(driver: webdriver.Chrome) -> list:
+def extract_zoomed_screenshot(driver: webdriver.Chrome, width: int = None, height: int = None) -> list:
     screenshot_list = []
-    set_browser_scale(200, driver)
-    time.sleep(1)  # Wait for the zoom effect to apply
+    emulate_zoom(driver, 200, width, height)
     files_with_after = []
 
     after_scroll_needed = is_vertical_scrolling_needed(driver)
     if after_scroll_needed:
-        after_screenshots = take_screenshots_while_scrolling(driver, 'after')
-        stitch_screenshots(after_screenshots, os.path.join(TEMP_FILE_FOLDER, 'screenshot_zoomed.png'))
+        capture_full_page(driver, 'after', os.path.join(TEMP_FILE_FOLDER, 'screenshot_zoomed.png'))
     else:
         driver.save_screenshot(os.path.join(TEMP_FILE_FOLDER, 'screenshot_zoomed.png'))
     for root, dirs, files in os.walk(TEMP_FILE_FOLDER):
@@ -748,13 +762,12 @@ def extract_zoomed_screenshot(driver: webdriver.Chrome) -> list:
     return screenshot_list
 
 
+@timed_extractor
 def extract_text_resizing(driver: webdriver.Chrome) -> dict:
     """ Extract the text resizing elements from the HTML content. """
     # Find all meta elements with a name attribute of "viewport"
     meta_elements = driver.find_elements(By.XPATH, '//meta[@name="viewport"]')
     text_resizing_dict = {}
-    # Store the original size
-    original_size = driver.get_window_size()
 
     # Iterate through found elements to check the content attribute
     for meta in meta_elements:
@@ -763,7 +776,6 @@ def extract_text_resizing(driver: webdriver.Chrome) -> dict:
             meta.get_attribute('outerHTML')  # Return the element's HTML if it matches the criteria
             text_resizing_dict['meta'] = meta.get_attribute('outerHTML')
             break
-    driver.set_window_size(2560, 1440)
 
     input_elements = driver.find_elements(By.TAG_NAME, 'input')
     input_lists = []
@@ -819,36 +831,30 @@ def extract_text_resizing(driver: webdriver.Chrome) -> dict:
 
         input_lists.append({input_element.get_attribute('outerHTML'): original_font_size})
     # extract_original_screenshot(driver)
-    extract_zoomed_screenshot(driver)
+    # Zoom to 200% of a 2560x1440 window
+    extract_zoomed_screenshot(driver, 2560, 1440)
     text_resizing_dict['original'] = encode_image(TEMP_FILE_FOLDER + '/screenshot_original.png')
     text_resizing_dict['zoomed'] = encode_image(TEMP_FILE_FOLDER + '/screenshot_zoomed.png')
     text_resizing_dict['input_elements'] = input_lists
-    # Execute JavaScript to reset text size back to original
-    driver.set_window_size(original_size['width'], original_size['height'])
+    clear_emulation(driver)
     return text_resizing_dict
 
 
+@timed_extractor
 def extract_text_reflow(driver) -> dict:
     text_reflow_dict = {}
-    # Store the original size
-    original_size = driver.get_window_size()
-    # Set window size to 1280x1024 CSS pixels
-    driver.set_window_size(1280, 1024)
-
-    # Zoom to 400%
-    set_browser_scale(400, driver)
+    # Zoom to 400% of a 1280x1024 window, which leaves a viewport of 320x256 CSS pixels
+    emulate_zoom(driver, 400, 1280, 1024)
 
     # Check if vertical scrolling is needed after zooming
     after_scroll_needed = is_vertical_scrolling_needed(driver)
     if after_scroll_needed:
-        after_screenshots = take_screenshots_while_scrolling(driver, 'after_zoom')
-        stitch_screenshots(after_screenshots, os.path.join(TEMP_FILE_FOLDER, 'screenshot_reflow.png'))
+        capture_full_page(driver, 'after_zoom', os.path.join(TEMP_FILE_FOLDER, 'screenshot_reflow.png'))
     else:
         driver.save_screenshot(os.path.join(TEMP_FILE_FOLDER, 'screenshot_reflow.png'))
     text_reflow_dict['original'] = encode_image(TEMP_FILE_FOLDER + '/screenshot_original.png')
     text_reflow_dict['reflow'] = encode_image(TEMP_FILE_FOLDER + '/screenshot_reflow.png')
-    driver.set_window_size(original_size['width'], original_size['height'])
-    set_browser_scale(100, driver)
+    clear_emulation(driver)
     return text_reflow_dict
 
 
@@ -863,6 +869,7 @@ def encode_image(image_path):
 
 
 # Function to find and handle various scenarios of autoplay audio elements
+@timed_extractor
 def find_autoplay_audio_elements(driver: webdriver.Chrome) -> dict:
     # Find all audio elements
     audio_elements = driver.find_elements(By.XPATH, "//audio | //video")
@@ -944,20 +951,28 @@ def is_audio_paused(driver, audio_element):
 def has_played_for_more_than(driver, media_element, seconds):
     """
     Check whether a media element (audio or video) has played for more than a specified number of seconds.
+    Media does not follow the virtual clock, so in virtual time mode it is played faster instead.
     """
-    initial_time = driver.execute_script("return arguments[0].currentTime;", media_element)
+    rate = media_playback_rate()
+    initial_time, original_rate = driver.execute_script(
+        "const rate = arguments[0].playbackRate; arguments[0].playbackRate = rate * arguments[1];"
+        "return [arguments[0].currentTime, rate];", media_element, rate)
     start_time = time.time()
 
-    while time.time() - start_time < seconds:
-        time.sleep(0.5)  # Check every 0.5 seconds
-        current_time = driver.execute_script("return arguments[0].currentTime;", media_element)
+    try:
+        while time.time() - start_time < seconds / rate:
+            time.sleep(0.5 / rate)  # Check every 0.5 seconds of media time
+            current_time = driver.execute_script("return arguments[0].currentTime;", media_element)
 
-        if current_time - initial_time >= seconds:
-            return True
+            if current_time - initial_time >= seconds:
+                return True
 
-    return False
+        return False
+    finally:
+        driver.execute_script("arguments[0].playbackRate = arguments[1];", media_element, original_rate)
 
 
+@timed_extractor
 def extract_meta_refresh(driver: webdriver.Chrome) -> list:
     """ Extract the meta refresh elements from the HTML content. """
 
@@ -979,6 +994,7 @@ def extract_meta_refresh(driver: webdriver.Chrome) -> list:
     return meta_refresh_list
 
 
+@timed_extractor
 def take_screenshots_and_compare(driver: webdriver.Chrome, duration=300, interval=5, similarity_threshold=90) -> list:
     """
     Takes screenshots of a webpage every 5 seconds for a specified duration,
@@ -989,11 +1005,13 @@ def take_screenshots_and_compare(driver: webdriver.Chrome, duration=300, interva
     previous_filename = None
     index = 1
     img_lists = []
+    # Screenshots are taken at page times, which run ahead of the real time in virtual time mode
+    clock = page_clock(driver)
     try:
         # Open the webpage
 
-        end_time = time.time() + duration
-        while time.time() < end_time:
+        elapsed = 0
+        while elapsed < duration:
             # Generate a filename with the current index
             filename = TEMP_FILE_FOLDER + f'/compare_screenshot_{index}.png'
 
@@ -1015,11 +1033,14 @@ def take_screenshots_and_compare(driver: webdriver.Chrome, duration=300, interva
             index += 1
 
             # Wait for the specified interval
-            time.sleep(interval)
+            clock.sleep(interval)
+            elapsed += interval
         return img_lists
 
     except Exception as e:
         print(f"An error occurred: {e}")
+    finally:
+        clock.close()
 
 
 def calculate_similarity(image1_path, image2_path):
@@ -1055,19 +1076,13 @@ def delete_all_files_in_folder(folder_path):
 
 def take_screenshot(driver, orientation, filename):
     """
-    Takes a screenshot of the current view.
+    Takes a screenshot of the current view, emulating a screen in the given orientation.
     """
-    time.sleep(5)
-    # Set the window size based on the orientation
-    if orientation == 'portrait':
-        driver.set_window_size(768, 1024)
-    else:  # landscape
-        driver.set_window_size(1024, 768)
-
-    time.sleep(1)  # wait for the page to adjust to the new size
+    emulate_orientation(driver, PORTRAIT if orientation == 'portrait' else LANDSCAPE)
     driver.save_screenshot(filename)
 
 
+@timed_extractor
 def check_orientation_and_transform(driver: webdriver.Chrome) -> dict:
     """
     Extracts elements using CSS transform property and takes screenshots in portrait and landscape views.
@@ -1082,23 +1097,28 @@ def check_orientation_and_transform(driver: webdriver.Chrome) -> dict:
         take_screenshot(driver, 'landscape', landscape_filename)
         orientation_dict['portrait'] = encode_image(portrait_filename)
         orientation_dict['landscape'] = encode_image(landscape_filename)
+        clear_emulation(driver)
         return orientation_dict
 
     except Exception as e:
         print(f"An error occurred: {e}")
 
 
+@timed_extractor
 def extract_multiple_ways(driver: webdriver.Chrome) -> dict:
     """
         Takes two screenshots of a webpage: one when the page first loads and one after scrolling to the bottom.
     """
     # Take the initial screenshot
+    stabilize_rendering(driver)
     initial_screenshot_path = TEMP_FILE_FOLDER + '/initial.png'
     driver.save_screenshot(initial_screenshot_path)
 
     # Scroll to the bottom of the page
     driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
     time.sleep(2)
+    # Wait for the images the scrolling loaded
+    stabilize_rendering(driver)
 
     # Take the bottom screenshot
     bottom_screenshot_path = TEMP_FILE_FOLDER + '/bottom.png'
@@ -1109,83 +1129,86 @@ def extract_multiple_ways(driver: webdriver.Chrome) -> dict:
     }
 
 
-def get_outer_html_without_children(element):
-    tag_name = element.tag_name
-    attributes = element.get_property('attributes')
-    attr_string = ' '.join([f'{attr["name"]}="{attr["value"]}"' for attr in attributes])
+def get_outer_html_without_children(model: PageModel, element: int) -> str:
+    tag_name = model.tag(element)
+    attr_string = ' '.join([f'{name}="{value}"' for name, value in model.nodes[element]['attributes'].items()])
     start_tag = f'<{tag_name} {attr_string}>'
     end_tag = f'</{tag_name}>'
-    text_content = element.text or ''
+    text_content = model.rendered_text(element)
     return f'{start_tag}{text_content}{end_tag}'
 
 
+@timed_extractor
 def extract_links(driver: webdriver.Chrome) -> list:
+    accessibility = get_accessibility_index(driver)
+    model = accessibility.model
+
     # Find all link elements and elements with role="link" on the page
-    link_elements = driver.find_elements(By.XPATH, '//a | //*[@role="link"]')
+    link_elements = [element for element in model.elements
+                     if model.tag(element) == 'a' or model.attribute(element, 'role') == 'link']
 
-    # Extract and modify the desired elements
+    # Extract the desired elements, with aria-labelledby replaced by the name the browser computed from it
     combined_elements = []
     for link in link_elements:
-        # Replace aria-labelledby with aria-label if present
-        if link.get_attribute('aria-labelledby'):
-            aria_labelledby = link.get_attribute('aria-labelledby')
-            referenced_elements = [driver.find_element(By.ID, ref_id) for ref_id in aria_labelledby.split()]
-            aria_label_text = ' '.join([elem.text for elem in referenced_elements])
-            driver.execute_script(f"arguments[0].setAttribute('aria-label', '{aria_label_text}');", link)
-            driver.execute_script("arguments[0].removeAttribute('aria-labelledby');", link)
-
         # Check if the link is nested within a table or list
-        ancestor = None
-        try:
-            ancestor = link.find_element(By.XPATH, './ancestor::table | ./ancestor::ul | ./ancestor::ol')
-        except:
-            pass
+        if any(model.tag(ancestor) in ('table', 'ul', 'ol') for ancestor in model.ancestors(link)):
+            # Links within a table or list are not listed on their own
+            continue
 
-        if ancestor:
-            combined_html = ancestor.get_attribute('outerHTML')
+        combined_html = ''
+        parent = model.parent(link)
+        if model.tag(parent) == 'body':
+            parent_html = ''
+        elif model.tag(parent) == 'a':
+            parent_html = accessibility.named_outer_html(parent)
         else:
-            combined_html = ''
-            parent = link.find_element(By.XPATH, './..')
-            if parent.tag_name.lower() == 'body':
-                parent_html = ''
-            elif parent.tag_name.lower() == 'a':
-                parent_html = parent.get_attribute('outerHTML')
-            else:
-                parent_html = get_outer_html_without_children(parent)
+            parent_html = get_outer_html_without_children(model, parent)
 
-                # Determine previous sibling's outerHTML or minimal HTML
-                prev_sibling = driver.execute_script("return arguments[0].previousElementSibling;", link)
-                if prev_sibling and prev_sibling.tag_name.lower() == 'a':
-                    prev_sibling_html = prev_sibling.get_attribute('outerHTML')
-                else:
-                    prev_sibling_html = get_outer_html_without_children(prev_sibling) if prev_sibling else ''
+            # Determine previous sibling's outerHTML or minimal HTML
+            prev_sibling = model.preceding_sibling(link)
+            if prev_sibling is not None and model.tag(prev_sibling) == 'a':
+                prev_sibling_html = accessibility.named_outer_html(prev_sibling)
+            else:
+                prev_sibling_html = get_outer_html_without_children(model, prev_sibling) \
+                    if prev_sibling is not None else ''
 
-                # Determine next sibling's outerHTML or minimal HTML
-                next_sibling = driver.execute_script("return arguments[0].nextElementSibling;", link)
-                if next_sibling and next_sibling.tag_name.lower() == 'a':
-                    next_sibling_html = next_sibling.get_attribute('outerHTML')
-                else:
-                    next_sibling_html = get_outer_html_without_children(next_sibling) if next_sibling else ''
+            # Determine next sibling's outerHTML or minimal HTML
+            next_sibling = model.following_sibling(link)
+            if next_sibling is not None and model.tag(next_sibling) == 'a':
+                next_sibling_html = accessibility.named_outer_html(next_sibling)
+            else:
+                next_sibling_html = get_outer_html_without_children(model, next_sibling) \
+                    if next_sibling is not None else ''
 
-                link_html = link.get_attribute('outerHTML')
+            link_html = accessibility.named_outer_html(link)
 
-                # Construct the combined HTML with the child nested inside the parent and two siblings
-                if parent_html == "":
-                    combined_html = f"{prev_sibling_html}{link_html}{next_sibling_html}"
-                else:
-                    combined_html = f"{parent_html}{prev_sibling_html}{link_html}{next_sibling_html}</{parent.tag_name}>"
+            # Construct the combined HTML with the child nested inside the parent and two siblings
+            if parent_html == "":
+                combined_html = f"{prev_sibling_html}{link_html}{next_sibling_html}"
+            else:
+                combined_html = (f"{parent_html}{prev_sibling_html}{link_html}{next_sibling_html}"
+                                 f"</{model.tag(parent)}>")
 
-            combined_html = combined_html.replace('\n', '').replace('\t', '')
-            combined_elements.append(combined_html.strip())
+        combined_html = combined_html.replace('\n', '').replace('\t', '')
+        combined_elements.append(combined_html.strip())
 
     return combined_elements
 
 
 def get_computed_style(driver, element, style_property):
+    if isinstance(element, DevToolsElement):
+        return element.computed_style(style_property)
     return driver.execute_script(f"return window.getComputedStyle(arguments[0]).getPropertyValue('{style_property}');",
                                  element)
 
 
+def get_pseudo_content(driver, element, pseudo_element):
+    if isinstance(element, DevToolsElement):
+        return element.computed_style('content', pseudo_element)
+    return driver.execute_script(
+        f"return window.getComputedStyle(arguments[0], '{pseudo_element}').getPropertyValue('content');", element)
+
+
 def is_rgba(color):
     return re.match(r'rgba?\(\d+,\s*\d+,\s*\d+(,\s*\d+(\.\d+)?)?\)', color) is not None
 
@@ -1210,10 +1233,28 @@ def convert_to_rgba(driver, color):
     return driver.execute_script(js_code, color)
 
 
+@timed_extractor
 def extract_contrast_related_elements(driver: webdriver.Chrome):
+    page = devtools_facade(driver)
+    try:
+        return collect_contrast_elements(page)
+    finally:
+        if page is not driver:
+            page.close()
+
+
+# Values extract_contrast_related_elements reads for every element, fetched for all of them at once
+CONTRAST_FIELDS = [("css", "background-color"), ("css", "color"), ("css", "font-size"), ("css", "font-weight"),
+                   ("css", "background-image"), ("pseudo", "::before", "content"), ("pseudo", "::after", "content"),
+                   ("text",), ("attribute", "style"), ("attribute", "outerHTML")]
+
+
+def collect_contrast_elements(driver: webdriver.Chrome):
     # Extract all elements
 
     elements = driver.find_elements(By.XPATH, "//*")
+    if hasattr(driver, "prefetch"):
+        driver.prefetch(elements, CONTRAST_FIELDS)
 
     related_elements = []
     elements_with_images = []
@@ -1227,10 +1268,8 @@ def extract_contrast_related_elements(driver: webdriver.Chrome):
         background_image = get_computed_style(driver, elem, 'background-image')
         text_content = elem.text.strip()
         # Get CSS-generated content using JavaScript
-        before_content = driver.execute_script(
-            "return window.getComputedStyle(arguments[0], '::before').getPropertyValue('content');", elem)
-        after_content = driver.execute_script(
-            "return window.getComputedStyle(arguments[0], '::after').getPropertyValue('content');", elem)
+        before_content = get_pseudo_content(driver, elem, '::before')
+        after_content = get_pseudo_content(driver, elem, '::after')
 
         # Clean up the content if necessary (remove surrounding quotes)
         before_content = before_content.strip('"') if before_content else ''
@@ -1325,155 +1364,115 @@ def extract_contrast_related_elements(driver: webdriver.Chrome):
     return related_elements, elements_with_background_image
 
 
-def extract_form_input_elements(driver: webdriver.Chrome) -> dict:
-    # Define the selectors for potential root containers
-    container_selectors = [
-        "form",
-        "div[role='form']",
-        "div[role='radiogroup']",
-        "div[role='group']",
-        "fieldset",
-        "section:has(input, textarea, select)",
-        "article:has(input, textarea, select)"
-    ]
+def capture_element_image(driver: webdriver.Chrome, rect: dict):
+    """ A base64 PNG of an area of the page, in page coordinates, without scrolling to it. """
+    if rect['width'] < 1 or rect['height'] < 1:
+        return None
+    try:
+        return driver.execute_cdp_cmd("Page.captureScreenshot", {
+            "format": "png",
+            "clip": {"x": rect['x'], "y": rect['y'], "width": rect['width'], "height": rect['height'], "scale": 1},
+            "captureBeyondViewport": True
+        })["data"]
+    except Exception as e:
+        print(f"Error capturing element image: {e}")
+        return None
 
-    all_containers = []
-    all_containers_html = []
-
-    # Iterate over selectors to find all containers
-    for selector in container_selectors:
-        containers = driver.find_elements(By.CSS_SELECTOR, selector)
-        for container in containers:
-            # Modify the labels within each container
-            labels = container.find_elements(By.TAG_NAME, 'label')
-            container_html = container.get_attribute('outerHTML')
-            for label in labels:
-                if label.get_attribute('for'):  # Check if label has 'for' attribute
-                    # Update label with inline styles for visibility
-                    new_label_html = get_label_html_with_inline_styles(label)
-                    # Replace old label HTML with new HTML in the container's HTML
-                    old_label_html = label.get_attribute('outerHTML')
-                    container_html = container_html.replace(old_label_html, new_label_html)
-
-            # Add container HTML to all_containers list
-            all_containers.append(container)
-            all_containers_html.append(container_html)
-
-    # Filter out nested containers by checking containment in outerHTML
-    root_containers_html = []
-    for i, html in enumerate(all_containers_html):
-        is_root = True
-        for j, other_html in enumerate(all_containers_html):
-            if i != j and other_html.find(html) != -1:
-                is_root = False
-                break
-        if is_root:
-            root_containers_html.append(html)
 
-    # Extract all input elements with their labels outside the root containers
-    inputs_with_labels = []
-    all_inputs = driver.find_elements(By.TAG_NAME, 'input')
-    all_text_areas = driver.find_elements(By.TAG_NAME, 'textarea')
-    all_selects = driver.find_elements(By.TAG_NAME, 'select')
-
-    for input_element in all_inputs + all_text_areas + all_selects:
-        element_html = input_element.get_attribute('outerHTML')
-        element_in_root_container = False
-        for root_html in root_containers_html:
-            if root_html.find(element_html) != -1:
-                element_in_root_container = True
-                break
-        if not element_in_root_container:
-            # Find associated label
-            label = None
-            if input_element.get_attribute('id'):
-                labels = driver.find_elements(By.CSS_SELECTOR, f"label[for='{input_element.get_attribute('id')}']")
-                if labels:
-                    label = labels[0]
-            if label:
-                # Format input nested within label
-                input_nested_label_html = f"<label>{label.text}:{element_html}</label>"
-                inputs_with_labels.append(input_nested_label_html)
+@timed_extractor
+def extract_text_colors(driver: webdriver.Chrome) -> dict:
+    """
+    The colors of every visible text element, resolved in the page without changing it, for the contrast checks
+    to measure, and a screenshot of each element whose text is over a background image or gradient, which only
+    the model can judge.
+    """
+    text_elements = read_text_colors(driver)
+    elements_with_background_image = []
+    seen = set()
+    for element in text_elements:
+        key = (element['html'], element['text'])
+        if element['background'] is not None or key in seen:
+            continue
+        seen.add(key)
+        image = capture_element_image(driver, element['rect'])
+        if image:
+            elements_with_background_image.append(dict(element, image=image))
+    return {"text_elements": text_elements, "background_image_elements": elements_with_background_image}
 
-    return {"forms": root_containers_html, "inputs": inputs_with_labels}
 
+@timed_extractor
+def extract_form_input_elements(driver: webdriver.Chrome) -> dict:
+    return form_input_elements_from_model(get_page_model(driver))
 
-def extract_headings_with_siblings(driver: webdriver.Chrome) -> list:
-    # Define the selectors for heading elements including those with role "heading"
-    heading_selectors = [
-        "h1", "h2", "h3", "h4", "h5", "h6",
-        "[role='heading']"
-    ]
 
-    headings_with_siblings = []
+def form_input_elements_from_model(model: PageModel) -> dict:
+    root_containers = find_form_containers(model)
+    root_containers_html = form_elements_from_model(model)
+    in_root_container = {descendant for container in root_containers for descendant in model.descendants(container)}
 
-    # Iterate over selectors to find all heading elements
-    for selector in heading_selectors:
-        headings = driver.find_elements(By.CSS_SELECTOR, selector)
-        for heading in headings:
-            heading_html = heading.get_attribute('outerHTML')
-            siblings_html = []
+    # The first label of each id, as label[for='id'] finds it
+    labels_by_for = {}
+    for label in reversed(model.by_tag('label')):
+        if model.attribute(label, 'for') is not None:
+            labels_by_for[model.attribute(label, 'for')] = label
 
-            # Get the next two siblings
-            sibling = heading
-            for _ in range(2):
-                try:
-                    sibling = sibling.find_element(By.XPATH, 'following-sibling::*[1]')
-                    siblings_html.append(sibling.get_attribute('outerHTML'))
-                except NoSuchElementException:
-                    break
+    # Extract all input elements with their labels outside the root containers
+    inputs_with_labels = []
+    for input_element in model.by_tags_in_turn(('input', 'textarea', 'select')):
+        if input_element in in_root_container or not model.attribute(input_element, 'id'):
+            continue
+        # Find associated label
+        label = labels_by_for.get(model.attribute(input_element, 'id'))
+        if label is not None:
+            # Format input nested within label
+            inputs_with_labels.append(f"<label>{model.rendered_text(label)}:{model.outer_html(input_element)}</label>")
 
-            # Format the output as a single string
-            formatted_output = heading_html + ' ' + ' '.join(siblings_html)
-            headings_with_siblings.append(formatted_output)
+    return {"forms": root_containers_html, "inputs": inputs_with_labels}
 
-    return headings_with_siblings
+
+@timed_extractor
+def extract_headings_with_siblings(driver: webdriver.Chrome) -> list:
+    model = get_page_model(driver)
+    return [heading_with_siblings(model, heading) for heading in find_headings(model, model.elements)]
+
+
+def find_headings(model: PageModel, elements: list) -> list:
+    """ The h1 to h6 elements, then the elements with role "heading", among the given elements """
+    headings = []
+    for tag in ["h1", "h2", "h3", "h4", "h5", "h6"]:
+        headings += [element for element in elements if model.tag(element) == tag]
+    headings += [element for element in elements if model.attribute(element, 'role') == 'heading']
+    return headings
+
+
+def heading_with_siblings(model: PageModel, heading: int) -> str:
+    """ The outerHTML of a heading followed by that of its next two siblings """
+    siblings_html = []
+    sibling = heading
+    for _ in range(2):
+        sibling = model.following_sibling(sibling)
+        if sibling is None:
+            break
+        siblings_html.append(model.outer_html(sibling))
+    return model.outer_html(heading) + ' ' + ' '.join(siblings_html)
 
 
+@timed_extractor
 def extract_headings_under_sections(driver: webdriver.Chrome) -> list:
     sections_data = []
+    model = get_page_model(driver)
 
-    # Find all section elements
-    sections = driver.find_elements(By.TAG_NAME, 'section')
-
-    for section in sections:
+    for section in model.by_tag('section'):
         # Extract the section HTML without children
-        section_html = section.get_attribute('outerHTML').split('>')[0] + '>'
+        section_html = model.outer_html(section).split('>')[0] + '>'
         section_data = {
             'html': section_html,
             'no_heading': True  # Assume no heading by default
         }
 
-        # Define the selectors for heading elements including those with role "heading"
-        heading_selectors = [
-            "h1", "h2", "h3", "h4", "h5", "h6",
-            "[role='heading']"
-        ]
-
-        headings_html_list = []
-
         # Check for headings within the section
-        for selector in heading_selectors:
-            headings = section.find_elements(By.CSS_SELECTOR, selector)
-            for heading in headings:
-                heading_html = heading.get_attribute('outerHTML')
-                siblings_html = []
-
-                # Get the next two siblings
-                sibling = heading
-                for _ in range(2):
-                    try:
-                        sibling = sibling.find_element(By.XPATH, 'following-sibling::*[1]')
-                        if sibling:
-                            siblings_html.append(sibling.get_attribute('outerHTML'))
-                        else:
-                            break
-                    except:
-                        break
-
-                # Format the output as a single string
-                formatted_output = heading_html + ' ' + ' '.join(siblings_html)
-                headings_html_list.append(formatted_output)
+        headings_html_list = [heading_with_siblings(model, heading)
+                              for heading in find_headings(model, model.descendants(section))]
 
         if headings_html_list:
             section_data['no_heading'] = False
@@ -1506,176 +1505,107 @@ def has_spacing_within_word(text):
     return bool(matches)
 
 
-def get_element_with_parent(element):
+def get_element_with_parent(model: PageModel, element: int) -> str:
     """ Get element and its immediate parent """
-    parent = element.find_element(By.XPATH, "parent::*")
-    return parent.get_attribute('outerHTML') + element.get_attribute('outerHTML')
+    parent = model.parent(element)
+    parent_html = model.outer_html(parent) if parent is not None else ''
+    return parent_html + model.outer_html(element)
 
 
-def extract_elements_with_parents(tag_names, driver):
+def extract_elements_with_parents(tag_names, model: PageModel):
     """ Extract specified elements and their immediate parent """
-    data = []
-    for tag in tag_names:
-        elements = driver.find_elements(By.TAG_NAME, tag)
-        for element in elements:
-            data.append(get_element_with_parent(element))
-    return data
+    return [get_element_with_parent(model, element) for element in model.by_tags_in_turn(tag_names)]
 
 
-def extract_elements_by_xpath(xpaths, driver):
-    """ Extract specified elements by XPath and their immediate parent """
-    data = []
-    for xpath in xpaths:
-        elements = driver.find_elements(By.XPATH, xpath)
-        for element in elements:
-            data.append(get_element_with_parent(element))
-    return data
+def extract_inputs_with_parents(input_types, model: PageModel):
+    """ Extract input elements of the specified types and their immediate parent """
+    return [get_element_with_parent(model, element) for input_type in input_types
+            for element in model.by_tag('input') if model.attribute(element, 'type') == input_type]
 
 
-def extract_elements(tag_names, driver):
+def extract_elements(tag_names, model: PageModel):
     """ Extract specified elements without their parents """
-    data = []
-    for tag in tag_names:
-        elements = driver.find_elements(By.TAG_NAME, tag)
-        for element in elements:
-            data.append(element.get_attribute('outerHTML'))
-    return data
+    return [model.outer_html(element) for element in model.by_tags_in_turn(tag_names)]
 
 
-def extract_images_with_siblings(driver):
+def extract_images_with_siblings(model: PageModel):
     """ Extract img elements and their first preceding and following siblings """
     data = []
-    images = driver.find_elements(By.TAG_NAME, "img")
-    for img in images:
-        img_html = img.get_attribute('outerHTML')
-        try:
-            preceding_sibling = img.find_element(By.XPATH, "preceding-sibling::*[1]").get_attribute('outerHTML')
-        except Exception:
-            preceding_sibling = None
-        try:
-            following_sibling = img.find_element(By.XPATH, "following-sibling::*[1]").get_attribute('outerHTML')
-        except Exception:
-            following_sibling = None
+    for img in model.by_tag('img'):
+        preceding_sibling = model.preceding_sibling(img)
+        following_sibling = model.following_sibling(img)
         data.append({
-            'image': img_html,
-            'preceding_sibling': preceding_sibling,
-            'following_sibling': following_sibling
+            'image': model.outer_html(img),
+            'preceding_sibling': model.outer_html(preceding_sibling) if preceding_sibling is not None else None,
+            'following_sibling': model.outer_html(following_sibling) if following_sibling is not None else None
         })
     return data
 
 
+@timed_extractor
 def extract_info_relation_elements(driver: webdriver.Chrome) -> dict:
+    model = get_page_model(driver)
+
     # Extract all tables
-    tables = driver.find_elements(By.TAG_NAME, "table")
-    table_data = [table.get_attribute('outerHTML') for table in tables]
+    table_data = extract_elements(["table"], model)
 
     # Extract all <pre> elements
-    pre_elements = driver.find_elements(By.TAG_NAME, "pre")
-    pre_data = [pre.get_attribute('outerHTML') for pre in pre_elements]
+    pre_data = extract_elements(["pre"], model)
 
     # Extract elements with the onClick attribute and their actual functions
-    onclick_elements = driver.find_elements(By.XPATH, "//*[@onclick]")
-    onclick_data = [(element.get_attribute('outerHTML'), element.get_attribute('onclick')) for element in
-                    onclick_elements]
-
-    # Combine standard and framework-specific click data
-    combined_click_data = onclick_data
+    combined_click_data = [(model.outer_html(element), model.attribute(element, 'onclick'))
+                           for element in model.with_attribute('onclick')]
 
     # Extract elements with the ARIA attribute role without extracting nested elements
-    aria_role_elements = driver.find_elements(By.XPATH, "//*[@role]")
-    aria_role_data = []
-
-    for element in aria_role_elements:
-        is_nested = False
-        try:
-            parent = element.find_element(By.XPATH, "ancestor::*[@role]")
-            if parent:
-                is_nested = True
-        except Exception as e:
-            # No ancestor found, so the element is not nested
-            pass
-        if not is_nested:
-            aria_role_data.append(element.get_attribute('outerHTML'))
+    aria_role_data = [model.outer_html(element) for element in model.with_attribute('role')
+                      if not any(model.attribute(ancestor, 'role') is not None
+                                 for ancestor in model.ancestors(element))]
 
     # Extract potential tables formatted using white space characters
-    potential_tables = driver.find_elements(By.XPATH, "//pre | //div | //p | //span")
     whitespace_tables = []
-    for element in potential_tables:
-        try:
-            text = element.text.strip()
-            if has_whitespace_formatting(text):
-                if text not in whitespace_tables:
-                    whitespace_tables.append(text)
-        except StaleElementReferenceException as e:
+    for element in model.elements:
+        if model.tag(element) not in ("pre", "div", "p", "span"):
             continue
+        text = model.text(element).strip()
+        if has_whitespace_formatting(text):
+            if text not in whitespace_tables:
+                whitespace_tables.append(text)
 
-    article_elements = driver.find_elements(By.TAG_NAME, "article")
-    article_data = [article.get_attribute('outerHTML') for article in article_elements]
+    article_data = extract_elements(["article"], model)
 
     # Extract specified elements with parents
-    elements_with_parents = extract_elements_with_parents(
-        ["li", "ul", "ol", "dt", "dd"], driver
-    )
+    elements_with_parents = extract_elements_with_parents(["li", "ul", "ol", "dt", "dd"], model)
 
     # Extract radio button and checkbox separately
-    radio_checkbox_elements = extract_elements_by_xpath(
-        ["//input[@type='radio']", "//input[@type='checkbox']"],
-        driver
-    )
+    radio_checkbox_elements = extract_inputs_with_parents(["radio", "checkbox"], model)
 
     # Extract fieldset, paragraph, and legend without parents
-    fieldset_elements = extract_elements(["fieldset"], driver)
-    paragraph_elements = extract_elements(["p"], driver)
-    legend_elements = extract_elements(["legend"], driver)
+    fieldset_elements = extract_elements(["fieldset"], model)
+    paragraph_elements = extract_elements(["p"], model)
+    legend_elements = extract_elements(["legend"], model)
 
     heading_tags = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
     # Extract all headings
-    headings = extract_elements(heading_tags, driver)
+    headings = extract_elements(heading_tags, model)
     list_tags = ['ul', 'ol', 'li']
     # Extract list elements with their parents
-    list_elements = extract_elements(list_tags, driver)
+    list_elements = extract_elements(list_tags, model)
     # Extract links
-    link_elements = extract_elements(["a"], driver)
+    link_elements = extract_elements(["a"], model)
 
     # Extract img elements with first preceding and following siblings
-    image_elements_with_siblings = extract_images_with_siblings(driver)
+    image_elements_with_siblings = extract_images_with_siblings(model)
 
-    # JavaScript to find hidden elements
-    script = """
-    return Array.from(document.querySelectorAll('*')).filter(el => {
-        return el.style.display === 'none' || el.style.visibility === 'hidden' || el.hidden;
-    });
-    """
-
-    # Execute the script to get hidden elements
-    hidden_elements = driver.execute_script(script)
-    hidden_elements_htmls = [element.get_attribute('outerHTML') for element in hidden_elements]
-
-    # JavaScript to find elements with ::before or ::after content
-    script = """
-    let elements = document.querySelectorAll('*');
-    let result = [];
-    elements.forEach(el => {
-        let before = window.getComputedStyle(el, '::before').getPropertyValue('content');
-        let after = window.getComputedStyle(el, '::after').getPropertyValue('content');
-        if (before !== 'none' || after !== 'none') {
-            result.push({
-                before: before,
-                after: after,
-                html: el.outerHTML
-            });
-        }
-    });
-    return result;
-    """
-
-    # Execute the script to get elements with CSS-inserted content
-    elements_with_css_content = driver.execute_script(script)
+    # Elements hidden by their own style or the hidden attribute
+    hidden_elements_htmls = [model.outer_html(element) for element in model.elements
+                             if model.is_inline_hidden(element)]
 
-    # Ensure the result is a list of dictionaries and print the result
+    # Elements with ::before or ::after content
     formatted_elements = [
-        {'before': element['before'], 'after': element['after'], 'html': element['html']}
-        for element in elements_with_css_content
+        {'before': model.nodes[element]['before'], 'after': model.nodes[element]['after'],
+         'html': model.outer_html(element)}
+        for element in model.elements
+        if model.nodes[element]['before'] != 'none' or model.nodes[element]['after'] != 'none'
     ]
 
     return {
@@ -1714,16 +1644,19 @@ def remove_table_markup(html_content):
     return "\n".join(linearized_content)
 
 
+@timed_extractor
 def extract_and_linearize_tables(driver: webdriver.Chrome):
+    model = get_page_model(driver)
+
     # Extract all tables
-    tables = driver.find_elements(By.TAG_NAME, "table")
-    table_data = [table.get_attribute('outerHTML') for table in tables]
+    table_data = extract_elements(["table"], model)
 
     # Extract potential tables formatted using white space characters
-    potential_tables = driver.find_elements(By.XPATH, "//pre | //div | //p | //span")
     whitespace_list = []
-    for element in potential_tables:
-        text = element.text.strip()
+    for element in model.elements:
+        if model.tag(element) not in ("pre", "div", "p", "span"):
+            continue
+        text = model.text(element).strip()
         if has_spacing_within_word(text):
             if text not in whitespace_list:
                 whitespace_list.append(text)
@@ -1737,21 +1670,17 @@ def extract_and_linearize_tables(driver: webdriver.Chrome):
             "linearized": linearized
         })
 
-    # CSS Styles: float, flex, grid
-    css_selectors = [
-        '[style*="float"]',
-        '[style*="flex"]',
-        '[style*="grid"]'
-    ]
+    # CSS Styles: float, flex, grid, as the [style*="..."] selectors match them
+    css_keywords = ["float", "flex", "grid"]
 
-    # Find elements by CSS selectors
+    # Find elements by their style attribute
     css_elements = []
-    for selector in css_selectors:
-        elements = driver.find_elements(By.CSS_SELECTOR, selector)
-        css_elements.extend(elements)
+    for keyword in css_keywords:
+        css_elements.extend(element for element in model.with_attribute('style')
+                            if keyword in model.attribute(element, 'style'))
 
     # ARIA Attributes: aria-flowto
-    aria_elements = driver.find_elements(By.XPATH, '//*[@aria-flowto]')
+    aria_elements = model.with_attribute('aria-flowto')
 
     # Combine CSS and ARIA affected elements
     combined_elements = css_elements + aria_elements
@@ -1760,9 +1689,10 @@ def extract_and_linearize_tables(driver: webdriver.Chrome):
     def find_common_ancestor(elements):
         ancestor_map = {}
         for element in elements:
-            parent = element.find_element(By.XPATH, '..')
-            grandparent = parent.find_element(By.XPATH, '..')
-            ancestor_map[element] = (parent, grandparent)
+            parent = model.parent(element)
+            if parent is None:
+                continue
+            ancestor_map[element] = (parent, model.parent(parent))
 
         unique_ancestors = set()
         parent_set = set()
@@ -1778,104 +1708,64 @@ def extract_and_linearize_tables(driver: webdriver.Chrome):
         return unique_ancestors
 
     unique_elements = find_common_ancestor(combined_elements)
-    elements_rearranged = [ele.get_attribute('outerHTML') for ele in unique_elements]
+    elements_rearranged = [model.outer_html(ele) for ele in unique_elements]
 
     return table_lists, whitespace_list, elements_rearranged
 
 
+@timed_extractor
 def extract_name_role_elements(driver: webdriver.Chrome) -> dict:
-    # Define the XPath to find all relevant elements
-    xpaths = {
-        'button': "//button | //input[@type='button' or @type='submit' or @type='reset'] | //*[@role='button']",
-        'aria-hidden': "//*[@aria-hidden]",
-        'menuitem': "//*[@role='menuitem']",
-        'iframe': "//iframe",
-        "link": "//a | //*[@role='link']",
-        'script-controlled': (
-            "//div[@onclick or @onfocus or @onblur or @onchange or @oninput or @onmouseover or @onmouseout or "
-            "@ondblclick or @onkeydown or @onkeypress or @onkeyup] | "
-            "//span[@onclick or @onfocus or @onblur or @onchange or @oninput or @onmouseover or @onmouseout or "
-            "@ondblclick or @onkeydown or @onkeypress or @onkeyup]"
-        )
-    }
+    return name_role_elements_from_index(get_accessibility_index(driver), driver.current_url)
+
 
-    element_html_dict = {
-        'button': [],
-        'aria-hidden': [],
-        'menuitem': [],
-        'iframe': [],
-        'script-controlled': [],
-        'link': []
+def name_role_elements_from_index(accessibility: AccessibilityIndex, base_url: str = None) -> dict:
+    model = accessibility.model
+
+    event_attributes = ('onclick', 'onfocus', 'onblur', 'onchange', 'oninput', 'onmouseover', 'onmouseout',
+                        'ondblclick', 'onkeydown', 'onkeypress', 'onkeyup')
+
+    # Define what makes an element relevant for each key
+    selectors = {
+        'button': lambda element: model.tag(element) == 'button' or model.attribute(element, 'role') == 'button' or
+        (model.tag(element) == 'input' and model.attribute(element, 'type') in ('button', 'submit', 'reset')),
+        'aria-hidden': lambda element: model.attribute(element, 'aria-hidden') is not None,
+        'menuitem': lambda element: model.attribute(element, 'role') == 'menuitem',
+        'iframe': lambda element: model.tag(element) == 'iframe',
+        'link': lambda element: model.tag(element) == 'a' or model.attribute(element, 'role') == 'link',
+        'script-controlled': lambda element: model.tag(element) in ('div', 'span') and
+        any(model.attribute(element, name) is not None for name in event_attributes)
     }
 
-    for key, xpath in xpaths.items():
-        try:
-            # Find all elements matching the XPath for the current key
-            elements = driver.find_elements(By.XPATH, xpath)
-
-            for element in elements:
-                # Check for aria-labelledby and replace it with aria-label if necessary
-                aria_labelledby = element.get_attribute('aria-labelledby')
-                if aria_labelledby:
-                    labelledby_element = driver.find_element(By.ID, aria_labelledby)
-                    aria_label = labelledby_element.text if labelledby_element else ''
-                    driver.execute_script("arguments[0].setAttribute(arguments[1], arguments[2]);",
-                                          element, 'aria-label', aria_label)
-                    driver.execute_script("arguments[0].removeAttribute(arguments[1]);",
-                                          element, 'aria-labelledby')
-                # Append the src attribute into the iframe tag if it's an iframe
-                if element.tag_name == 'iframe':
-                    src = element.get_attribute('src')
-                    driver.execute_script("arguments[0].setAttribute('src', arguments[1]);", element, src)
-
-                # Get the outer HTML of the element
-                outer_html = element.get_attribute('outerHTML')
-                element_html_dict[key].append(outer_html)
-        except:
-            continue
+    def start_tag(element):
+        start = accessibility.named_start_tag(element)
+        # Give the iframe tag its absolute src
+        if base_url and model.tag(element) == 'iframe' and model.attribute(element, 'src'):
+            start = set_attribute(start, 'src', urljoin(base_url, model.attribute(element, 'src')))
+        return start
+
+    # Get the outer HTML of the elements, with aria-labelledby replaced by the name the browser computed from it
+    element_html_dict = {key: [] for key in selectors}
+    for key, selector in selectors.items():
+        for element in model.elements:
+            if selector(element):
+                element_html_dict[key].append(model.outer_html(element, start_tag))
 
     return element_html_dict
 
 
 def extract_all_controls(driver: webdriver.Chrome) -> list:
-    # Define the XPath to find the specified elements and icons
-    control_xpaths = (
-        "//select | "
-        "//textarea | "
-        "//datalist | "
-        "//output | "
-        "//meter | "
-        "//progress | "
-        "//details | "
-        "//summary | "
-        "//menu | "
-        "//menuitem | "
-        "//i | "
-        "//svg | "
-        "//*[@role='img'] | "
-        "//*[contains(@class, 'icon') or contains(@class, 'icon-')]"
-    )
-
-    # Find all elements matching the XPath
-    controls = driver.find_elements(By.XPATH, control_xpaths)
-
-    control_html_list = []
-    unique_elements_html = set()
+    accessibility = get_accessibility_index(driver)
+    model = accessibility.model
+
+    # Define the specified elements and icons
+    control_tags = ('select', 'textarea', 'datalist', 'output', 'meter', 'progress', 'details', 'summary', 'menu',
+                    'menuitem', 'i', 'svg')
+    controls = [element for element in model.elements
+                if model.tag(element) in control_tags or model.attribute(element, 'role') == 'img' or
+                'icon' in (model.attribute(element, 'class') or '')]
 
-    for control in controls:
-        # Check if aria-labelledby needs to be converted to aria-label
-        aria_labelledby = control.get_attribute('aria-labelledby')
-        if aria_labelledby:
-            # Replace aria-labelledby with aria-label
-            labelled_element = driver.find_element(By.ID, aria_labelledby)
-            if labelled_element:
-                text_content = labelled_element.text.strip()
-                driver.execute_script("arguments[0].setAttribute('aria-label', arguments[1])", control,
-                                      text_content)
-                driver.execute_script("arguments[0].removeAttribute('aria-labelledby')", control)
-
-        # Add to set if not already included based on its outerHTML
-        unique_elements_html.add(control.get_attribute('outerHTML'))
+    # Unique outerHTML, with aria-labelledby replaced by the name the browser computed from it
+    unique_elements_html = {accessibility.named_outer_html(control) for control in controls}
 
     return list(unique_elements_html)
 
@@ -1884,6 +1774,7 @@ def hash_text(text):
     return hashlib.sha256(text.encode('utf-8')).hexdigest()
 
 
+@timed_extractor
 def capture_updating_moving_element(driver: webdriver.Chrome) -> dict:
     result_dict = {}
     # Find all <blink> and <marquee> elements
@@ -1898,34 +1789,38 @@ def capture_updating_moving_element(driver: webdriver.Chrome) -> dict:
     driver.save_screenshot(TEMP_FILE_FOLDER + f'/moving_{screenshot_counter}.png')
     img_str_before = encode_image(TEMP_FILE_FOLDER + f'/moving_{screenshot_counter}.png')
 
-    # Wait for 5 seconds
-    time.sleep(5)
+    # Wait for 5 seconds of page time
+    clock = page_clock(driver)
+    try:
+        clock.sleep(5)
 
-    # Extract the text content again and hash it
-    all_text_content_after = driver.find_element(By.TAG_NAME, 'body').text
+        # Extract the text content again and hash it
+        all_text_content_after = driver.find_element(By.TAG_NAME, 'body').text
 
-    # Take the second screenshot
-    screenshot_counter += 1
-    driver.save_screenshot(TEMP_FILE_FOLDER + f'/moving_{screenshot_counter}.png')
-    img_str_after = encode_image(TEMP_FILE_FOLDER + f'/moving_{screenshot_counter}.png')
-
-    updating_images = []
-    # Check if the hashes are not equal
-    if all_text_content_prev != all_text_content_after:
-        while True:
-            # Scroll down the page
-            driver.execute_script("window.scrollBy(0, window.innerHeight);")
-            time.sleep(5)  # Wait for the page to load
-
-            # Take another screenshot
-            updating_screenshot_counter = 0
-            driver.save_screenshot(TEMP_FILE_FOLDER + f'/updating_{updating_screenshot_counter}.png')
-            updating_images.append(encode_image(TEMP_FILE_FOLDER + f'/updating_{updating_screenshot_counter}.png'))
-            updating_screenshot_counter += 1
-
-            # Check if we've reached the bottom of the page
-            if driver.execute_script("return (window.innerHeight + window.scrollY) >= document.body.scrollHeight;"):
-                break
+        # Take the second screenshot
+        screenshot_counter += 1
+        driver.save_screenshot(TEMP_FILE_FOLDER + f'/moving_{screenshot_counter}.png')
+        img_str_after = encode_image(TEMP_FILE_FOLDER + f'/moving_{screenshot_counter}.png')
+
+        updating_images = []
+        # Check if the hashes are not equal
+        if all_text_content_prev != all_text_content_after:
+            while True:
+                # Scroll down the page
+                driver.execute_script("window.scrollBy(0, window.innerHeight);")
+                clock.sleep(5)  # Wait for the page to load
+
+                # Take another screenshot
+                updating_screenshot_counter = 0
+                driver.save_screenshot(TEMP_FILE_FOLDER + f'/updating_{updating_screenshot_counter}.png')
+                updating_images.append(encode_image(TEMP_FILE_FOLDER + f'/updating_{updating_screenshot_counter}.png'))
+                updating_screenshot_counter += 1
+
+                # Check if we've reached the bottom of the page
+                if driver.execute_script("return (window.innerHeight + window.scrollY) >= document.body.scrollHeight;"):
+                    break
+    finally:
+        clock.close()
 
     result_dict['blink'] = [elem.get_attribute('outerHTML') for elem in blink_elements]
     result_dict['marquee'] = [elem.get_attribute('outerHTML') for elem in marquee_elements]
@@ -1943,6 +1838,7 @@ def extract_tag_with_attributes_only(element):
     return str(tag)
 
 
+@timed_extractor
 def extract_specific_role_elements(driver: webdriver.Chrome) -> dict:
     # Define the roles we are interested in
     roles = ['application', 'article', 'banner', 'complementary', 'contentinfo',
@@ -2033,6 +1929,7 @@ def extract_specific_role_elements(driver: webdriver.Chrome) -> dict:
     return result
 
 
+@timed_extractor
 def extract_sensory_elements(driver: webdriver.Chrome) -> dict:
     def get_outer_html(element):
         if element is not None:
@@ -2099,9 +1996,11 @@ def extract_sensory_elements(driver: webdriver.Chrome) -> dict:
     return {"other_sensory": other_sensory_results, "color_sensory": color_sensory_results}
 
 
+@timed_extractor
 def extract_location_related_information(driver: webdriver.Chrome) -> dict:
     # Load the screenshot of the page
     location_dict = {}
+    stabilize_rendering(driver)
     driver.save_screenshot(TEMP_FILE_FOLDER + "/location.png")
     location_dict["screenshot"] = encode_image(TEMP_FILE_FOLDER + "/location.png")
     location_dict["title"] = driver.title
@@ -2125,6 +2024,7 @@ def is_element_visible(element):
         return False
 
 
+@timed_extractor
 def extract_link_form_screenshot(driver: webdriver.Chrome) -> dict:
     # Find all anchor tags
     link_img_strs = []
@@ -2216,7 +2116,21 @@ def extract_link_form_screenshot(driver: webdriver.Chrome) -> dict:
     return {"links": link_img_strs, "forms": form_img_strs}
 
 
+@timed_extractor
 def extract_target_size(driver: webdriver.Chrome) -> dict:
+    page = devtools_facade(driver)
+    try:
+        return collect_target_sizes(page)
+    finally:
+        if page is not driver:
+            page.close()
+
+
+# Values is_element_visible reads for every control, fetched for all of them at once
+TARGET_SIZE_FIELDS = [("displayed",), ("attribute", "style")]
+
+
+def collect_target_sizes(driver: webdriver.Chrome) -> dict:
     # JavaScript function to get the size and position of an element
     get_size_and_position_script = """
     function checkTargetSizeAndPosition(element) {
@@ -2255,6 +2169,8 @@ def extract_target_size(driver: webdriver.Chrome) -> dict:
 
         # Find all elements matching the combined XPath
         elements = driver.find_elements(By.XPATH, control_xpaths)
+        if hasattr(driver, "prefetch"):
+            driver.prefetch(elements, TARGET_SIZE_FIELDS)
 
         # Extract sizes and positions of each visible element
         elements_info = []
@@ -2409,6 +2325,7 @@ def crop_screenshot(driver, element, crop_path, margin=10, zoom_factor=2) -> boo
     return False
 
 
+@timed_extractor
 def extract_text_blocks_with_details(driver: webdriver.Chrome) -> list:
     # driver.execute_script("document.body.style.zoom='200%'")
     original_size = driver.get_window_size()
@@ -2508,6 +2425,7 @@ def revert_page_styles(driver):
     driver.execute_script(script)
 
 
+@timed_extractor
 def extract_text_spacing_screenshots(driver: webdriver.Chrome) -> list:
     adjust_page_styles(driver)
     screenshot_counter = 0
@@ -2538,6 +2456,7 @@ def extract_text_spacing_screenshots(driver: webdriver.Chrome) -> list:
     return images
 
 
+@timed_extractor
 def find_related_screenshots(driver: webdriver.Chrome, folder_path) -> list:
     before_files = []
     screenshot_file = None
@@ -2566,6 +2485,7 @@ def find_related_screenshots(driver: webdriver.Chrome, folder_path) -> list:
     return [encode_image(screenshot_file)] if screenshot_file else []
 
 
+@timed_extractor
 def extract_non_text_contrast(driver: webdriver.Chrome) -> dict:
     # Identify focusable elements
     focusable_selectors = 'a, button, input, textarea, [tabindex]'
@@ -2602,73 +2522,66 @@ def extract_non_text_contrast(driver: webdriver.Chrome) -> dict:
     return results
 
 
-def extract_event_function(element, event_type, driver):
-    outer_html = driver.execute_script("return arguments[0].outerHTML;", element)
-
-    # Extract standard JavaScript event handlers
-    event_function = driver.execute_script("""
-        var element = arguments[0];
-        var eventHandler = element.getAttribute(arguments[1]);
-        if (eventHandler) {
-            try {
-                return new Function(eventHandler).toString();
-            } catch (e) {
-                return eventHandler;
-            }
-        } else {
-            return null;
-        }
-    """, element, event_type)
+def event_function(handler: str) -> str:
+    """ The source of the function the browser compiles an inline event handler into """
+    return f"function anonymous(\n) {{\n{handler}\n}}"
+
+
+def extract_event_function(model: PageModel, element: int, event_type: str) -> tuple:
+    handler = model.attribute(element, event_type)
+    return model.outer_html(element), event_function(handler) if handler else None
+
 
-    return outer_html, event_function
+@timed_extractor
+def extract_event_handlers(driver: webdriver.Chrome) -> list:
+    return event_handlers_from_model(get_page_model(driver))
 
 
-def extract_event_handlers(driver) -> list:
+def event_handlers_from_model(model: PageModel) -> list:
     # Dictionaries to hold the element outerHTML and its associated function
     special_input_dict = {}
     other_input_dict = {}
 
-    # Function to extract event handlers for a given element and event type
-
-    # Get all input elements within the form
-    input_elements = driver.find_elements(By.TAG_NAME, 'input')
-    for input_element in input_elements:
-        input_type = input_element.get_attribute('type')
+    # Get all input elements
+    for input_element in model.by_tag('input'):
+        input_type = (model.attribute(input_element, 'type') or 'text').lower()
         if input_type in ['radio', 'checkbox']:
-            outer_html, onclick_function = extract_event_function(input_element, 'onclick', driver)
+            outer_html, onclick_function = extract_event_function(model, input_element, 'onclick')
             if onclick_function:
                 special_input_dict[outer_html] = onclick_function
         else:
-            outer_html, onchange_function = extract_event_function(input_element, 'onchange', driver)
+            outer_html, onchange_function = extract_event_function(model, input_element, 'onchange')
             if onchange_function:
                 other_input_dict[outer_html] = onchange_function
 
-    # Get all select elements within the form
-    select_elements = driver.find_elements(By.TAG_NAME, 'select')
-    for select_element in select_elements:
-        outer_html, onchange_function = extract_event_function(select_element, 'onclick', driver)
+    # Get all select elements
+    for select_element in model.by_tag('select'):
+        outer_html, onchange_function = extract_event_function(model, select_element, 'onclick')
         if onchange_function:
             special_input_dict[outer_html] = onchange_function
 
     return [special_input_dict, other_input_dict]
 
 
-def extract_change_on_request_element(driver) -> list:
+@timed_extractor
+def extract_change_on_request_element(driver: webdriver.Chrome) -> list:
+    return change_on_request_from_model(get_page_model(driver))
+
+
+def change_on_request_from_model(model: PageModel) -> list:
     # Dictionaries to hold the element outerHTML and its associated function code
     onclick_dict = {}
     onblur_dict = {}
 
     # Extract elements with onclick functions
-    elements_with_onclick = driver.find_elements(By.CSS_SELECTOR, '[onclick]')
-    for element in elements_with_onclick:
-        outer_html, onclick_function = extract_event_function(element, 'onclick', driver)
+    for element in model.with_attribute('onclick'):
+        outer_html, onclick_function = extract_event_function(model, element, 'onclick')
         if onclick_function:
             onclick_dict[outer_html] = onclick_function
 
     # Extract input elements with onblur functions
-    input_elements_with_onblur = driver.find_elements(By.CSS_SELECTOR, 'input')
-    for input_element in input_elements_with_onblur:
-        outer_html, onblur_function = extract_event_function(input_element, 'onblur', driver)
+    for input_element in model.by_tag('input'):
+        outer_html, onblur_function = extract_event_function(model, input_element, 'onblur')
         if onblur_function:
             onblur_dict[outer_html] = onblur_function
 
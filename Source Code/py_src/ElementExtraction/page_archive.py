@@ -0,0 +1,134 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from selenium import webdriver
+from ElementExtraction.devtools import DevToolsSession
+from consts import ARCHIVE_FOLDER
+
+# Headers that describe the body as sent over the wire, which no longer apply to the decoded body in the archive
+DECODED_BODY_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+# Age after which the archive of a URL is recorded again, so that scans do not keep replaying an outdated page
+DEFAULT_ARCHIVE_MAX_AGE_SECONDS = 24 * 3600
+# Whether the browsers of this process load pages from the archive, set before the check processes start
+_replay = False
+
+
+def set_replay(enabled: bool):
+    global _replay
+    _replay = enabled
+
+
+def replay_enabled() -> bool:
+    return _replay
+
+
+def archive_path(url: str) -> str:
+    """ Path of the archive of a URL. """
+    return os.path.join(ARCHIVE_FOLDER, hashlib.sha256(url.encode()).hexdigest()[:16] + ".json")
+
+
+def has_archive(url: str, max_age: float = DEFAULT_ARCHIVE_MAX_AGE_SECONDS) -> bool:
+    """ Whether the URL has an archive recorded less than max_age seconds ago. """
+    file_path = archive_path(url)
+    return os.path.exists(file_path) and time.time() - os.path.getmtime(file_path) < max_age
+
+
+def without_query(url: str) -> str:
+    return url.split("?", 1)[0]
+
+
+class PageRecorder:
+    """
+    Record every response the page receives, with its status, headers and body, through request interception
+    at the response stage.
+    """
+
+    def __init__(self, driver: webdriver.Chrome):
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._session = DevToolsSession(driver)
+        self._session.on("Fetch.requestPaused", self._record)
+        self._session.send("Fetch.enable", {"patterns": [{"urlPattern": "*", "requestStage": "Response"}]})
+
+    def _record(self, params: dict):
+        request = params["request"]
+        status = params.get("responseStatusCode")
+        body = ""
+        if status is not None and not 300 <= status < 400:
+            try:
+                response = self._session.send("Fetch.getResponseBody", {"requestId": params["requestId"]})
+                body = response["body"] if response.get("base64Encoded") else \
+                    base64.b64encode(response["body"].encode()).decode()
+            except Exception as e:
+                print(f"Error recording the body of {request['url']}: {e}")
+                status = None
+        if status is not None:
+            with self._lock:
+                # The first response of a request is the one the later sessions get
+                self.entries.setdefault(f"{request['method']} {request['url']}", {
+                    "status": status,
+                    "headers": [header for header in params.get("responseHeaders", [])
+                                if header["name"].lower() not in DECODED_BODY_HEADERS],
+                    "body": body
+                })
+        self._session.send("Fetch.continueRequest", {"requestId": params["requestId"]})
+
+    def save(self, url: str):
+        """ Stop recording and write the archive of the URL. """
+        self._session.close()
+        os.makedirs(ARCHIVE_FOLDER, exist_ok=True)
+        file_path = archive_path(url)
+        temp_path = f"{file_path}.{os.getpid()}.tmp"
+        with self._lock, open(temp_path, 'w') as f:
+            json.dump({"url": url, "recorded_at": time.time(), "entries": self.entries}, f)
+        os.replace(temp_path, file_path)
+
+
+class PageReplayer:
+    """
+    Serve every request of the page from the archive of a URL. A request whose URL was not recorded gets the
+    first response recorded for the same URL without its query string, since scripts add timestamps and other
+    cache-busting parameters that change on every load. Requests the archive does not hold either way fail as
+    if the machine was offline, so a replayed scan never reaches the live site.
+    """
+
+    def __init__(self, driver: webdriver.Chrome, url: str):
+        with open(archive_path(url)) as f:
+            self.entries = json.load(f)["entries"]
+        self._entries_without_query = {}
+        for key, entry in self.entries.items():
+            self._entries_without_query.setdefault(without_query(key), entry)
+        self._session = DevToolsSession(driver)
+        self._session.on("Fetch.requestPaused", self._serve)
+        self._session.send("Fetch.enable", {"patterns": [{"urlPattern": "*", "requestStage": "Request"}]})
+
+    def _serve(self, params: dict):
+        request = params["request"]
+        key = f"{request['method']} {request['url']}"
+        entry = self.entries.get(key) or self._entries_without_query.get(without_query(key))
+        if entry is None:
+            self._session.send("Fetch.failRequest", {"requestId": params["requestId"],
+                                                     "errorReason": "InternetDisconnected"})
+            return
+        self._session.send("Fetch.fulfillRequest", {
+            "requestId": params["requestId"],
+            "responseCode": entry["status"],
+            "responseHeaders": entry["headers"],
+            "body": entry["body"]
+        })
+
+    def close(self):
+        self._session.close()
+
+
+def scroll_through_page(driver: webdriver.Chrome):
+    """ Scroll to the bottom of the page and back, so that lazily loaded resources are requested too. """
+    height = driver.execute_script("return document.body.scrollHeight")
+    viewport = driver.execute_script("return window.innerHeight")
+    for offset in range(0, height, max(viewport, 1)):
+        driver.execute_script(f"window.scrollTo(0, {offset});")
+        time.sleep(0.2)
+    driver.execute_script("window.scrollTo(0, 0);")
@@ -0,0 +1,392 @@
+import html
+import re
+from selenium import webdriver
+
+# Computed styles recorded for every element
+MODEL_STYLES = ("display", "visibility", "opacity", "position", "left", "top", "right", "bottom", "z-index", "color",
+                "background-color", "background-image", "font-size", "font-weight", "white-space")
+# Elements whose content is never rendered as text
+NON_RENDERED_TAGS = ("script", "style", "noscript", "template")
+# White space styles under which text is rendered with its spaces and line breaks as they are
+PRESERVED_WHITE_SPACE = ("pre", "pre-wrap", "break-spaces")
+# Elements whose rendered text is recorded. The text of an element contains the text of all of its descendants,
+# so recording it for every element would grow with the square of the depth of the page. Containers nested at
+# any depth, like div and span, are left out: their text is built in Python from the text nodes when needed.
+TEXT_TAGS = ("pre", "p", "h1", "h2", "h3", "h4", "h5", "h6", "a", "button", "label", "li", "td", "th")
+
+# Walks the document once and returns every element, text and comment node in document order. Elements carry
+# their start and end tags as the browser serializes them, so that the outerHTML of any element can be rebuilt
+# in Python, with their attributes, computed styles, ::before and ::after content, page coordinates,
+# visibility and whether their own style or hidden attribute hides them. The rendered text is only read for TEXT_TAGS.
+SNAPSHOT_SCRIPT = """
+const styleNames = arguments[0];
+const textTags = new Set(arguments[1]);
+const rawTextTags = new Set(['script', 'style', 'xmp', 'iframe', 'noembed', 'noframes', 'plaintext', 'noscript']);
+const voidTags = new Set(['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source',
+                          'track', 'wbr', 'basefont', 'bgsound', 'frame', 'keygen', 'param']);
+const scrollX = window.scrollX;
+const scrollY = window.scrollY;
+const nodes = [];
+
+function escapeText(text) {
+    return text.replace(/&/g, '&amp;').replace(/\\u00a0/g, '&nbsp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+}
+
+function escapeAttribute(value) {
+    return value.replace(/&/g, '&amp;').replace(/\\u00a0/g, '&nbsp;').replace(/"/g, '&quot;')
+        .replace(/</g, '&lt;').replace(/>/g, '&gt;');
+}
+
+function tags(element) {
+    let shallow;
+    try {
+        shallow = element.cloneNode(false).outerHTML;
+    } catch (e) {
+        // Custom elements may refuse to be cloned
+        const tag = element.localName;
+        const attributes = Array.from(element.attributes, a => ` ${a.name}="${escapeAttribute(a.value)}"`).join('');
+        shallow = `<${tag}${attributes}>` + (voidTags.has(tag) ? '' : `</${tag}>`);
+    }
+    if (voidTags.has(element.localName)) {
+        return [shallow, ''];
+    }
+    const cut = shallow.lastIndexOf('</');
+    return [shallow.slice(0, cut), shallow.slice(cut)];
+}
+
+function visit(node, parent, parentTag, inert) {
+    const index = nodes.length;
+    if (node.nodeType === Node.TEXT_NODE) {
+        const html = rawTextTags.has(parentTag) ? node.data : escapeText(node.data);
+        nodes.push({kind: 'text', parent: parent, html: html});
+        return;
+    }
+    if (node.nodeType === Node.COMMENT_NODE) {
+        nodes.push({kind: 'comment', parent: parent, html: `<!--${node.data}-->`});
+        return;
+    }
+    if (node.nodeType !== Node.ELEMENT_NODE) {
+        return;
+    }
+    const tag = node.localName;
+    const [start, end] = tags(node);
+    const attributes = {};
+    for (const attribute of node.attributes) {
+        attributes[attribute.name] = attribute.value;
+    }
+    const computed = getComputedStyle(node);
+    const styles = {};
+    for (const name of styleNames) {
+        styles[name] = computed.getPropertyValue(name);
+    }
+    const rect = node.getBoundingClientRect();
+    const visible = node.checkVisibility ? node.checkVisibility() : node.getClientRects().length > 0;
+    const entry = {
+        kind: 'element', parent: parent, tag: tag, start: start, end: end, attributes: attributes, styles: styles,
+        before: getComputedStyle(node, '::before').getPropertyValue('content'),
+        after: getComputedStyle(node, '::after').getPropertyValue('content'),
+        rect: {x: rect.left + scrollX, y: rect.top + scrollY, width: rect.width, height: rect.height},
+        visible: visible,
+        inlineHidden: Boolean(node.hidden) ||
+            Boolean(node.style && (node.style.display === 'none' || node.style.visibility === 'hidden')),
+        // The content of a template is serialized with it, but is not part of the document
+        inert: inert
+    };
+    if (textTags.has(tag)) {
+        entry.text = visible ? (node.innerText ?? node.textContent) : '';
+    }
+    nodes.push(entry);
+    for (const child of (tag === 'template' ? node.content.childNodes : node.childNodes)) {
+        visit(child, index, tag, inert || tag === 'template');
+    }
+}
+
+visit(document.documentElement, -1, null, false);
+return {
+    token: window.__genA11yModelToken || (window.__genA11yModelToken = Math.random().toString(36).slice(2)),
+    lastMutation: window.__genA11yLastMutation === undefined ? null : window.__genA11yLastMutation,
+    nodes: nodes
+};
+"""
+
+# Identifies the document and its last DOM mutation, to tell whether a snapshot still matches the page
+STATE_SCRIPT = """
+return [window.__genA11yModelToken || null,
+        window.__genA11yLastMutation === undefined ? null : window.__genA11yLastMutation];
+"""
+
+# The last snapshot taken by this process: (session id, window handle, token, last mutation, model)
+_cached = None
+
+
+class PageModel:
+    """
+    A snapshot of the whole page, read in Python instead of querying the browser element by element. Nodes are
+    dicts in document order; elements are referred to by their index in nodes.
+    """
+
+    def __init__(self, nodes: list):
+        self.nodes = nodes
+        for node in nodes:
+            node["children"] = []
+        for index, node in enumerate(nodes):
+            if node["parent"] >= 0:
+                nodes[node["parent"]]["children"].append(index)
+        # Nodes are in document order, so the subtree of a node is the range from the node to its last descendant
+        self._subtree_end = list(range(len(nodes)))
+        for index in reversed(range(len(nodes))):
+            if nodes[index]["children"]:
+                self._subtree_end[index] = self._subtree_end[nodes[index]["children"][-1]]
+        # The elements of the document, which excludes the content of templates
+        self.elements = [index for index, node in enumerate(nodes)
+                         if node["kind"] == "element" and not node["inert"]]
+        self._outer_html = {}
+        self._inner_text = {}
+        self._by_id = None
+
+    def tag(self, index: int) -> str:
+        return self.nodes[index]["tag"]
+
+    def attribute(self, index: int, name: str):
+        return self.nodes[index]["attributes"].get(name)
+
+    def style(self, index: int, name: str) -> str:
+        return self.nodes[index]["styles"].get(name)
+
+    def text(self, index: int) -> str:
+        """ The rendered text of an element, with its line breaks: recorded for TEXT_TAGS, else inner_text(). """
+        node = self.nodes[index]
+        return node["text"] if "text" in node else self.inner_text(index)
+
+    def inner_text(self, index: int) -> str:
+        """
+        The text innerText would read from an element, built from the text nodes of its displayed descendants:
+        white space collapsed unless the white-space style of its parent preserves it, a line break around blocks
+        and at <br>, and nothing for an element that is not rendered.
+        """
+        if index in self._inner_text:
+            return self._inner_text[index]
+        if not self.nodes[index]["visible"]:
+            return ""
+        # Blocks break lines once however many of them meet, so their breaks are marked and merged at the end
+        block_break = "\0"
+        parts = []
+        block_ends = []
+        # Whether a collapsible space starting the next text would be dropped
+        at_space = True
+        descendant = index
+        while descendant <= self._subtree_end[index]:
+            while block_ends and descendant > block_ends[-1]:
+                parts.append(block_break)
+                at_space = True
+                block_ends.pop()
+            node = self.nodes[descendant]
+            if node["kind"] == "element":
+                if node["tag"] in NON_RENDERED_TAGS or node["styles"]["display"] == "none":
+                    descendant = self._subtree_end[descendant] + 1
+                    continue
+                if node["tag"] == "br":
+                    parts.append("\n")
+                    at_space = True
+                elif descendant != index and not node["styles"]["display"].startswith(("inline", "contents")):
+                    parts.append(block_break)
+                    at_space = True
+                    block_ends.append(self._subtree_end[descendant])
+            elif node["kind"] == "text" and self.nodes[node["parent"]]["styles"]["visibility"] != "hidden":
+                text = html.unescape(node["html"])
+                white_space = self.nodes[node["parent"]]["styles"].get("white-space", "normal")
+                if white_space in PRESERVED_WHITE_SPACE:
+                    if text:
+                        parts.append(text)
+                        at_space = text.endswith("\n")
+                else:
+                    # Non-breaking spaces are not collapsible
+                    if white_space == "pre-line":
+                        text = re.sub(r"[ \t\r\f]*\n[ \t\r\f]*", "\n", re.sub(r"[ \t\r\f]+", " ", text))
+                    else:
+                        text = re.sub(r"[ \t\n\r\f]+", " ", text)
+                    if at_space and text.startswith(" "):
+                        text = text[1:]
+                    if text:
+                        parts.append(text)
+                        at_space = text.endswith((" ", "\n"))
+            descendant += 1
+        text = re.sub(f" *{block_break}[ {block_break}]*", "\n", "".join(parts)).strip(" \n")
+        self._inner_text[index] = text
+        return text
+
+    def rendered_text(self, index: int) -> str:
+        """
+        The rendered text of any element: the recorded text of TEXT_TAGS, otherwise the text of its displayed
+        descendants with white space collapsed, and a space where innerText would break the line: around blocks
+        and at <br>.
+        """
+        node = self.nodes[index]
+        if "text" in node:
+            return node["text"]
+        if not node["visible"]:
+            return ""
+        parts = []
+        # Ends of the subtrees of the blocks being read
+        block_ends = []
+        descendant = index
+        while descendant <= self._subtree_end[index]:
+            while block_ends and descendant > block_ends[-1]:
+                parts.append(" ")
+                block_ends.pop()
+            node = self.nodes[descendant]
+            if node["kind"] == "element" and (node["tag"] in NON_RENDERED_TAGS or node["styles"]["display"] == "none"):
+                descendant = self._subtree_end[descendant] + 1
+                continue
+            if node["kind"] == "element" and (node["tag"] == "br" or
+                                              not node["styles"]["display"].startswith(("inline", "contents"))):
+                parts.append(" ")
+                block_ends.append(self._subtree_end[descendant])
+            if node["kind"] == "text" and self.nodes[node["parent"]]["styles"]["visibility"] != "hidden":
+                parts.append(html.unescape(node["html"]))
+            descendant += 1
+        return " ".join("".join(parts).split())
+
+    def text_content(self, index: int) -> str:
+        """
+        The text of all the text nodes of an element, rendered or not, with white space collapsed: what
+        document.title and names given by aria-labelledby read. Script and style content is left out.
+        """
+        parts = []
+        descendant = index + 1
+        while descendant <= self._subtree_end[index]:
+            node = self.nodes[descendant]
+            if node["kind"] == "element" and node["tag"] in NON_RENDERED_TAGS:
+                descendant = self._subtree_end[descendant] + 1
+                continue
+            if node["kind"] == "text":
+                parts.append(html.unescape(node["html"]))
+            descendant += 1
+        return " ".join("".join(parts).split())
+
+    def by_tag(self, *tags) -> list:
+        """ The elements with one of the tags, in document order. """
+        return [index for index in self.elements if self.nodes[index]["tag"] in tags]
+
+    def by_tags_in_turn(self, tags) -> list:
+        """ The elements of each tag in turn, as one find_elements() per tag would list them. """
+        return [index for tag in tags for index in self.by_tag(tag)]
+
+    def with_attribute(self, name: str, value: str = None) -> list:
+        return [index for index in self.elements if name in self.nodes[index]["attributes"] and
+                (value is None or self.nodes[index]["attributes"][name] == value)]
+
+    def element_by_id(self, element_id: str):
+        """ The first element with the id, like getElementById(), or None. """
+        if self._by_id is None:
+            self._by_id = {}
+            for index in reversed(self.elements):
+                if self.nodes[index]["attributes"].get("id"):
+                    self._by_id[self.nodes[index]["attributes"]["id"]] = index
+        return self._by_id.get(element_id)
+
+    def parent(self, index: int):
+        parent = self.nodes[index]["parent"]
+        return parent if parent >= 0 else None
+
+    def ancestors(self, index: int) -> list:
+        ancestors = []
+        parent = self.parent(index)
+        while parent is not None:
+            ancestors.append(parent)
+            parent = self.parent(parent)
+        return ancestors
+
+    def descendants(self, index: int) -> list:
+        """ The descendant elements of an element, in document order. """
+        return [descendant for descendant in range(index + 1, self._subtree_end[index] + 1)
+                if self.nodes[descendant]["kind"] == "element" and not self.nodes[descendant]["inert"]]
+
+    def element_siblings(self, index: int) -> list:
+        parent = self.parent(index)
+        if parent is None:
+            return [index]
+        return [child for child in self.nodes[parent]["children"] if self.nodes[child]["kind"] == "element"]
+
+    def following_sibling(self, index: int):
+        siblings = self.element_siblings(index)
+        position = siblings.index(index)
+        return siblings[position + 1] if position + 1 < len(siblings) else None
+
+    def preceding_sibling(self, index: int):
+        siblings = self.element_siblings(index)
+        position = siblings.index(index)
+        return siblings[position - 1] if position > 0 else None
+
+    def outer_html(self, index: int, start_tag=None) -> str:
+        """
+        The outerHTML of a node, rebuilt from the start and end tags and the text of its subtree. start_tag, if
+        given, is called with each element of the subtree and returns the start tag to use in place of its own.
+        """
+        node = self.nodes[index]
+        if node["kind"] != "element":
+            return node["html"]
+        if start_tag is not None or index not in self._outer_html:
+            parts = []
+            open_elements = []
+            for descendant in range(index, self._subtree_end[index] + 1):
+                while open_elements and self._subtree_end[open_elements[-1]] < descendant:
+                    parts.append(self.nodes[open_elements.pop()]["end"])
+                node = self.nodes[descendant]
+                if node["kind"] == "element":
+                    parts.append(node["start"] if start_tag is None else start_tag(descendant))
+                    open_elements.append(descendant)
+                else:
+                    parts.append(node["html"])
+            while open_elements:
+                parts.append(self.nodes[open_elements.pop()]["end"])
+            if start_tag is not None:
+                return "".join(parts)
+            self._outer_html[index] = "".join(parts)
+        return self._outer_html[index]
+
+    def is_inline_hidden(self, index: int) -> bool:
+        """ Whether the element is hidden by its own style or the hidden attribute. """
+        return self.nodes[index]["inlineHidden"]
+
+
+def escape_attribute(value: str) -> str:
+    """ Escape an attribute value as the browser serializes it. """
+    return value.replace("&", "&amp;").replace("\u00a0", "&nbsp;").replace('"', "&quot;") \
+        .replace("<", "&lt;").replace(">", "&gt;")
+
+
+def set_attribute(start: str, name: str, value: str) -> str:
+    """ A start tag with an attribute set to value, in place if the tag has it, otherwise at the end. """
+    attribute = f' {name}="{escape_attribute(value)}"'
+    pattern = re.compile(rf'\s{re.escape(name)}="[^"]*"')
+    if pattern.search(start):
+        return pattern.sub(lambda match: attribute, start, count=1)
+    end = -2 if start.endswith("/>") else -1
+    return start[:end] + attribute + start[end:]
+
+
+def remove_attribute(start: str, name: str) -> str:
+    return re.sub(rf'\s{re.escape(name)}="[^"]*"', "", start, count=1)
+
+
+def capture_page_model(driver: webdriver.Chrome) -> PageModel:
+    """ Take a snapshot of the page in one script. """
+    global _cached
+    snapshot = driver.execute_script(SNAPSHOT_SCRIPT, list(MODEL_STYLES), list(TEXT_TAGS))
+    model = PageModel(snapshot["nodes"])
+    _cached = (driver.session_id, driver.current_window_handle, snapshot["token"], snapshot["lastMutation"], model)
+    return model
+
+
+def get_page_model(driver: webdriver.Chrome) -> PageModel:
+    """
+    The snapshot of the page, shared by the extractors until the page navigates or its DOM changes, which the
+    mutation observer of page_readiness records.
+    """
+    if _cached is not None:
+        session_id, handle, token, last_mutation, model = _cached
+        if session_id == driver.session_id and handle == driver.current_window_handle and \
+                last_mutation is not None and driver.execute_script(STATE_SCRIPT) == [token, last_mutation]:
+            return model
+    return capture_page_model(driver)
@@ -0,0 +1,139 @@
+import threading
+import time
+import weakref
+from ElementExtraction.devtools import DevToolsSession
+
+# A page counts as network idle with this many requests still in flight, so that analytics beacons and
+# long polling connections do not hold the scan back
+NETWORK_IDLE_CONNECTIONS = 2
+# Requests in flight for longer than this are treated as background connections and ignored
+LONG_REQUEST_SECONDS = 5
+# How long the network and the DOM must stay quiet before the page counts as ready
+SETTLE_SECONDS = 0.5
+POLL_SECONDS = 0.1
+
+# Records the time of the last DOM mutation. Installed before the page scripts run on every new document,
+# or injected on the spot for browsers created without it.
+MUTATION_OBSERVER_SCRIPT = """
+(function () {
+    if (window.__genA11yLastMutation !== undefined) {
+        return;
+    }
+    window.__genA11yLastMutation = performance.now();
+    new MutationObserver(function () {
+        window.__genA11yLastMutation = performance.now();
+    }).observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+})();
+"""
+
+
+# The network tracker of each tab of each driver, by driver and window handle
+_trackers = weakref.WeakKeyDictionary()
+
+
+class NetworkTracker:
+    """
+    Keep the requests in flight on a tab from the network events of a DevTools session. The events are handled
+    as they arrive, so nothing is buffered between page loads, and requests in flight for longer than
+    LONG_REQUEST_SECONDS are forgotten as background connections.
+    """
+
+    def __init__(self, driver):
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._session = DevToolsSession(driver)
+        self._session.on("Network.requestWillBeSent", self._started)
+        self._session.on("Network.loadingFinished", self._ended)
+        self._session.on("Network.loadingFailed", self._ended)
+        self._session.send("Network.enable")
+
+    def _started(self, params: dict):
+        with self._lock:
+            self._in_flight.setdefault(params["requestId"], time.time())
+
+    def _ended(self, params: dict):
+        with self._lock:
+            self._in_flight.pop(params["requestId"], None)
+
+    def active_requests(self) -> int:
+        now = time.time()
+        with self._lock:
+            for request_id, started in list(self._in_flight.items()):
+                if now - started >= LONG_REQUEST_SECONDS:
+                    del self._in_flight[request_id]
+            return len(self._in_flight)
+
+    def close(self):
+        self._session.close()
+
+
+def track_network(driver):
+    """
+    Track the requests of the current tab of the driver for wait_for_page_ready, from now on, so before the tab
+    navigates. Returns the tracker for the caller to close with the tab, or None if DevTools is not available,
+    in which case the load event stands for network idle.
+    """
+    try:
+        tracker = NetworkTracker(driver)
+    except Exception as e:
+        print(f"Error tracking the network, waiting for the load event instead: {e}")
+        return None
+    _trackers.setdefault(driver, {})[driver.current_window_handle] = tracker
+    return tracker
+
+
+def install_mutation_observer(driver):
+    """ Track DOM mutations from the start of every document the browser loads from now on. """
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": MUTATION_OBSERVER_SCRIPT})
+
+
+def wait_for_page_ready(driver, timeout: float = 30, settle_seconds: float = SETTLE_SECONDS,
+                        eager: bool = False) -> float:
+    """
+    Wait until the page is ready to be extracted and return the seconds waited.
+
+    The page is ready once the DOM is parsed, at most NETWORK_IDLE_CONNECTIONS requests are in flight and no DOM
+    mutation happened for settle_seconds. The load event is not awaited, so a slow image or beacon does not hold
+    the scan back. In eager mode the network is not awaited either, which is enough for extractors that only
+    read the DOM. Raises an exception if the DOM is not even parsed by the timeout; a page that keeps changing
+    is extracted as it is once the timeout is reached.
+    """
+    start_time = time.time()
+    tracker = _trackers.get(driver, {}).get(driver.current_window_handle)
+    quiet_since = None
+
+    while True:
+        now = time.time()
+        state = driver.execute_script("""
+            return {
+                readyState: document.readyState,
+                sinceMutation: window.__genA11yLastMutation === undefined ?
+                    null : performance.now() - window.__genA11yLastMutation
+            };
+        """)
+        if state["sinceMutation"] is None:
+            driver.execute_script(MUTATION_OBSERVER_SCRIPT)
+            state["sinceMutation"] = 0
+
+        parsed = state["readyState"] in ("interactive", "complete")
+        if eager:
+            network_idle = True
+        elif tracker is not None:
+            network_idle = tracker.active_requests() <= NETWORK_IDLE_CONNECTIONS
+        else:
+            # Without a network tracker the load event is the only sign that the network has settled
+            network_idle = state["readyState"] == "complete"
+
+        if parsed and network_idle:
+            quiet_since = quiet_since or now
+            if now - quiet_since >= settle_seconds and state["sinceMutation"] >= settle_seconds * 1000:
+                return time.time() - start_time
+        else:
+            quiet_since = None
+
+        if now - start_time > timeout:
+            if not parsed:
+                raise Exception("Timed out waiting for page load.")
+            print(f"The page did not settle within {timeout} seconds, extracting it as it is.")
+            return time.time() - start_time
+        time.sleep(POLL_SECONDS)
@@ -0,0 +1,144 @@
+import json
+import os
+from urllib.parse import urlparse
+from selenium import webdriver
+from ElementExtraction.devtools import DevToolsSession
+from metrics import record_blocked_resource
+
+# Analytics, advertising and session recording services, blocked with block_tracking
+TRACKING_DOMAINS = (
+    "google-analytics.com", "googletagmanager.com", "googletagservices.com", "googlesyndication.com",
+    "googleadservices.com", "doubleclick.net", "adservice.google.com", "connect.facebook.net", "facebook.net",
+    "amazon-adsystem.com", "adnxs.com", "criteo.com", "criteo.net", "taboola.com", "outbrain.com",
+    "scorecardresearch.com", "quantserve.com", "hotjar.com", "clarity.ms", "bat.bing.com", "segment.io",
+    "segment.com", "mixpanel.com", "nr-data.net", "newrelic.com", "fullstory.com", "mouseflow.com",
+    "pubmatic.com", "rubiconproject.com", "casalemedia.com", "moatads.com", "yieldmo.com", "adsrvr.org",
+)
+
+# block_patterns: URL patterns to block, with * as a wildcard
+# block_tracking: block the TRACKING_DOMAINS
+# block_fonts: block web fonts, the text is then drawn with the fallback fonts
+# block_third_party_frames: block iframes from another site than the page
+# max_media_bytes: block audio and video files larger than this
+PRESETS = {
+    "full": {},
+    # What the checks look at, without trackers and ads. Media and third-party frames stay: 1.4.2 looks for
+    # autoplaying media and 4.1.2 for the names of embedded frames
+    "a11y": {"block_tracking": True},
+    # As a11y, without web fonts either, for the checks that do not look at rendered text
+    "minimal": {"block_tracking": True, "block_fonts": True},
+}
+
+# The policy the browsers of this process apply, set before the check processes start
+_policy = {}
+
+
+def load_policy(name_or_path: str) -> dict:
+    """ A preset by name, or the policy of a JSON file, whose keys may extend a preset named under "preset". """
+    if name_or_path in PRESETS:
+        return dict(PRESETS[name_or_path])
+    if not os.path.exists(name_or_path):
+        raise ValueError(f"Unknown resource policy: {name_or_path}. Presets: {', '.join(PRESETS)}")
+    with open(name_or_path) as f:
+        policy = json.load(f)
+    return dict(PRESETS[policy.pop("preset", "full")], **policy)
+
+
+def set_resource_policy(policy: dict):
+    global _policy
+    _policy = policy
+
+
+def get_resource_policy() -> dict:
+    return _policy
+
+
+def site(url: str) -> str:
+    """ The last two labels of the host of a URL, enough to tell first-party from third-party frames. """
+    return ".".join((urlparse(url).hostname or "").split(".")[-2:])
+
+
+def blocked_url_patterns(policy: dict) -> list:
+    patterns = list(policy.get("block_patterns", []))
+    if policy.get("block_tracking"):
+        for domain in TRACKING_DOMAINS:
+            patterns += [f"*//{domain}/*", f"*.{domain}/*"]
+    return patterns
+
+
+class ResourceBlocker:
+    """
+    Apply a resource policy to the page of a driver, recording every request it blocks in the metrics of the
+    check. URL patterns are blocked by the network stack itself; fonts, third-party frames and media sizes need
+    request interception, which is only enabled for those resource types.
+    """
+
+    def __init__(self, driver: webdriver.Chrome, policy: dict):
+        self.policy = policy
+        self._requests = {}
+        self._session = DevToolsSession(driver)
+        self._main_frame = self._session.send("Page.getFrameTree")["frameTree"]["frame"]["id"]
+
+        patterns = blocked_url_patterns(policy)
+        if patterns:
+            self._session.on("Network.requestWillBeSent", self._remember)
+            self._session.on("Network.loadingFailed", self._record_pattern_block)
+            self._session.send("Network.enable")
+            self._session.send("Network.setBlockedURLs", {"urls": patterns})
+
+        interception = []
+        if policy.get("block_fonts"):
+            interception.append({"urlPattern": "*", "resourceType": "Font", "requestStage": "Request"})
+        if policy.get("block_third_party_frames"):
+            interception.append({"urlPattern": "*", "resourceType": "Document", "requestStage": "Request"})
+        if policy.get("max_media_bytes"):
+            interception.append({"urlPattern": "*", "resourceType": "Media", "requestStage": "Response"})
+        if interception:
+            self._session.on("Fetch.requestPaused", self._filter)
+            self._session.send("Fetch.enable", {"patterns": interception})
+
+    def _remember(self, params: dict):
+        self._requests[params["requestId"]] = (params["request"]["url"], params.get("type"))
+
+    def _record_pattern_block(self, params: dict):
+        url, resource_type = self._requests.pop(params["requestId"], (None, params.get("type")))
+        if params.get("blockedReason") == "inspector" and url is not None:
+            record_blocked_resource(url, resource_type, "Blocked URL pattern")
+
+    def _block_reason(self, params: dict):
+        request = params["request"]
+        resource_type = params.get("resourceType")
+        if resource_type == "Font":
+            return "Font"
+        if resource_type == "Document":
+            if params.get("frameId") != self._main_frame and site(request["url"]) != site(self._page_url()):
+                return "Third-party frame"
+            return None
+        if resource_type == "Media":
+            headers = {header["name"].lower(): header["value"] for header in params.get("responseHeaders", [])}
+            # Range responses give the size of the whole file after the slash
+            size = headers.get("content-range", "").rpartition("/")[2] or headers.get("content-length", "")
+            if size.isdigit() and int(size) > self.policy["max_media_bytes"]:
+                return f"Media larger than {self.policy['max_media_bytes']} bytes"
+        return None
+
+    def _page_url(self) -> str:
+        return self._session.send("Page.getFrameTree")["frameTree"]["frame"]["url"]
+
+    def _filter(self, params: dict):
+        reason = self._block_reason(params)
+        if reason is None:
+            self._session.send("Fetch.continueRequest", {"requestId": params["requestId"]})
+            return
+        record_blocked_resource(params["request"]["url"], params.get("resourceType"), reason)
+        self._session.send("Fetch.failRequest", {"requestId": params["requestId"], "errorReason": "BlockedByClient"})
+
+    def close(self):
+        self._session.close()
+
+
+def apply_resource_policy(driver: webdriver.Chrome):
+    """ Apply the policy of this process to the current page of the driver. Returns the blocker, or None. """
+    if not _policy:
+        return None
+    return ResourceBlocker(driver, _policy)
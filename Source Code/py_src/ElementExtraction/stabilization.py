@@ -0,0 +1,73 @@
+from selenium import webdriver
+from selenium.common import WebDriverException
+
+# Longest wait for images, fonts and video frames, in milliseconds
+STABILIZE_TIMEOUT_MS = 5000
+
+# Freezes everything on the page that changes on its own, then waits until what is shown is fully decoded.
+# Running it again on the same document only waits for the images that appeared since.
+STABILIZE_SCRIPT = """
+const done = arguments[arguments.length - 1];
+if (!document.getElementById('genA11yStabilize')) {
+    const style = document.createElement('style');
+    style.id = 'genA11yStabilize';
+    style.textContent = '*, *::before, *::after { animation-play-state: paused !important; ' +
+        'transition: none !important; caret-color: transparent !important; scroll-behavior: auto !important; }';
+    document.head.appendChild(style);
+}
+for (const animation of document.getAnimations()) {
+    try {
+        animation.pause();
+        animation.currentTime = 0;
+    } catch (e) {
+        // Animations without a timeline cannot be seeked
+    }
+}
+if (document.activeElement && document.activeElement !== document.body) {
+    document.activeElement.blur();
+}
+const pending = [document.fonts.ready];
+for (const video of document.querySelectorAll('video')) {
+    video.pause();
+    if (video.currentTime !== 0) {
+        pending.push(new Promise(resolve => {
+            video.addEventListener('seeked', resolve, {once: true});
+            video.currentTime = 0;
+        }));
+    }
+}
+for (const image of document.images) {
+    image.loading = 'eager';
+    pending.push(image.decode().catch(() => null));
+}
+const timeout = new Promise(resolve => setTimeout(resolve, arguments[0]));
+Promise.race([Promise.all(pending), timeout]).then(() => {
+    requestAnimationFrame(() => requestAnimationFrame(() => done(true)));
+});
+"""
+
+# Whether screenshots are taken of a stabilized page, set before the check processes start
+_stabilize = False
+
+
+def set_stabilization(enabled: bool):
+    global _stabilize
+    _stabilize = enabled
+
+
+def stabilization_enabled() -> bool:
+    return _stabilize
+
+
+def stabilize_rendering(driver: webdriver.Chrome):
+    """
+    If stabilization is enabled, pause CSS and Web animations at their start, stop videos at their first frame,
+    hide the text caret and wait for images and fonts to be decoded, so that the same page gives the same
+    screenshot. Must not run before the checks that watch the page move have taken their evidence.
+    """
+    if not _stabilize:
+        return
+    try:
+        driver.execute_async_script(STABILIZE_SCRIPT, STABILIZE_TIMEOUT_MS)
+    except WebDriverException as e:
+        print(f"Error stabilizing the page: {e}")
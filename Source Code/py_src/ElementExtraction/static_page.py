@@ -0,0 +1,128 @@
+import lxml.etree
+import lxml.html
+from ElementExtraction.accessibility_tree import AccessibilityIndex
+from ElementExtraction.page_model import MODEL_STYLES, TEXT_TAGS, PageModel, escape_attribute
+
+# Without the style sheets, every element starts from the initial values of the model styles, overridden by its
+# inline style. Only the inherited ones are taken from the parent.
+STATIC_STYLES = {"display": "inline", "visibility": "visible", "opacity": "1", "position": "static", "left": "auto",
+                 "top": "auto", "right": "auto", "bottom": "auto", "z-index": "auto", "color": "rgb(0, 0, 0)",
+                 "background-color": "rgba(0, 0, 0, 0)", "background-image": "none", "font-size": "16px",
+                 "font-weight": "400", "white-space": "normal"}
+INHERITED_STYLES = ("visibility", "color", "font-size", "font-weight", "white-space")
+# Elements the user agent style sheet keeps the white space of
+PREFORMATTED_TAGS = ("pre", "listing", "xmp", "plaintext", "textarea")
+# Elements the user agent style sheet displays other than inline, which is where innerText breaks lines
+USER_AGENT_DISPLAY = dict({tag: "block" for tag in (
+    "html", "body", "address", "article", "aside", "blockquote", "dd", "details", "dialog", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hgroup",
+    "hr", "legend", "main", "menu", "nav", "ol", "p", "pre", "section", "summary", "ul", "optgroup", "option")},
+    li="list-item", table="table", caption="table-caption", thead="table-header-group",
+    tbody="table-row-group", tfoot="table-footer-group", tr="table-row", td="table-cell", th="table-cell")
+# Elements the user agent style sheet does not display
+UNDISPLAYED_TAGS = ("head", "title", "meta", "link", "base", "script", "style", "noscript", "template", "datalist")
+RAW_TEXT_TAGS = ("script", "style", "xmp", "iframe", "noembed", "noframes", "plaintext", "noscript")
+VOID_TAGS = ("area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr",
+             "basefont", "bgsound", "frame", "keygen", "param")
+EMPTY_RECT = {"x": 0, "y": 0, "width": 0, "height": 0}
+
+
+def escape_text(text: str) -> str:
+    """ Escape a text node as the browser serializes it. """
+    return text.replace("&", "&amp;").replace("\u00a0", "&nbsp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def inline_styles(style: str) -> dict:
+    """ The model styles set by a style attribute. """
+    declarations = {}
+    for declaration in (style or "").split(";"):
+        name, _, value = declaration.partition(":")
+        name = name.strip().lower()
+        value = value.replace("!important", "").strip().lower()
+        if name in MODEL_STYLES and value:
+            declarations[name] = value
+    return declarations
+
+
+def static_styles(element, parent_styles: dict) -> tuple:
+    """ The styles of an element as far as its markup tells, and whether it hides itself like inlineHidden. """
+    styles = dict(STATIC_STYLES, display=USER_AGENT_DISPLAY.get(element.tag, "inline"))
+    if parent_styles is not None:
+        styles.update((name, parent_styles[name]) for name in INHERITED_STYLES)
+    if element.tag in PREFORMATTED_TAGS:
+        styles["white-space"] = "pre"
+    inline = inline_styles(element.get("style"))
+    styles.update(inline)
+    hidden = element.get("hidden") is not None
+    if hidden or element.tag in UNDISPLAYED_TAGS or \
+            (element.tag == "input" and (element.get("type") or "").lower() == "hidden"):
+        styles["display"] = "none"
+    return styles, hidden or inline.get("display") == "none" or inline.get("visibility") == "hidden"
+
+
+def static_page_model(page_source) -> PageModel:
+    """
+    A PageModel of an HTML document parsed with lxml instead of read from a browser, in the format of the
+    snapshot: the same nodes, start and end tags, attributes and text, so the extractors that only read markup
+    give the same results. Styles come from the inline styles only, elements are visible unless their markup
+    hides them, and boxes and ::before and ::after content are unknown.
+    page_source is the HTML as text, e.g. driver.page_source, or as bytes, whose encoding lxml detects.
+    """
+    root = lxml.html.document_fromstring(page_source)
+    nodes = []
+    # (lxml element or text, parent index, parent styles, inside a template, parent visible)
+    stack = [(root, -1, None, False, True)]
+    while stack:
+        item, parent, parent_styles, inert, parent_visible = stack.pop()
+        if isinstance(item, str):
+            parent_tag = nodes[parent]["tag"]
+            nodes.append({"kind": "text", "parent": parent,
+                          "html": item if parent_tag in RAW_TEXT_TAGS else escape_text(item)})
+            continue
+        if not isinstance(item.tag, str):
+            if item.tag is lxml.etree.Comment:
+                nodes.append({"kind": "comment", "parent": parent, "html": f"<!--{item.text or ''}-->"})
+            # Comments and processing instructions carry the text that follows them
+            if item.tail:
+                stack.append((item.tail, parent, parent_styles, inert, parent_visible))
+            continue
+        index = len(nodes)
+        tag = item.tag.lower()
+        attributes = {name: value for name, value in item.attrib.items()}
+        styles, inline_hidden = static_styles(item, parent_styles)
+        visible = parent_visible and styles["display"] != "none"
+        start = f"<{tag}" + "".join(f' {name}="{escape_attribute(value)}"' for name, value in attributes.items()) \
+            + ">"
+        nodes.append({
+            "kind": "element", "parent": parent, "tag": tag, "start": start,
+            "end": "" if tag in VOID_TAGS else f"</{tag}>", "attributes": attributes, "styles": styles,
+            "before": "none", "after": "none", "rect": EMPTY_RECT, "visible": visible, "inlineHidden": inline_hidden,
+            "inert": inert
+        })
+        if item.tail:
+            stack.append((item.tail, parent, parent_styles, inert, parent_visible))
+        children = ([item.text] if item.text else []) + list(item)
+        for child in reversed(children):
+            stack.append((child, index, styles, inert or tag == "template", visible))
+
+    model = PageModel(nodes)
+    # The recorded text of TEXT_TAGS, with white space collapsed and a space in place of the line breaks
+    for index in model.elements:
+        if model.tag(index) in TEXT_TAGS:
+            nodes[index]["text"] = model.rendered_text(index)
+    return model
+
+
+def static_accessibility_index(model: PageModel) -> AccessibilityIndex:
+    """
+    An AccessibilityIndex of a static page model. Without a browser, the only names resolved are those given by
+    aria-labelledby, as the text of the referenced elements; roles and states are unknown.
+    """
+    nodes = []
+    for element in model.with_attribute("aria-labelledby"):
+        referenced = [model.element_by_id(element_id)
+                      for element_id in model.attribute(element, "aria-labelledby").split()]
+        name = " ".join(model.text_content(index) for index in referenced if index is not None)
+        nodes.append({"backendDOMNodeId": element, "name": {"value": name}})
+    # Elements are identified by their own index in the model
+    return AccessibilityIndex(model, model.elements, nodes)
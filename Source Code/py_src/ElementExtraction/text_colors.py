@@ -0,0 +1,191 @@
+from selenium import webdriver
+
+# Finds every visible element with text of its own (text nodes or ::before/::after content) and resolves, in the
+# page, the colors its text is drawn with: the background is the element's background color composited over the
+# backgrounds of its ancestors down to the first opaque one, or the white canvas; the text color is composited over
+# that background. Every color is faded by the opacity of the element that paints it and of its ancestors.
+# An element whose background is, or shows through to, a background image or gradient has no background color,
+# and its background image is returned instead. Neither has an element whose text overlaps a replaced element
+# (image, video, canvas...) or a positioned element with a background that is not one of its ancestors, like text
+# laid over a hero image or an overlay: what is painted behind it is not in its ancestors, so only a screenshot
+# tells.
+TEXT_COLORS_SCRIPT = """
+const skippedTags = new Set(['script', 'style', 'noscript', 'template', 'title', 'head', 'meta', 'link']);
+const canvas = document.createElement('canvas');
+canvas.width = canvas.height = 1;
+const context = canvas.getContext('2d', {willReadFrequently: true});
+const colors = new Map();
+const backgrounds = new Map();
+const opacities = new Map();
+const replacedTags = new Set(['img', 'video', 'canvas', 'svg', 'iframe', 'object', 'embed', 'picture']);
+
+function parseColor(value) {
+    if (colors.has(value)) {
+        return colors.get(value);
+    }
+    let rgba;
+    const match = value.match(/^rgba?\\(([\\d.]+),\\s*([\\d.]+),\\s*([\\d.]+)(?:,\\s*([\\d.]+))?\\)$/);
+    if (match) {
+        rgba = [+match[1], +match[2], +match[3], match[4] === undefined ? 1 : +match[4]];
+    } else {
+        // Colors in other spaces, e.g. oklch() or color(display-p3 ...), are converted by drawing them
+        context.clearRect(0, 0, 1, 1);
+        context.fillStyle = '#000';
+        context.fillStyle = value;
+        context.fillRect(0, 0, 1, 1);
+        const data = context.getImageData(0, 0, 1, 1).data;
+        rgba = [data[0], data[1], data[2], data[3] / 255];
+    }
+    colors.set(value, rgba);
+    return rgba;
+}
+
+function over(top, bottom) {
+    const alpha = top[3];
+    return [0, 1, 2].map(i => top[i] * alpha + bottom[i] * (1 - alpha));
+}
+
+// The opacity of an element composited with that of its ancestors
+function opacity(element) {
+    if (opacities.has(element)) {
+        return opacities.get(element);
+    }
+    const result = parseFloat(getComputedStyle(element).opacity) *
+        (element.parentElement ? opacity(element.parentElement) : 1);
+    opacities.set(element, result);
+    return result;
+}
+
+function faded(color, element) {
+    return [color[0], color[1], color[2], color[3] * opacity(element)];
+}
+
+// {color: [r, g, b]} or {image: background-image}
+function background(element) {
+    if (backgrounds.has(element)) {
+        return backgrounds.get(element);
+    }
+    const style = getComputedStyle(element);
+    let result;
+    if (style.backgroundImage !== 'none') {
+        result = {image: style.backgroundImage};
+    } else {
+        const color = faded(parseColor(style.backgroundColor), element);
+        const behind = color[3] >= 1 ? null : (element.parentElement ? background(element.parentElement) :
+            {color: [255, 255, 255]});
+        if (behind === null) {
+            result = {color: color.slice(0, 3)};
+        } else if (behind.image !== undefined) {
+            result = color[3] > 0 ? {image: behind.image} : behind;
+        } else {
+            result = {color: over(color, behind.color)};
+        }
+    }
+    backgrounds.set(element, result);
+    return result;
+}
+
+function pseudoText(element, pseudo) {
+    const content = getComputedStyle(element, pseudo).getPropertyValue('content');
+    const match = content.match(/^"(.*)"$/s);
+    return match ? match[1] : '';
+}
+
+function visible(element) {
+    if (element.checkVisibility) {
+        return element.checkVisibility({opacityProperty: true, visibilityProperty: true});
+    }
+    const style = getComputedStyle(element);
+    return element.getClientRects().length > 0 && style.visibility !== 'hidden' && style.opacity !== '0';
+}
+
+// Replaced elements, and positioned elements that paint a background, with their boxes
+const elements = document.body ? Array.from(document.body.querySelectorAll('*')) : [];
+const painters = [];
+for (const element of elements) {
+    const style = getComputedStyle(element);
+    const positioned = ['absolute', 'fixed', 'sticky'].includes(style.position);
+    if (!replacedTags.has(element.localName) && !(positioned &&
+            (style.backgroundImage !== 'none' || parseColor(style.backgroundColor)[3] > 0))) {
+        continue;
+    }
+    const rect = element.getBoundingClientRect();
+    if (rect.width > 0 && rect.height > 0 && visible(element)) {
+        painters.push({element: element, rect: rect});
+    }
+}
+
+// The boxes of the text of an element, or its own box for ::before and ::after content
+function textRects(element, rect) {
+    const rects = [];
+    for (const child of element.childNodes) {
+        if (child.nodeType === Node.TEXT_NODE && child.data.trim()) {
+            const range = document.createRange();
+            range.selectNodeContents(child);
+            rects.push(...range.getClientRects());
+        }
+    }
+    return rects.length ? rects : [rect];
+}
+
+// A replaced or positioned element, other than the element's ancestors and descendants, under or over its text
+function overlapping(element, rect) {
+    const rects = textRects(element, rect);
+    for (const painter of painters) {
+        if (painter.element.contains(element) || element.contains(painter.element)) {
+            continue;
+        }
+        const box = painter.rect;
+        if (rects.some(r => r.left < box.right && r.right > box.left && r.top < box.bottom && r.bottom > box.top)) {
+            return painter.element;
+        }
+    }
+    return null;
+}
+
+const result = [];
+for (const element of elements) {
+    if (skippedTags.has(element.localName)) {
+        continue;
+    }
+    let text = '';
+    for (const child of element.childNodes) {
+        if (child.nodeType === Node.TEXT_NODE) {
+            text += child.data;
+        }
+    }
+    text = (pseudoText(element, '::before') + text + pseudoText(element, '::after')).trim();
+    if (!text || !visible(element)) {
+        continue;
+    }
+    const rect = element.getBoundingClientRect();
+    if (rect.width === 0 || rect.height === 0) {
+        continue;
+    }
+    const style = getComputedStyle(element);
+    const color = faded(parseColor(style.color), element);
+    const painter = overlapping(element, rect);
+    const behind = painter ? {image: `<${painter.localName}> under or over the text`} : background(element);
+    result.push({
+        html: element.cloneNode(false).outerHTML,
+        text: text.replace(/\\s+/g, ' ').slice(0, 200),
+        color: behind.color ? over(color, behind.color) : color.slice(0, 3),
+        background: behind.color || null,
+        backgroundImage: behind.image || null,
+        fontSize: parseFloat(style.fontSize),
+        fontWeight: parseInt(style.fontWeight, 10) || 400,
+        rect: {x: rect.left + window.scrollX, y: rect.top + window.scrollY, width: rect.width, height: rect.height}
+    });
+}
+return result;
+"""
+
+
+def read_text_colors(driver: webdriver.Chrome) -> list:
+    """
+    The resolved colors of every visible text element, in one script:
+    [{"html", "text", "color", "background", "backgroundImage", "fontSize", "fontWeight", "rect"}], with colors as
+    [r, g, b] and "background" None where the text is over a background image or gradient, or overlaps another
+    image or positioned element, which "backgroundImage" then describes.
+    """
+    return driver.execute_script(TEXT_COLORS_SCRIPT)
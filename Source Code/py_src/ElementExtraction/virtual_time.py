@@ -0,0 +1,71 @@
+import threading
+import time
+from selenium import webdriver
+from ElementExtraction.devtools import DevToolsSession
+
+# Longest real time a virtual time budget may take, for pages whose scripts keep the CPU busy
+REAL_TIMEOUT_SECONDS = 10
+# Highest playback rate browsers accept, used to fast-forward media, which does not follow the virtual clock
+MAX_PLAYBACK_RATE = 16
+# Whether timing-based extractors fast-forward the page clock, set before the check processes start
+_virtual_time = False
+
+
+def set_virtual_time(enabled: bool):
+    global _virtual_time
+    _virtual_time = enabled
+
+
+def virtual_time_enabled() -> bool:
+    return _virtual_time
+
+
+class RealClock:
+    """ Let the page run in real time. """
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+    def close(self):
+        pass
+
+
+class VirtualClock:
+    """
+    Let the page run on a virtual clock: sleep() advances its timers and animation frames by the given seconds
+    as fast as the CPU allows, then pauses the clock so that snapshots are taken at an exact virtual time.
+    On close the clock keeps advancing on its own, skipping the idle time between timers, since a page cannot
+    go back to real time once virtual time is enabled: a page shared with other extractors must not use it.
+    """
+
+    def __init__(self, driver: webdriver.Chrome):
+        self._expired = threading.Event()
+        self._session = DevToolsSession(driver)
+        self._session.on("Emulation.virtualTimeBudgetExpired", lambda params: self._expired.set())
+
+    def sleep(self, seconds: float):
+        self._expired.clear()
+        self._session.send("Emulation.setVirtualTimePolicy", {"policy": "advance", "budget": seconds * 1000})
+        if not self._expired.wait(REAL_TIMEOUT_SECONDS):
+            print(f"The page did not run {seconds} seconds of virtual time within {REAL_TIMEOUT_SECONDS} seconds.")
+
+    def close(self):
+        try:
+            self._session.send("Emulation.setVirtualTimePolicy", {"policy": "advance"})
+        finally:
+            self._session.close()
+
+
+def page_clock(driver: webdriver.Chrome):
+    """ The clock timing-based extractors wait on: virtual if the mode is enabled and the browser supports it. """
+    if virtual_time_enabled():
+        try:
+            return VirtualClock(driver)
+        except Exception as e:
+            print(f"Virtual time is not available, waiting in real time: {e}")
+    return RealClock()
+
+
+def media_playback_rate() -> float:
+    """ The rate to play media at while waiting on it, which fast-forwards it if virtual time is enabled. """
+    return MAX_PLAYBACK_RATE if virtual_time_enabled() else 1
@@ -0,0 +1,139 @@
+import fcntl
+import importlib.util
+import json
+import os
+import time
+from selenium import webdriver
+
+# Cookie fields Network.setCookies accepts
+COOKIE_FIELDS = ("name", "value", "domain", "path", "expires", "httpOnly", "secure", "sameSite")
+# The state is refreshed when it expires within this many seconds, so no scan starts with a login about to lapse
+REFRESH_MARGIN_SECONDS = 60
+DEFAULT_MAX_AGE_SECONDS = 3600
+
+# Restores the localStorage of the logged-in origins in every new document, without overwriting what the page
+# stored itself
+STORAGE_SCRIPT = """
+(function (origins) {
+    const items = origins[location.origin];
+    if (!items) {
+        return;
+    }
+    for (const item of items) {
+        if (localStorage.getItem(item.name) === null) {
+            localStorage.setItem(item.name, item.value);
+        }
+    }
+})(%s);
+"""
+
+# The login shared by the browsers of this process, set before the check processes start:
+# {"state_path", "login_script", "max_age"}
+_auth = None
+# The storage script installed in each tab, by window handle, replaced when the state is applied again
+_storage_scripts = {}
+
+
+def set_auth(state_path: str, login_script: str = None, max_age: float = DEFAULT_MAX_AGE_SECONDS):
+    global _auth
+    _auth = {"state_path": state_path, "login_script": login_script, "max_age": max_age}
+
+
+def auth_enabled() -> bool:
+    return _auth is not None
+
+
+def load_auth_state() -> dict:
+    """
+    The saved state, in the storage state format of Playwright: {"cookies": [...], "origins": [{"origin",
+    "localStorage": [{"name", "value"}]}]}, so a state exported from a browser session can be used as it is.
+    """
+    with open(_auth["state_path"]) as f:
+        return json.load(f)
+
+
+def state_expires_at(state: dict) -> float:
+    """ When the state expires: its own expires_at, or, for an imported state, the earliest expiring cookie. """
+    if "expires_at" in state:
+        return state["expires_at"]
+    expiries = [cookie["expires"] for cookie in state.get("cookies", []) if cookie.get("expires", -1) > 0]
+    return min(expiries, default=float("inf"))
+
+
+def auth_state_expired() -> bool:
+    if not os.path.exists(_auth["state_path"]):
+        return True
+    return state_expires_at(load_auth_state()) < time.time() + REFRESH_MARGIN_SECONDS
+
+
+def load_login_script(path: str):
+    """ Import a login script, a Python file defining login(driver) and optionally AUTH_COOKIES. """
+    spec = importlib.util.spec_from_file_location("login_script", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def capture_auth_state(driver: webdriver.Chrome, max_age: float, auth_cookies=()) -> dict:
+    """
+    The cookies of the browser and the localStorage of its current origin. The state expires after max_age, or
+    when the first of the auth_cookies expires, if the login script names them.
+    """
+    cookies = [{field: cookie[field] for field in COOKIE_FIELDS if field in cookie}
+               for cookie in driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]]
+    origin, items = driver.execute_script(
+        "return [location.origin, Object.entries(localStorage).map(([name, value]) => ({name, value}))];")
+    captured_at = time.time()
+    expires_at = captured_at + max_age
+    for cookie in cookies:
+        if cookie["name"] in auth_cookies and cookie.get("expires", -1) > 0:
+            expires_at = min(expires_at, cookie["expires"])
+    return {"cookies": cookies, "origins": [{"origin": origin, "localStorage": items}],
+            "captured_at": captured_at, "expires_at": expires_at}
+
+
+def refresh_auth_state(create_driver):
+    """
+    Log in with the login script in a browser of its own and save the state it ends up with. Processes that find
+    the state expired at the same time wait for the first one to log in instead of logging in as well.
+    """
+    if _auth["login_script"] is None:
+        print(f"The login state {_auth['state_path']} has expired and there is no login script to refresh it.")
+        return
+    with open(f"{_auth['state_path']}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not auth_state_expired():
+            return
+        script = load_login_script(_auth["login_script"])
+        driver = create_driver()
+        try:
+            script.login(driver)
+            state = capture_auth_state(driver, _auth["max_age"], getattr(script, "AUTH_COOKIES", ()))
+        finally:
+            driver.quit()
+        temp_path = f"{_auth['state_path']}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(temp_path, _auth["state_path"])
+
+
+def apply_auth_state(driver: webdriver.Chrome):
+    """ Give the browser the cookies and localStorage of the saved state, before it navigates to the page. """
+    state = load_auth_state()
+    cookies = [dict(cookie) for cookie in state.get("cookies", [])]
+    for cookie in cookies:
+        # Session cookies have no expiry
+        if cookie.get("expires", -1) <= 0:
+            cookie.pop("expires", None)
+    if cookies:
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+
+    origins = {origin["origin"]: origin.get("localStorage", []) for origin in state.get("origins", [])}
+    handle = driver.current_window_handle
+    previous_script = _storage_scripts.pop(handle, None)
+    if previous_script is not None:
+        driver.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument", {"identifier": previous_script})
+    if origins:
+        _storage_scripts[handle] = driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+            "source": STORAGE_SCRIPT % json.dumps(origins)
+        })["identifier"]
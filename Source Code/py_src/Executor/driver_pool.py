@@ -0,0 +1,241 @@
+import os
+import time
+from urllib.parse import urlparse
+from multiprocessing import util
+from selenium import webdriver
+from selenium.common import WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.remote.command import Command
+import ElementExtraction.extract_related_elements as extraction
+from ElementExtraction.extract_related_elements import wait_for_load
+from ElementExtraction.devtools import DevToolsSession
+from ElementExtraction.page_archive import PageReplayer, replay_enabled
+from ElementExtraction.page_readiness import install_mutation_observer, track_network
+from ElementExtraction.resource_policy import apply_resource_policy
+from Executor.auth_session import apply_auth_state, auth_enabled, auth_state_expired, refresh_auth_state
+from consts import TEMP_FILE_FOLDER
+from metrics import count_screenshot
+
+# The browser owned by the current pool worker, kept alive between URLs
+_driver = None
+
+
+class MeteredChrome(webdriver.Chrome):
+    """
+    Chrome that counts the screenshots taken through it, including the screenshots of its elements, and closes
+    the DevTools helpers attached to it when it quits.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._attached = []
+
+    def attach(self, helper):
+        """ Close a helper, e.g. a PageReplayer or ResourceBlocker, when the browser quits. Returns the helper. """
+        if helper is not None:
+            self._attached.append(helper)
+        return helper
+
+    def quit(self):
+        for helper in self._attached:
+            try:
+                helper.close()
+            except Exception as e:
+                print(f"Error closing {type(helper).__name__}: {e}")
+        self._attached = []
+        super().quit()
+
+    def execute(self, driver_command: str, params: dict = None):
+        if driver_command in (Command.SCREENSHOT, Command.ELEMENT_SCREENSHOT) or \
+                (params and params.get("cmd") == "Page.captureScreenshot"):
+            count_screenshot()
+        return super().execute(driver_command, params)
+
+
+def create_driver(eager: bool = False) -> webdriver.Chrome:
+    """
+    Launch the headless Chrome used by the scans, with the resource policy of this process. An eager browser
+    returns from driver.get() once the DOM is parsed, without waiting for images and other subresources.
+    """
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--autoplay-policy=no-user-gesture-required")
+    if eager:
+        options.page_load_strategy = "eager"
+    driver = MeteredChrome(options=options)
+    install_mutation_observer(driver)
+    driver.attach(track_network(driver))
+    # Lives as long as the browser, blocking what the resource policy of this process excludes
+    driver.attach(apply_resource_policy(driver))
+    driver.maximize_window()
+    return driver
+
+
+class IsolatedContext:
+    """
+    A tab in a browser context of its own, opened in the browser of a driver. Its cookies, storage, cache and
+    DOM are separate from the other tabs, so an extractor that rewrites the page cannot affect them, at the cost
+    of a tab rather than of a whole browser. The driver controls the tab until close().
+    """
+
+    def __init__(self, driver: webdriver.Chrome):
+        self._driver = driver
+        self._main_handle = driver.current_window_handle
+        self._replayer = None
+        self._session = DevToolsSession(driver, browser=True)
+        try:
+            self.context_id = self._session.send("Target.createBrowserContext",
+                                                 {"disposeOnDetach": True})["browserContextId"]
+            target_id = self._session.send("Target.createTarget", {
+                "url": "about:blank",
+                "browserContextId": self.context_id
+            })["targetId"]
+            driver.switch_to.window(self._find_handle(target_id))
+        except Exception:
+            self._session.close()
+            raise
+        install_mutation_observer(driver)
+        self._tracker = track_network(driver)
+        self._blocker = apply_resource_policy(driver)
+        driver.maximize_window()
+
+    def _find_handle(self, target_id: str, timeout: float = 5) -> str:
+        """ The window handle of a target, once the driver has noticed it. """
+        deadline = time.time() + timeout
+        while True:
+            for handle in self._driver.window_handles:
+                if handle.endswith(target_id):
+                    return handle
+            if time.time() > deadline:
+                raise Exception(f"The driver did not see the tab {target_id}")
+            time.sleep(0.05)
+
+    def load(self, url: str):
+        """ Load the URL in the tab, logged in, and from the archive if replay is enabled. """
+        authenticate(self._driver)
+        if replay_enabled():
+            self._replayer = PageReplayer(self._driver, url)
+        self._driver.get(url)
+        wait_for_load(self._driver)
+
+    def close(self):
+        """ Close the tab and its context, and give the driver back its previous tab. """
+        if self._replayer is not None:
+            self._replayer.close()
+        if self._blocker is not None:
+            self._blocker.close()
+        if self._tracker is not None:
+            self._tracker.close()
+        try:
+            self._driver.close()
+        except WebDriverException as e:
+            print(f"Error closing the isolated tab: {e}")
+        self._driver.switch_to.window(self._main_handle)
+        try:
+            self._session.send("Target.disposeBrowserContext", {"browserContextId": self.context_id})
+        except Exception as e:
+            print(f"Error disposing the isolated context: {e}")
+        self._session.close()
+
+
+def authenticate(driver: webdriver.Chrome):
+    """ Give the browser the shared login before it navigates, logging in again first if it has expired. """
+    if not auth_enabled():
+        return
+    if auth_state_expired():
+        refresh_auth_state(create_driver)
+    try:
+        apply_auth_state(driver)
+    except (OSError, ValueError, WebDriverException) as e:
+        print(f"Error applying the login state, scanning logged out: {e}")
+
+
+def is_driver_healthy(driver: webdriver.Chrome) -> bool:
+    """ Check whether the browser still answers commands. """
+    try:
+        return driver.execute_script("return 1;") == 1 and len(driver.window_handles) > 0
+    except WebDriverException:
+        return False
+
+
+def quit_driver(driver: webdriver.Chrome):
+    try:
+        driver.quit()
+    except WebDriverException as e:
+        print(f"Error quitting the browser: {e}")
+
+
+def reset_driver(driver: webdriver.Chrome):
+    """
+    Remove the state the previous URL left behind: extra windows, cookies, storage, window size and zoom.
+    """
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+
+    parsed_url = urlparse(driver.current_url)
+    if parsed_url.scheme in ('http', 'https'):
+        driver.execute_cdp_cmd("Storage.clearDataForOrigin", {
+            "origin": f"{parsed_url.scheme}://{parsed_url.netloc}",
+            "storageTypes": "all"
+        })
+    driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+    driver.execute_cdp_cmd("Emulation.clearDeviceMetricsOverride", {})
+    # Leaving the page also drops the zoom applied through the body style
+    driver.get("about:blank")
+    driver.maximize_window()
+
+
+def get_driver() -> webdriver.Chrome:
+    """ Return the browser of this worker, restarting it if it crashed. """
+    global _driver
+    if _driver is not None and not is_driver_healthy(_driver):
+        print("The browser stopped responding, restarting it.")
+        quit_driver(_driver)
+        _driver = None
+    if _driver is None:
+        _driver = create_driver()
+    return _driver
+
+
+def open_url(url: str) -> webdriver.Chrome:
+    """ Reset the browser of this worker and load the URL in it. """
+    global _driver
+    driver = get_driver()
+    try:
+        reset_driver(driver)
+    except WebDriverException as e:
+        print(f"Error resetting the browser, restarting it: {e}")
+        quit_driver(driver)
+        _driver = None
+        driver = get_driver()
+    authenticate(driver)
+    driver.get(url)
+    wait_for_load(driver)
+    return driver
+
+
+def close_worker():
+    global _driver
+    if _driver is not None:
+        quit_driver(_driver)
+        _driver = None
+
+
+def worker_temp_folder() -> str:
+    return os.path.join(TEMP_FILE_FOLDER, f"worker_{os.getpid()}")
+
+
+def init_worker():
+    """
+    Pool initializer. Gives the worker a temp folder of its own, so that the screenshots of URLs scanned
+    at the same time do not overwrite each other, and starts the browser it keeps for its whole life.
+    """
+    folder = worker_temp_folder()
+    os.makedirs(folder, exist_ok=True)
+    extraction.TEMP_FILE_FOLDER = folder
+    get_driver()
+    # Quit the browser when the pool shuts the worker down with close() and join()
+    util.Finalize(None, close_worker, exitpriority=16)
@@ -1,11 +1,31 @@
+import argparse
 import logging
-from multiprocessing import Manager, Process
+import socket
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from multiprocessing import Pool, Process, Queue
 import pandas as pd
 import requests
 from requests.compat import chardet
-from selenium.webdriver.firefox.options import Options
+import ElementExtraction.extract_related_elements as extraction
 from ElementExtraction.extract_related_elements import *
 from A11yDetector.a11y_detector import *
+from ElementExtraction.page_archive import DEFAULT_ARCHIVE_MAX_AGE_SECONDS, PageRecorder, PageReplayer, has_archive, \
+    replay_enabled, scroll_through_page, set_replay
+from ElementExtraction.resource_policy import PRESETS, load_policy, set_resource_policy
+from ElementExtraction.stabilization import set_stabilization
+from ElementExtraction.virtual_time import set_virtual_time
+from Executor.manifest import start_manifest
+from Executor.auth_session import DEFAULT_MAX_AGE_SECONDS, auth_state_expired, refresh_auth_state, set_auth
+from Executor.driver_pool import authenticate, create_driver, init_worker, open_url, worker_temp_folder
+from Executor.pipeline import run_pipeline
+from Executor.prescreen import list_saved_pages, prescreen_process, read_url_list
+from Executor.results import save_result, save_time_consumed, save_timing, wait_for_checks
+from Executor.scheduler import run_scheduled
+from Executor.work_queue import WorkQueue
+from metrics import add_time, get_metrics, reset_metrics, use_thread_metrics
+from Executor.scan_session import CHECKS, required_extractors, run_scan_session, run_detection, select_criteria, \
+    share_contrast_estimate
 
 
 def extract_data_from_excel(file_path: str, start_row: int, end_row: int):
@@ -24,17 +44,34 @@ def extract_data_from_excel(file_path: str, start_row: int, end_row: int):
 
     return data_tuples
 
-def prepare_driver(url: str):
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--autoplay-policy=no-user-gesture-required")
-    driver = webdriver.Chrome(options=options)
-    driver.maximize_window()
+def prepare_driver(url: str, eager: bool = False):
+    start_time = time.time()
+    driver = create_driver(eager)
+    if replay_enabled():
+        # Lives as long as the browser, serving the page from the recording of the first load
+        driver.attach(PageReplayer(driver, url))
+    authenticate(driver)
     driver.get(url)
-    wait_for_load(driver)
+    wait_for_load(driver, eager=eager)
+    add_time("prepare_driver", time.time() - start_time)
     return driver
 
 
+def record_page(url: str):
+    """ Load the URL once, scrolling through it, and record everything it downloads into its archive. """
+    driver = create_driver()
+    try:
+        recorder = PageRecorder(driver)
+        authenticate(driver)
+        driver.get(url)
+        wait_for_load(driver)
+        scroll_through_page(driver)
+        wait_for_load(driver)
+        recorder.save(url)
+    finally:
+        driver.quit()
+
+
 def check_combined_detection(combined_detection_result: str) -> bool:
     # Check if combined result contains both "Yes" and "data-mutation-id"
     if "Yes" in combined_detection_result and ("data-mutation-id" in combined_detection_result):
@@ -133,15 +170,14 @@ def check_audio_control(url: str):
     return detection_result
 
 
-def check_color_contrast_aa(url: str):
+def check_color_contrast(url: str):
     """
-    SC 1.4.3: Contrast (Minimum)
+    SC 1.4.3: Contrast (Minimum) & SC 1.4.6: Contrast (Enhanced)
     """
     driver = prepare_driver(url)
-    contrast_related_elements, elements_with_background_image = extract_contrast_related_elements(driver)
-    detection_result = detect_color_contrast_violation_aa(contrast_related_elements, elements_with_background_image)
+    text_colors = extract_text_colors(driver)
     driver.quit()
-    return detection_result
+    return detect_color_contrast_violations(text_colors)
 
 
 def check_resize_text(url: str):
@@ -156,17 +192,6 @@ def check_resize_text(url: str):
     return detection_result
 
 
-def check_color_contrast_aaa(url: str):
-    """
-    SC 1.4.6: Contrast (Enhanced)
-    """
-    driver = prepare_driver(url)
-    contrast_related_elements, elements_with_background_image = extract_contrast_related_elements(driver)
-    detection_result = detect_color_contrast_violation_aaa(contrast_related_elements, elements_with_background_image)
-    driver.quit()
-    return detection_result
-
-
 def check_image_of_text(url: str):
     """
     SC 1.4.5 & 1.4.9: Image of Text
@@ -386,7 +411,7 @@ def check_abbreviations(url: str):
     """
     driver = prepare_driver(url)
     # Call this after text resizing
-    initial_screenshot_str = find_related_screenshots(driver, TEMP_FILE_FOLDER)
+    initial_screenshot_str = find_related_screenshots(driver, extraction.TEMP_FILE_FOLDER)
     detection_result = detect_abbreviations_violation(initial_screenshot_str)
     driver.quit()
     return detection_result
@@ -420,7 +445,7 @@ def check_error_identified(url: str):
     """
     driver = prepare_driver(url)
     # Call this after text resizing
-    initial_screenshot_str = find_related_screenshots(driver, TEMP_FILE_FOLDER)
+    initial_screenshot_str = find_related_screenshots(driver, extraction.TEMP_FILE_FOLDER)
     detection_result = detect_error_identified_violation(initial_screenshot_str)
     driver.quit()
     return detection_result
@@ -443,7 +468,7 @@ def check_error_suggestion(url: str):
     """
     driver = prepare_driver(url)
     # Call this after text resizing
-    initial_screenshot_str = find_related_screenshots(driver, TEMP_FILE_FOLDER)
+    initial_screenshot_str = find_related_screenshots(driver, extraction.TEMP_FILE_FOLDER)
     detection_result = detect_error_suggestion_violation(initial_screenshot_str)
     driver.quit()
     return detection_result
@@ -483,30 +508,25 @@ def check_info_relation_and_resize_text_and_others(url: str):
     driver3.quit()
 
     driver4 = prepare_driver(url)
-    initial_screenshot_str_abbr = find_related_screenshots(driver4, TEMP_FILE_FOLDER)
-    abbreviation_result = detect_abbreviations_violation(initial_screenshot_str_abbr)
+    initial_screenshot_str_abbr = find_related_screenshots(driver4, extraction.TEMP_FILE_FOLDER)
     driver4.quit()
-
-    driver5 = prepare_driver(url)
+    # The screenshots do not need a browser, so 3.1.4, 3.3.1 and 3.3.3 share them
+    abbreviation_result = detect_abbreviations_violation(initial_screenshot_str_abbr)
     error_identified_result = detect_error_identified_violation(initial_screenshot_str_abbr)
-    driver5.quit()
-
-    driver6 = prepare_driver(url)
     error_suggestion_result = detect_error_suggestion_violation(initial_screenshot_str_abbr)
-    driver6.quit()
 
-    driver7 = prepare_driver(url)
-    text_blocks = extract_text_blocks_with_details(driver7)
+    driver5 = prepare_driver(url)
+    text_blocks = extract_text_blocks_with_details(driver5)
     text_block_result = detect_visual_presentation_violation(text_blocks)
-    driver7.quit()
+    driver5.quit()
 
-    driver8 = prepare_driver(url)
-    section_headings = extract_headings_under_sections(driver8)
+    driver6 = prepare_driver(url)
+    section_headings = extract_headings_under_sections(driver6)
     if screenshot_list:
         detection_headings_result = detect_section_heading_violation(section_headings, screenshot_list)
     else:
         detection_headings_result = detect_section_heading_violation(section_headings, initial_screenshot_str_abbr)
-    driver8.quit()
+    driver6.quit()
 
     return {
         "1.3.1": info_relation_result,
@@ -524,13 +544,10 @@ def check_purpose_and_label_in_name(url: str):
     """
     Combined: SC 2.5.3
     """
-    driver1 = prepare_driver(url)
-    label_set = extract_label_in_name(driver1)
-    driver1.quit()
-
-    driver2 = prepare_driver(url)
+    driver = prepare_driver(url)
+    label_set = extract_label_in_name(driver)
+    driver.quit()
     label_in_name_result = detect_label_in_name_violation(label_set)
-    driver2.quit()
 
     return {
         "2.5.3": label_in_name_result
@@ -541,15 +558,12 @@ def check_language_of_page_and_page_title(url: str):
     """
     Combined: SC 3.1.1, 3.1.2 & 2.4.2
     """
-    driver1 = prepare_driver(url)
-    lang_attr_dict = extract_lang_attr(driver1)
-    page_title_dict = extract_page_title(driver1)
+    driver = prepare_driver(url)
+    lang_attr_dict = extract_lang_attr(driver)
+    page_title_dict = extract_page_title(driver)
+    driver.quit()
     language_result = detect_lang_violation(page_title_dict, lang_attr_dict)
-    driver1.quit()
-
-    driver2 = prepare_driver(url)
     page_title_result = detect_title_violation(page_title_dict)
-    driver2.quit()
 
     return {
         "2.4.2": page_title_result,
@@ -578,99 +592,487 @@ def check_name_role_value_and_heading_label_description(url: str):
     }
 
 
-def run_check_function(check_function, website_url, a11y_result_dict, key):
+# List of checks run in parallel for every URL, as (check function, key)
+CHECK_FUNCTIONS = [
+    (check_non_text_content, "1.1.1"),
+    (check_meaningful_sequence, "1.3.2"),
+    (check_sensory_characteristics, "1.3.3"),
+    (check_orientation, "1.3.4"),
+    (check_input_purpose, "1.3.5"),
+    (check_use_of_color, "1.4.1"),
+    (check_audio_control, "1.4.2"),
+    (check_color_contrast, "combined_1.4.3"),
+    (check_image_of_text, "1.4.51.4.9"),
+    (check_non_text_contrast, "1.4.11"),
+    (check_text_spacing, "1.4.12"),
+    (check_timing_adjustable, "2.2.1"),
+    (check_pause_stop_hide, "2.2.2"),
+    (check_bypass_blocks, "2.4.1"),
+    (check_link_purpose_a, "2.4.4"),
+    (check_multiple_ways, "2.4.5"),
+    (check_location, "2.4.8"),
+    (check_link_purpose_aaa, "2.4.9"),
+    (check_target_size_enhanced, "2.5.5"),
+    (check_target_size_minimum, "2.5.8"),
+    (check_on_input, "3.2.2"),
+    (check_change_on_request, "3.2.5"),
+    (check_labels_or_instructions, "3.3.2"),
+    (check_info_relation_and_resize_text_and_others, "combined_1.3.1"),
+    (check_purpose_and_label_in_name, "combined_1.3.6"),
+    (check_language_of_page_and_page_title, "combined_3.1.1"),
+    (check_name_role_value_and_heading_label_description, "combined_4.1.2")
+]
+
+# Criteria reported by each combined check
+COMBINED_CRITERIA = {
+    "combined_1.3.1": ("1.3.1", "1.4.4", "1.4.8", "1.4.10", "2.4.10", "3.1.4", "3.3.1", "3.3.3"),
+    "combined_1.3.6": ("2.5.3",),
+    "combined_1.4.3": ("1.4.3", "1.4.6"),
+    "combined_3.1.1": ("2.4.2", "3.1.1"),
+    "combined_4.1.2": ("2.4.6", "4.1.2")
+}
+
+
+def check_criteria(key: str) -> tuple:
+    """ Return the criteria a check reports. """
+    return COMBINED_CRITERIA.get(key, (key,))
+
+
+def run_check(check_function, website_url, key) -> dict:
+    """ Run a check and return its results by criterion. """
     result = check_function(website_url)
     if "combined" in key:
         # Special handling for combined checks
-        for criterion, criterion_result in result.items():
-            a11y_result_dict[criterion] = criterion_result
-    else:
-        a11y_result_dict[key] = result
+        return dict(result)
+    return {key: result}
 
 
-def main_process(website_url: str, folder_name: str):
+def run_check_function(check_function, website_url, folder_name, notice_queue, key):
+    """ Run a check, write each of its results as soon as it is known and notify the parent. """
+    reset_metrics()
+    results = run_check(check_function, website_url, key)
+    # The criteria of a combined check share one browser and one record
+    timing = dict(get_metrics(), check=key)
+    for criterion, criterion_result in results.items():
+        notice_queue.put((criterion, save_result(criterion, criterion_result, folder_name,
+                                                 timing["blocked_resources"]), timing))
+
+
+def save_check(check_function, website_url, key, folder_name) -> dict:
+    """ Scheduler and queue job: run a check and write its results and timing, leaving nothing to send back. """
+    reset_metrics()
+    results = run_check(check_function, website_url, key)
+    timing = dict(get_metrics(), check=key)
+    for criterion, criterion_result in results.items():
+        save_result(criterion, criterion_result, folder_name, timing["blocked_resources"])
+    save_timing(folder_name, {criterion: timing for criterion in results})
+    return {}
+
+
+def run_detection_function(criterion, extracted, folder_name, notice_queue, blocked_resources=()):
+    # Drop the extraction record inherited from the session, it is saved once for all criteria
+    reset_metrics()
+    result = run_detection(criterion, extracted)
+    if result is not None:
+        notice_queue.put((criterion, save_result(criterion, result, folder_name, blocked_resources),
+                          get_metrics()))
+
+
+def session_process(website_url: str, folder_name: str, criteria=None, completed=(), on_complete=None,
+                    eager: bool = False):
+    """
+    Extract the evidence of all criteria from a single browser session, then run the detectors in parallel.
+    Criteria in completed are skipped; on_complete(criterion, file_path) is called as each result is saved.
+    With eager, the extractors that only read the DOM start before the images have loaded.
+    """
     start_time = time.time()
-    with Manager() as manager:
-        a11y_results = manager.dict()
-
-        # List of functions to run in parallel
-        functions_to_run = [
-            (check_non_text_content, website_url, a11y_results, "1.1.1"),
-            (check_meaningful_sequence, website_url, a11y_results, "1.3.2"),
-            (check_sensory_characteristics, website_url, a11y_results, "1.3.3"),
-            (check_orientation, website_url, a11y_results, "1.3.4"),
-            (check_input_purpose, website_url, a11y_results, "1.3.5"),
-            (check_use_of_color, website_url, a11y_results, "1.4.1"),
-            (check_audio_control, website_url, a11y_results, "1.4.2"),
-            (check_color_contrast_aa, website_url, a11y_results, "1.4.3"),
-            (check_color_contrast_aaa, website_url, a11y_results, "1.4.6"),
-            (check_image_of_text, website_url, a11y_results, "1.4.51.4.9"),
-            (check_non_text_contrast, website_url, a11y_results, "1.4.11"),
-            (check_text_spacing, website_url, a11y_results, "1.4.12"),
-            (check_timing_adjustable, website_url, a11y_results, "2.2.1"),
-            (check_pause_stop_hide, website_url, a11y_results, "2.2.2"),
-            (check_bypass_blocks, website_url, a11y_results, "2.4.1"),
-            (check_link_purpose_a, website_url, a11y_results, "2.4.4"),
-            (check_multiple_ways, website_url, a11y_results, "2.4.5"),
-            (check_location, website_url, a11y_results, "2.4.8"),
-            (check_link_purpose_aaa, website_url, a11y_results, "2.4.9"),
-            (check_target_size_enhanced, website_url, a11y_results, "2.5.5"),
-            (check_target_size_minimum, website_url, a11y_results, "2.5.8"),
-            (check_on_input, website_url, a11y_results, "3.2.2"),
-            (check_change_on_request, website_url, a11y_results, "3.2.5"),
-            (check_labels_or_instructions, website_url, a11y_results, "3.3.2"),
-            (check_info_relation_and_resize_text_and_others, website_url, a11y_results, "combined_1.3.1"),
-            (check_purpose_and_label_in_name, website_url, a11y_results, "combined_1.3.6"),
-            (check_language_of_page_and_page_title, website_url, a11y_results, "combined_3.1.1"),
-            (check_name_role_value_and_heading_label_description, website_url, a11y_results, "combined_4.1.2")
-        ]
-
-        # Create and start processes
-        processes = []
-        for func, website_url, a11y_result_dict, key in functions_to_run:
-            p = Process(target=run_check_function, args=(func, website_url, a11y_result_dict, key))
-            processes.append(p)
-            p.start()
-
-        # Join processes (wait for all processes to finish)
-        for p in processes:
-            p.join()
-
-        # Convert results to a regular dictionary and print
-        final_results = dict(a11y_results)
-
-        # Create the folder if it doesn't exist
-        os.makedirs(folder_name, exist_ok=True)
-
-        # Save the JSON files for criteria that have 'overall_violation' as 'Yes'
-        for key, result in final_results.items():
-            try:
-                result = json.loads(result)
-                if result:
-                    file_path = os.path.join(folder_name, f"{key}.json")
-                    # Save the result as a JSON file
-                    with open(file_path, 'w') as f:
-                        json.dump(result, f, indent=2)
-            except Exception as e:
-                print(f"Error saving the JSON file for {key}: {e}")
-                file_path_txt = os.path.join(folder_name, f"{key}.txt")
-                with open(file_path_txt, 'w') as f:
-                    f.write(str(result))
-
-        # Record the end time and calculate total time consumed
-        end_time = time.time()
-        total_time_seconds = end_time - start_time
-
-        # Save the time consumed in a JSON file
-        time_file_path = os.path.join(folder_name, "Time Consumed.json")
-        with open(time_file_path, 'w') as f:
-            json.dump({"time_consumed_seconds": total_time_seconds}, f, indent=4)
+    criteria = list(CHECKS) if criteria is None else criteria
+    criteria = [criterion for criterion in criteria if criterion not in completed]
+    if not criteria:
+        return
+
+    reset_metrics()
+    driver = prepare_driver(website_url, eager)
+    try:
+        extracted = run_scan_session(driver, website_url, required_extractors(criteria), eager)
+    finally:
+        driver.quit()
+    share_contrast_estimate(extracted, criteria)
+    session_timing = get_metrics()
+
+    notice_queue = Queue()
+    processes = []
+    for criterion in criteria:
+        p = Process(target=run_detection_function,
+                    args=(criterion, extracted, folder_name, notice_queue, session_timing["blocked_resources"]))
+        processes.append(p)
+        p.start()
+
+    timings = wait_for_checks(processes, notice_queue, on_complete)
+    timings["scan_session"] = session_timing
+    save_timing(folder_name, timings)
+    save_time_consumed(folder_name, start_time)
+
+
+def pooled_scan(task):
+    """
+    Scan one (URL, output folder, completed criteria) task inside a pool worker, reusing the browser the worker
+    keeps between URLs. The detectors run in threads because pool workers cannot start processes of their own,
+    each thread timing its detector in a record of its own.
+    """
+    website_url, folder_name, completed = task
+    criteria = [criterion for criterion in CHECKS if criterion not in completed]
+    if not criteria:
+        return website_url
+    start_time = time.time()
+
+    def detect(criterion):
+        use_thread_metrics()
+        return run_detection(criterion, extracted), get_metrics()
+
+    try:
+        delete_all_files_in_folder(worker_temp_folder())
+        reset_metrics()
+        driver = open_url(website_url)
+        extracted = run_scan_session(driver, website_url, required_extractors(criteria))
+        share_contrast_estimate(extracted, criteria)
+        timings = {"scan_session": get_metrics()}
+
+        with ThreadPoolExecutor(max_workers=len(criteria)) as thread_pool:
+            futures = {thread_pool.submit(detect, criterion): criterion for criterion in criteria}
+            # Write each result as soon as its detector finishes
+            for future in as_completed(futures):
+                criterion = futures[future]
+                try:
+                    result, timings[criterion] = future.result()
+                    if result is not None:
+                        save_result(criterion, result, folder_name, timings["scan_session"]["blocked_resources"])
+                except Exception as e:
+                    print(f"Error detecting {criterion} for {website_url}: {e}")
+        save_timing(folder_name, timings)
+        save_time_consumed(folder_name, start_time)
+    except Exception as e:
+        print(f"Error scanning {website_url}: {e}")
+    return website_url
+
+
+def batch_process(tasks: list, pool_size: int = 4, resume: bool = False):
+    """
+    Scan a list of (URL, output folder) tasks with a pool of long-lived workers.
+    Each worker keeps its modules imported and its browser open across all the URLs it handles.
+    With resume, the criteria the manifest of an output folder records as completed are skipped.
+    """
+    tasks = [(website_url, folder_name, start_manifest(folder_name, resume)) for website_url, folder_name in tasks]
+    pool = Pool(processes=pool_size, initializer=init_worker)
+    try:
+        for website_url in pool.imap_unordered(pooled_scan, tasks):
+            logging.getLogger(__name__).info(f'Finished {website_url}')
+    finally:
+        # close() and join() rather than terminate(), so the workers get to quit their browsers
+        pool.close()
+        pool.join()
+
+
+def scheduled_process(website_data: list, browser_slots: int = 8, llm_slots: int = 8, check_timeout: float = 900,
+                      resume: bool = False):
+    """
+    Scan a list of (URL, output folder) pairs with one global scheduler, instead of one URL after another.
+    With resume, the checks the manifest of an output folder records as completed are skipped.
+    """
+    # The checks of a URL may start at any point of the batch, so its time is counted from the batch start
+    batch_start = time.time()
+    completed = [start_manifest(folder_name, resume) for _, folder_name in website_data]
+    jobs = [(url_index, key, save_check, (func, website_url, key, folder_name))
+            for url_index, (website_url, folder_name) in enumerate(website_data)
+            for func, key in CHECK_FUNCTIONS
+            if not all(criterion in completed[url_index] for criterion in check_criteria(key))]
+
+    def on_url_complete(url_index, results, timed_out):
+        website_url, folder_name = website_data[url_index]
+        logging.getLogger(__name__).info(f'Finished {website_url}')
+        # The checks wrote their own results, only the messages of the timed out checks are left
+        for key, message in timed_out.items():
+            for criterion in check_criteria(key):
+                save_result(criterion, message, folder_name, record=False)
+        save_time_consumed(folder_name, batch_start)
+
+    run_scheduled(jobs, on_url_complete, browser_slots, llm_slots, check_timeout)
+
+
+def pipelined_process(website_data: list, extraction_workers: int = 2, detection_workers: int = 8,
+                      queue_size: int = 64, resume: bool = False):
+    """
+    Scan a list of (URL, output folder) pairs with extraction and detection running as separate stages.
+    With resume, the criteria the manifest of an output folder records as completed are skipped.
+    """
+    batch_start = time.time()
+
+    def on_url_complete(url_index):
+        save_time_consumed(website_data[url_index][1], batch_start)
+
+    completed = [start_manifest(folder_name, resume) for _, folder_name in website_data]
+    run_pipeline(website_data, on_url_complete, extraction_workers, detection_workers, queue_size,
+                 completed=completed)
+
+
+def queue_worker(db_path: str, lease_seconds: float = 120):
+    """
+    Worker node loop: lease (URL, check) jobs from the shared queue and run each in a process of its own,
+    renewing the lease while it runs. Stops once the queue has no job left.
+    """
+    worker = f"{socket.gethostname()}-{os.getpid()}"
+    work_queue = WorkQueue(db_path)
+    check_by_key = {key: func for func, key in CHECK_FUNCTIONS}
+    # Screenshots of this worker go to a folder of their own, other workers may be scanning other URLs
+    extraction.TEMP_FILE_FOLDER = worker_temp_folder()
+    os.makedirs(extraction.TEMP_FILE_FOLDER, exist_ok=True)
+
+    while True:
+        job = work_queue.lease(worker, lease_seconds)
+        if job is None:
+            if work_queue.is_finished():
+                break
+            time.sleep(5)
+            continue
+
+        job_id, website_url, folder_name, key = job
+        logging.getLogger(__name__).info(f'{worker} running {key} for {website_url}')
+        delete_all_files_in_folder(extraction.TEMP_FILE_FOLDER)
+        p = Process(target=save_check, args=(check_by_key[key], website_url, key, folder_name))
+        p.start()
+        while p.is_alive():
+            p.join(lease_seconds / 3)
+            if p.is_alive() and not work_queue.heartbeat(job_id, worker, lease_seconds):
+                # The lease expired and the job went to another worker
+                print(f"Lost the lease of {key} for {website_url}, stopping it.")
+                p.terminate()
+                p.join()
+
+        if p.exitcode == 0:
+            work_queue.complete(job_id, worker)
+        else:
+            work_queue.fail(job_id, worker, f"Exit code {p.exitcode}")
+
+
+def run_queue_workers(db_path: str, workers: int = 4, lease_seconds: float = 120):
+    """ Run several queue workers on this machine until the shared queue is empty. """
+    processes = [Process(target=queue_worker, args=(db_path, lease_seconds)) for _ in range(workers)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+
+
+def coordinate(db_path: str, website_data: list, resume: bool = False):
+    """
+    Enqueue one job per (URL, check) of the (URL, output folder) pairs, then report progress until the worker
+    nodes have finished them all. With resume, the checks the manifest of an output folder records as completed
+    are not enqueued; the output folders must then be on a file system the coordinator shares with the workers.
+    """
+    work_queue = WorkQueue(db_path)
+    jobs = []
+    for website_url, folder_name in website_data:
+        completed = start_manifest(folder_name, resume)
+        jobs += [(website_url, folder_name, key) for _, key in CHECK_FUNCTIONS
+                 if not all(criterion in completed for criterion in check_criteria(key))]
+    added = work_queue.enqueue(jobs)
+    logging.getLogger(__name__).info(f'Enqueued {added} jobs')
+    while not work_queue.is_finished():
+        logging.getLogger(__name__).info(f'Queue status: {work_queue.counts()}')
+        time.sleep(30)
+    logging.getLogger(__name__).info(f'Queue finished: {work_queue.counts()}')
+
+
+def main_process(website_url: str, folder_name: str, scan_session: bool = False, completed=(), on_complete=None,
+                 criteria=None, eager: bool = False, archive: bool = False,
+                 archive_max_age: float = DEFAULT_ARCHIVE_MAX_AGE_SECONDS):
+    """
+    Run every check on a URL. Checks whose criteria are all in completed are skipped, and
+    on_complete(criterion, file_path) is called as each result is saved.
+    Given a list of criteria, only the extractors and detectors they need run, in one browser session.
+    With archive, the page is recorded on its first scan, or again once its recording is older than
+    archive_max_age seconds, and every browser replays that recording.
+    """
+    if archive and not has_archive(website_url, archive_max_age):
+        try:
+            record_page(website_url)
+        except Exception as e:
+            print(f"Error recording {website_url}, scanning the live page: {e}")
+            archive = False
+    # Set before the check processes start, so that their browsers inherit it
+    set_replay(archive)
+    if scan_session or criteria is not None:
+        session_process(website_url, folder_name, criteria, completed=completed, on_complete=on_complete,
+                        eager=eager)
+        return
+
+    start_time = time.time()
+    # Each check writes its own results, the queue only carries the completion notices
+    notice_queue = Queue()
+
+    functions_to_run = [(func, website_url, folder_name, notice_queue, key) for func, key in CHECK_FUNCTIONS
+                        if not all(criterion in completed for criterion in check_criteria(key))]
+    if not functions_to_run:
+        return
+
+    # Create and start processes
+    processes = []
+    for func, website_url, folder_name, notice_queue, key in functions_to_run:
+        p = Process(target=run_check_function, args=(func, website_url, folder_name, notice_queue, key))
+        processes.append(p)
+        p.start()
+
+    # Wait for all processes to finish, then record the timing of each criterion and the time consumed
+    save_timing(folder_name, wait_for_checks(processes, notice_queue, on_complete))
+    save_time_consumed(folder_name, start_time)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip the checks the manifest of a previous run records as completed")
+    parser.add_argument("--input", default="Real Website URLS.xlsx",
+                        help="Excel file listing the URLs to scan, with 'URL' and 'Folder Name' columns")
+    parser.add_argument("--start-row", type=int, default=0,
+                        help="First row to scan of the Excel file, --url-list or --html-dir")
+    parser.add_argument("--end-row", type=int,
+                        help="Last row to scan, included: row 5 of the Excel file, or the last row of --url-list or "
+                             "--html-dir by default")
+    parser.add_argument("--queue", help="SQLite work queue shared by a coordinator and worker nodes")
+    parser.add_argument("--role", choices=["coordinator", "worker"], default="worker",
+                        help="Enqueue the URLs of the Excel file, or run checks leased from the queue")
+    parser.add_argument("--workers", type=int, default=4, help="Queue workers started by a worker node")
+    # Ways to scan every criterion of the URL list, instead of one process and one browser per check
+    scan_mode = parser.add_mutually_exclusive_group()
+    scan_mode.add_argument("--pool", type=int, metavar="N",
+                           help="Scan the URLs with N long-lived workers, each keeping one browser for all of its "
+                                "URLs")
+    scan_mode.add_argument("--schedule", action="store_true",
+                           help="Scan the URLs with one scheduler running checks of any URL in the free browser slots")
+    parser.add_argument("--browser-slots", type=int, default=8, help="With --schedule, checks running at a time")
+    parser.add_argument("--llm-slots", type=int, default=8, help="With --schedule, model requests running at a time")
+    parser.add_argument("--check-timeout", type=float, default=900,
+                        help="With --schedule, seconds after which a check is stopped along with its browser")
+    scan_mode.add_argument("--pipeline", action="store_true",
+                           help="Scan the URLs with browsers extracting pages while separate workers run the detectors")
+    parser.add_argument("--extraction-workers", type=int, default=2,
+                        help="With --pipeline, workers extracting pages, each with one browser")
+    parser.add_argument("--detection-workers", type=int, default=8,
+                        help="With --pipeline, workers running the detectors on the extracted evidence")
+    parser.add_argument("--criteria", help="Comma-separated criteria to check, e.g. 1.4.3,2.4.4")
+    parser.add_argument("--level", choices=["A", "AA", "AAA"],
+                        help="Only check the criteria required to conform at this level")
+    parser.add_argument("--url", help="Scan this URL instead of the URLs of the Excel file. With --prescreen, it can "
+                                      "also be the path of a saved HTML file")
+    parser.add_argument("--output", default="Results",
+                        help="Output folder of --url, or the folder holding one folder per page of --url-list and "
+                             "--html-dir")
+    parser.add_argument("--archive", action="store_true",
+                        help="Record each page on its first load and replay the recording in every later session")
+    parser.add_argument("--archive-max-age", type=float, default=DEFAULT_ARCHIVE_MAX_AGE_SECONDS,
+                        help="Seconds after which the recording of a page is made again")
+    parser.add_argument("--eager", action="store_true",
+                        help="Start the extractors that only read the DOM before the images have loaded")
+    parser.add_argument("--virtual-time", action="store_true",
+                        help="Fast-forward the page clock in the checks that watch the page change over time")
+    parser.add_argument("--stabilize", action="store_true",
+                        help="Freeze animations, videos and carets before the screenshots, once the motion checks "
+                             "have their evidence, so identical pages give identical screenshots")
+    parser.add_argument("--resources", default="full",
+                        help=f"Resource policy of the scan browsers: a preset ({', '.join(PRESETS)}) or a JSON file")
+    parser.add_argument("--auth-state",
+                        help="Login state shared by every browser: cookies and localStorage, in the storage state "
+                             "format of Playwright. Written by --login-script, or exported from a logged-in browser")
+    parser.add_argument("--login-script",
+                        help="Python file whose login(driver) logs in, run once and again whenever the state expires")
+    parser.add_argument("--auth-max-age", type=float, default=DEFAULT_MAX_AGE_SECONDS,
+                        help="Seconds after which a login made by --login-script is made again")
+    parser.add_argument("--prescreen", nargs="?", const="extract", choices=["extract", "detect"],
+                        help="Without a browser, extract the evidence of the criteria that only need the HTML of "
+                             "each page into its output folder, and with 'detect' run their detectors on it")
+    parser.add_argument("--prescreen-workers", type=int, help="Processes parsing HTML, one per CPU by default")
+    parser.add_argument("--url-list",
+                        help="With --prescreen, a text file of URLs to pre-screen, one per line, optionally "
+                             "followed by its output folder")
+    parser.add_argument("--html-dir", help="With --prescreen, a folder of saved HTML files to pre-screen")
+    args = parser.parse_args()
+    excel_end_row = 5 if args.end_row is None else args.end_row
+    # Set before the check processes start, so that they inherit them
+    set_virtual_time(args.virtual_time)
+    set_stabilization(args.stabilize)
+    try:
+        set_resource_policy(load_policy(args.resources))
+    except ValueError as e:
+        parser.error(str(e))
+    if args.login_script and not args.auth_state:
+        parser.error("--login-script needs --auth-state to save the login to")
+    if args.auth_state:
+        set_auth(args.auth_state, args.login_script, args.auth_max_age)
+        # Log in once here rather than in every check process
+        if auth_state_expired():
+            refresh_auth_state(create_driver)
+
     # Set up the logger
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     logger = logging.getLogger(__name__)
+
+    if args.queue:
+        if args.role == "coordinator":
+            coordinate(args.queue, extract_data_from_excel(args.input, args.start_row, excel_end_row), args.resume)
+        else:
+            run_queue_workers(args.queue, args.workers)
+        sys.exit(0)
+
+    if args.prescreen:
+        try:
+            selected_criteria = select_criteria([criterion.strip() for criterion in args.criteria.split(",")]
+                                                if args.criteria else None, args.level)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.url:
+            prescreen_tasks = [(args.url, args.output)]
+        elif args.url_list:
+            prescreen_tasks = read_url_list(args.url_list, args.output, args.start_row, args.end_row)
+        elif args.html_dir:
+            prescreen_tasks = list_saved_pages(args.html_dir, args.output, args.start_row, args.end_row)
+        else:
+            prescreen_tasks = extract_data_from_excel(args.input, args.start_row, excel_end_row)
+        logger.info(f'Prescreening {len(prescreen_tasks)} pages')
+        prescreen_process(prescreen_tasks, args.prescreen_workers, detect=args.prescreen == "detect",
+                          criteria=selected_criteria)
+        sys.exit(0)
+
+    website_data = [(args.url, args.output)] if args.url else \
+        extract_data_from_excel(args.input, args.start_row, excel_end_row)
+    if args.pool:
+        logger.info(f'Scanning {len(website_data)} URLs with {args.pool} workers')
+        batch_process(website_data, args.pool, resume=args.resume)
+        sys.exit(0)
+    if args.schedule:
+        logger.info(f'Scanning {len(website_data)} URLs with {args.browser_slots} browser slots')
+        scheduled_process(website_data, args.browser_slots, args.llm_slots, args.check_timeout, resume=args.resume)
+        sys.exit(0)
+    if args.pipeline:
+        logger.info(f'Scanning {len(website_data)} URLs with {args.extraction_workers} extraction and '
+                    f'{args.detection_workers} detection workers')
+        pipelined_process(website_data, args.extraction_workers, args.detection_workers, resume=args.resume)
+        sys.exit(0)
+
+    if args.criteria or args.level or args.url or args.eager:
+        # Selective scan: only the extractors and detectors of the selected criteria run
+        try:
+            selected_criteria = select_criteria([criterion.strip() for criterion in args.criteria.split(",")]
+                                                if args.criteria else None, args.level)
+        except ValueError as e:
+            parser.error(str(e))
+        logger.info(f'Checking {", ".join(selected_criteria)}')
+        for url, folder_name in website_data:
+            logger.info(f'The current URL is: {url}')
+            delete_all_files_in_folder(TEMP_FILE_FOLDER)
+            main_process(url, folder_name, completed=start_manifest(folder_name, args.resume),
+                         criteria=selected_criteria, eager=args.eager, archive=args.archive,
+                         archive_max_age=args.archive_max_age)
+        sys.exit(0)
     # website_data = extract_data_from_excel("Real Website URLS.xlsx", 2, 5)
     # for url, folder_name in website_data:
     #     logger.info('The current URL is: ' + url + ':')
@@ -681,8 +1083,6 @@ if __name__ == "__main__":
     if not os.path.exists(VARIABILITY_FOLDER):
         os.makedirs(VARIABILITY_FOLDER)
 
-    website_data = extract_data_from_excel("Real Website URLS.xlsx", 0, 5)
-
     for url, folder_name in website_data:
         logger.info(f'The current URL is: {url}')
 
@@ -693,15 +1093,21 @@ if __name__ == "__main__":
 
         # Run the process 3 times for each URL
         for run_number in range(1, 4):
-            logger.info(f'Run {run_number} for URL: {url}')
-
             # Create a subfolder for this run
             run_folder = os.path.join(current_folder_path, f'Run_{run_number}')
             if not os.path.exists(run_folder):
                 os.makedirs(run_folder)
 
+            # Criteria the manifest of the run folder records as completed
+            completed = start_manifest(run_folder, args.resume)
+            if all(criterion in completed for _, key in CHECK_FUNCTIONS for criterion in check_criteria(key)):
+                logger.info(f'Run {run_number} for URL: {url} is already complete, skipping it')
+                continue
+            logger.info(f'Run {run_number} for URL: {url}')
+
             # Clear the temporary file folder
             delete_all_files_in_folder(TEMP_FILE_FOLDER)
 
-            # Execute the main process
-            main_process(url, run_folder)
+            # Execute the main process, each saved criterion is recorded in the manifest of the run folder
+            main_process(url, run_folder, completed=completed, archive=args.archive,
+                         archive_max_age=args.archive_max_age)
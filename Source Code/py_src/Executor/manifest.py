@@ -0,0 +1,62 @@
+import hashlib
+import json
+import os
+
+# Record of the criteria completed in an output folder and the hashes of their results, kept in the folder
+MANIFEST_FILE_NAME = "manifest.ndjson"
+
+
+def file_sha256(file_path: str):
+    """ Hash an output file, or return None if it does not exist. """
+    if file_path is None or not os.path.exists(file_path):
+        return None
+    with open(file_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def record_completion(folder_name: str, criterion: str, file_path):
+    """
+    Append a completed criterion to the manifest of its output folder. file_path is the result file, or None if
+    the check had nothing to save. One line per write, so a crash can at most lose the line being written.
+    """
+    entry = {"criterion": criterion, "file": file_path, "sha256": file_sha256(file_path)}
+    os.makedirs(folder_name, exist_ok=True)
+    with open(os.path.join(folder_name, MANIFEST_FILE_NAME), 'a') as f:
+        f.write(json.dumps(entry) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def load_completed(folder_name: str) -> set:
+    """
+    Read the manifest of an output folder into the set of completed criteria. An entry only counts if its result
+    file is still on disk with the recorded hash, so results deleted or damaged since are run again.
+    """
+    completed = set()
+    manifest_path = os.path.join(folder_name, MANIFEST_FILE_NAME)
+    if not os.path.exists(manifest_path):
+        return completed
+    with open(manifest_path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line of a killed run may be cut short
+                continue
+            if entry["file"] is not None and file_sha256(entry["file"]) != entry["sha256"]:
+                continue
+            completed.add(entry["criterion"])
+    return completed
+
+
+def start_manifest(folder_name: str, resume: bool) -> set:
+    """
+    The criteria to skip in an output folder: with resume, those its manifest records as completed. Without it,
+    the manifest is cleared and every criterion runs again.
+    """
+    if resume:
+        return load_completed(folder_name)
+    manifest_path = os.path.join(folder_name, MANIFEST_FILE_NAME)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    return set()
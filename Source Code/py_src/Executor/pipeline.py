@@ -0,0 +1,138 @@
+import logging
+from collections import Counter
+from multiprocessing import Process, Queue
+from queue import Empty
+from ElementExtraction.extract_related_elements import delete_all_files_in_folder
+from Executor.driver_pool import init_worker, close_worker, open_url, worker_temp_folder
+from Executor.results import save_result, save_timing
+from Executor.scan_session import CHECKS, required_extractors, run_scan_session, run_detection, \
+    share_contrast_estimate
+from metrics import get_metrics, reset_metrics
+
+
+def extraction_worker(url_queue: Queue, detection_queue: Queue, event_queue: Queue):
+    """
+    First stage: extract the evidence of a URL for its criteria with the browser of this worker, hand one
+    detection job per criterion to the second stage and move on to the next URL without waiting for the model.
+    """
+    init_worker()
+    try:
+        while True:
+            task = url_queue.get()
+            if task is None:
+                break
+            url_index, website_url, folder_name, criteria = task
+            if not criteria:
+                # Every criterion of the URL is already completed
+                event_queue.put(("extracted", url_index, 0))
+                continue
+            jobs = []
+            try:
+                delete_all_files_in_folder(worker_temp_folder())
+                reset_metrics()
+                driver = open_url(website_url)
+                extracted = run_scan_session(driver, website_url, required_extractors(criteria))
+                share_contrast_estimate(extracted, criteria)
+                session_timing = get_metrics()
+                save_timing(folder_name, {"scan_session": session_timing})
+                blocked_resources = session_timing["blocked_resources"]
+                jobs = [(url_index, folder_name, criterion,
+                         {name: extracted[name] for name in CHECKS[criterion][0]}, blocked_resources)
+                        for criterion in criteria]
+            except Exception as e:
+                print(f"Error extracting {website_url}: {e}")
+            event_queue.put(("extracted", url_index, len(jobs)))
+            # Blocks while the detection stage is behind, which keeps the evidence held in memory bounded
+            for job in jobs:
+                detection_queue.put(job)
+    finally:
+        close_worker()
+
+
+def detection_worker(detection_queue: Queue, event_queue: Queue):
+    """
+    Second stage: run the detector of each criterion on the evidence extracted by the first stage and write
+    its result and timing straight to the output folder.
+    """
+    while True:
+        job = detection_queue.get()
+        if job is None:
+            break
+        url_index, folder_name, criterion, inputs, blocked_resources = job
+        try:
+            reset_metrics()
+            result = run_detection(criterion, inputs)
+            if result is not None:
+                save_result(criterion, result, folder_name, blocked_resources)
+            save_timing(folder_name, {criterion: get_metrics()})
+        except Exception as e:
+            print(f"Error detecting {criterion}: {e}")
+        event_queue.put(("detected", url_index, criterion))
+
+
+def run_pipeline(website_data: list, on_url_complete, extraction_workers: int = 2, detection_workers: int = 8,
+                 queue_size: int = 64, criteria=None, completed=None):
+    """
+    Scan (URL, output folder) pairs with extraction and detection as separate stages joined by a bounded
+    queue. Browsers are released as soon as a page is extracted, while the detection stage waits on the model.
+    Each result is written as soon as it is detected; on_url_complete(url_index) is called once every
+    criterion of a URL has been detected. completed, if given, holds the criteria to skip for each URL.
+    """
+    criteria = list(CHECKS) if criteria is None else criteria
+    url_queue = Queue()
+    detection_queue = Queue(maxsize=queue_size)
+    event_queue = Queue()
+
+    for url_index, (website_url, folder_name) in enumerate(website_data):
+        skipped = completed[url_index] if completed is not None else ()
+        url_queue.put((url_index, website_url, folder_name,
+                       [criterion for criterion in criteria if criterion not in skipped]))
+    for _ in range(extraction_workers):
+        url_queue.put(None)
+
+    extractors = [Process(target=extraction_worker, args=(url_queue, detection_queue, event_queue))
+                  for _ in range(extraction_workers)]
+    detectors = [Process(target=detection_worker, args=(detection_queue, event_queue))
+                 for _ in range(detection_workers)]
+    for p in extractors + detectors:
+        p.start()
+
+    expected = {}
+    received = Counter()
+    completed = set()
+    detectors_stopped = False
+
+    def complete(url_index):
+        completed.add(url_index)
+        logging.getLogger(__name__).info(f'Finished {website_data[url_index][0]}')
+        on_url_complete(url_index)
+
+    while len(completed) < len(website_data):
+        try:
+            event, url_index, payload = event_queue.get(timeout=1)
+            if event == "extracted":
+                expected[url_index] = payload
+            else:
+                received[url_index] += 1
+            if url_index in expected and received[url_index] >= expected[url_index]:
+                complete(url_index)
+            continue
+        except Empty:
+            pass
+
+        if not detectors_stopped and not any(p.is_alive() for p in extractors):
+            # Every page is extracted, let the detection stage drain the queue and stop
+            for _ in range(detection_workers):
+                detection_queue.put(None)
+            detectors_stopped = True
+        if detectors_stopped and not any(p.is_alive() for p in detectors):
+            # A worker died before reporting: close the remaining URLs with what was collected
+            for url_index in range(len(website_data)):
+                if url_index not in completed:
+                    complete(url_index)
+
+    if not detectors_stopped:
+        for _ in range(detection_workers):
+            detection_queue.put(None)
+    for p in extractors + detectors:
+        p.join()
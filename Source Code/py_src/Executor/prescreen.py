@@ -0,0 +1,152 @@
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from multiprocessing import Pool
+import requests
+from ElementExtraction.extract_related_elements import change_on_request_from_model, event_handlers_from_model, \
+    find_headings, form_elements_from_model, form_input_elements_from_model, heading_with_siblings, \
+    input_elements_from_model, lang_attr_from_model, name_role_elements_from_index, page_title_from_model
+from ElementExtraction.static_page import static_accessibility_index, static_page_model
+from Executor.results import save_result, save_timing, write_atomically
+from Executor.scan_session import CHECKS, run_detection
+from metrics import get_metrics, use_thread_metrics
+
+# Extractors of the scan session whose evidence is read from the HTML alone, without a browser.
+# name: function of (static page model, URL of the page or None)
+STATIC_EXTRACTORS = {
+    "page_title": lambda model, url: page_title_from_model(model),
+    "lang_attr": lambda model, url: lang_attr_from_model(model),
+    "input_elements": lambda model, url: input_elements_from_model(model),
+    "form_elements": lambda model, url: form_elements_from_model(model),
+    "form_input_elements": lambda model, url: form_input_elements_from_model(model),
+    "headings_with_siblings": lambda model, url: [heading_with_siblings(model, heading)
+                                                  for heading in find_headings(model, model.elements)],
+    "event_handlers": lambda model, url: event_handlers_from_model(model),
+    "change_on_request": lambda model, url: change_on_request_from_model(model),
+    # Only names given by aria-labelledby are resolved without the browser's accessibility tree
+    "name_role_elements": lambda model, url: name_role_elements_from_index(static_accessibility_index(model), url),
+}
+
+# Criteria whose evidence all comes from static extractors, in CHECKS order
+STATIC_CRITERIA = [criterion for criterion, (names, _) in CHECKS.items()
+                   if all(name in STATIC_EXTRACTORS for name in names)]
+
+EVIDENCE_FILE_NAME = "Static Evidence.json"
+FETCH_TIMEOUT_SECONDS = 30
+
+
+def folder_name_for(source: str) -> str:
+    """ A folder name made of the host and path of a URL, or of the name of a file. """
+    name = os.path.splitext(os.path.basename(source))[0] if os.path.isfile(source) else source.split("://", 1)[-1]
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', name).strip('_')[:100]
+
+
+def read_url_list(path: str, output_folder: str, start_row: int = 0, end_row: int = None) -> list:
+    """
+    The (URL, output folder) tasks of the rows start_row to end_row, included, of a text file with one URL per
+    line, optionally followed by white space and its output folder. The folder is otherwise named after the
+    URL and its row, under output_folder. Blank lines and lines starting with # are not rows.
+    """
+    with open(path) as f:
+        rows = [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+    tasks = []
+    for row, line in enumerate(rows[start_row:None if end_row is None else end_row + 1], start_row):
+        parts = line.split(None, 1)
+        folder_name = parts[1] if len(parts) > 1 else os.path.join(output_folder, f"{row}_{folder_name_for(parts[0])}")
+        tasks.append((parts[0], folder_name))
+    return tasks
+
+
+def list_saved_pages(folder: str, output_folder: str, start_row: int = 0, end_row: int = None) -> list:
+    """
+    The (file, output folder) tasks of the HTML files of a folder, in name order, from the start_row-th to the
+    end_row-th, included. Each file gets a folder named after it under output_folder.
+    """
+    files = sorted(name for name in os.listdir(folder) if name.lower().endswith(('.html', '.htm')))
+    return [(os.path.join(folder, name), os.path.join(output_folder, folder_name_for(os.path.join(folder, name))))
+            for name in files[start_row:None if end_row is None else end_row + 1]]
+
+
+def read_page_source(source: str) -> tuple:
+    """
+    The HTML of a saved document or of a URL fetched without a browser, as bytes so that lxml detects their
+    encoding, and the URL relative links resolve against, or None for a saved document.
+    """
+    if os.path.isfile(source):
+        with open(source, 'rb') as f:
+            return f.read(), None
+    response = requests.get(source, timeout=FETCH_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    return response.content, response.url
+
+
+def extract_static_evidence(page_source, url: str = None, extractor_names=None) -> dict:
+    """
+    Run the static extractors on one HTML document, e.g. a saved page or driver.page_source, and return their
+    results by name in the format of the scan session. A failing extractor gives None, as in a session.
+    """
+    model = static_page_model(page_source)
+    extracted = {}
+    for name in extractor_names or STATIC_EXTRACTORS:
+        try:
+            extracted[name] = STATIC_EXTRACTORS[name](model, url)
+        except Exception as e:
+            print(f"Error running static extractor {name} for {url}: {e}")
+            extracted[name] = None
+    return extracted
+
+
+def prescreen_document(task) -> tuple:
+    """ Pool job: extract the static evidence of one (saved file or URL, output folder) task and save it. """
+    source, folder_name = task
+    try:
+        page_source, url = read_page_source(source)
+        extracted = extract_static_evidence(page_source, url)
+        os.makedirs(folder_name, exist_ok=True)
+        write_atomically(os.path.join(folder_name, EVIDENCE_FILE_NAME), json.dumps(extracted, indent=2))
+        return source, folder_name, extracted
+    except Exception as e:
+        print(f"Error prescreening {source}: {e}")
+        return source, folder_name, None
+
+
+def detect_static_criteria(extracted: dict, folder_name: str, criteria: list, thread_pool: ThreadPoolExecutor):
+    """
+    Submit the detectors of the criteria, each writing its result and timing to the folder, and return the
+    futures.
+    """
+    def detect(criterion):
+        use_thread_metrics()
+        result = run_detection(criterion, extracted)
+        if result is not None:
+            # Not a completed criterion for --resume: a browser scan has evidence the static page lacks
+            save_result(criterion, result, folder_name, record=False)
+        save_timing(folder_name, {criterion: get_metrics()})
+    return {thread_pool.submit(detect, criterion): (folder_name, criterion) for criterion in criteria}
+
+
+def prescreen_process(tasks: list, pool_size: int = None, detect: bool = False, criteria=None,
+                      detection_workers: int = 8):
+    """
+    Pre-screen a list of (saved HTML file or URL, output folder) tasks without a browser: a pool of processes
+    parses each document and writes the evidence of the static extractors to the folder.
+    With detect, the detectors of the static criteria among the given criteria (all of them by default) then
+    run on that evidence in threads, as the documents come out of the pool.
+    """
+    logger = logging.getLogger(__name__)
+    criteria = [criterion for criterion in (criteria or STATIC_CRITERIA) if criterion in STATIC_CRITERIA]
+    futures = {}
+    with Pool(processes=pool_size) as pool, ThreadPoolExecutor(max_workers=detection_workers) as thread_pool:
+        # Documents are small jobs, hand them out in chunks to keep the pool busy
+        for source, folder_name, extracted in pool.imap_unordered(prescreen_document, tasks, chunksize=16):
+            logger.info(f'Prescreened {source}')
+            if detect and extracted is not None:
+                futures.update(detect_static_criteria(extracted, folder_name, criteria, thread_pool))
+        for future in as_completed(futures):
+            folder_name, criterion = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Error detecting {criterion} for {folder_name}: {e}")
@@ -0,0 +1,95 @@
+import fcntl
+import json
+import logging
+import os
+import time
+from queue import Empty
+from Executor.manifest import record_completion
+
+
+def write_atomically(file_path: str, text: str):
+    """ Write a file through a temporary file, so readers never see a partially written result. """
+    temp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        f.write(text)
+    os.replace(temp_path, file_path)
+
+
+def save_result(key: str, result, folder_name: str, blocked_resources=(), record: bool = True):
+    """
+    Save the result of one criterion into the output folder as soon as it is known, and with record, note the
+    criterion as completed in the manifest of the folder, which --resume skips.
+    blocked_resources, the requests the resource policy blocked while the evidence was extracted, are saved
+    with the result under "blocked_resources".
+    Returns the path of the file written, or None if there was nothing to save.
+    """
+    # Create the folder if it doesn't exist
+    os.makedirs(folder_name, exist_ok=True)
+
+    try:
+        result = json.loads(result)
+        if not result:
+            if record:
+                record_completion(folder_name, key, None)
+            return None
+        if blocked_resources:
+            result = dict(result, blocked_resources=list(blocked_resources)) if isinstance(result, dict) \
+                else {"result": result, "blocked_resources": list(blocked_resources)}
+        file_path = os.path.join(folder_name, f"{key}.json")
+        # Save the result as a JSON file
+        write_atomically(file_path, json.dumps(result, indent=2))
+    except Exception as e:
+        print(f"Error saving the JSON file for {key}: {e}")
+        file_path = os.path.join(folder_name, f"{key}.txt")
+        write_atomically(file_path, str(result))
+    if record:
+        record_completion(folder_name, key, file_path)
+    return file_path
+
+
+def save_time_consumed(folder_name: str, start_time: float):
+    """ Save the time consumed since start_time into the output folder. """
+    os.makedirs(folder_name, exist_ok=True)
+    total_time_seconds = time.time() - start_time
+    time_file_path = os.path.join(folder_name, "Time Consumed.json")
+    write_atomically(time_file_path, json.dumps({"time_consumed_seconds": total_time_seconds}, indent=4))
+
+
+def save_timing(folder_name: str, timings: dict):
+    """
+    Add the timing records of the given criteria to Timing.json in the output folder. Checks of the same URL
+    may be saving theirs at the same time, so the file is read and written under a lock.
+    """
+    os.makedirs(folder_name, exist_ok=True)
+    file_path = os.path.join(folder_name, "Timing.json")
+    with open(os.path.join(folder_name, ".Timing.json.lock"), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        saved = {}
+        if os.path.exists(file_path):
+            with open(file_path) as f:
+                saved = json.load(f)
+        saved.update(timings)
+        write_atomically(file_path, json.dumps(saved, indent=2))
+
+
+def wait_for_checks(processes: list, notice_queue, on_complete=None) -> dict:
+    """
+    Wait for the check processes while logging the completion notices they send.
+    The results themselves are already on disk, so only (criterion, file path, timing) tuples cross the queue.
+    on_complete(criterion, file_path), if given, is called for every notice.
+    Returns the timing record of every criterion.
+    """
+    logger = logging.getLogger(__name__)
+    timings = {}
+    while any(p.is_alive() for p in processes) or not notice_queue.empty():
+        try:
+            criterion, file_path, timing = notice_queue.get(timeout=1)
+            logger.info(f'Saved {criterion} to {file_path}')
+            timings[criterion] = timing
+            if on_complete is not None:
+                on_complete(criterion, file_path)
+        except Empty:
+            pass
+    for p in processes:
+        p.join()
+    return timings
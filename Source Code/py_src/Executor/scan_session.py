@@ -0,0 +1,299 @@
+import os
+import uuid
+import ElementExtraction.extract_related_elements as extraction
+from ElementExtraction.extract_related_elements import *
+from A11yDetector.a11y_detector import *
+from ElementExtraction.virtual_time import set_virtual_time, virtual_time_enabled
+from A11yDetector.contrast import CONTRAST_LEVELS
+from Executor.driver_pool import IsolatedContext
+
+# Page loads of a scan session. Extractors that only read the page share the first load; extractors that
+# rewrite inline styles each load the page in an isolated context of the same browser, so they cannot leak
+# into the evidence of other criteria.
+SHARED_LOAD = 0
+ISOLATED_LOAD = 1
+
+# name: (extractor function, page load, names of the extractors it depends on)
+# The order of this dictionary is the order in which a session runs the extractors: the time-sensitive
+# observations come first, the aria-labelledby rewriting extractors come last within the shared load.
+EXTRACTORS = {
+    "meta_refresh": (extract_meta_refresh, SHARED_LOAD, ()),
+    "compare_screenshots": (lambda driver: take_screenshots_and_compare(driver, duration=20), SHARED_LOAD, ()),
+    "moving_and_updating": (capture_updating_moving_element, SHARED_LOAD, ()),
+    "audio_elements": (find_autoplay_audio_elements, SHARED_LOAD, ()),
+    "page_title": (extract_page_title, SHARED_LOAD, ()),
+    "lang_attr": (extract_lang_attr, SHARED_LOAD, ()),
+    "visual_elements": (extract_related_visual_elements, SHARED_LOAD, ()),
+    "img_urls": (extract_img_urls, SHARED_LOAD, ()),
+    "input_elements": (extract_input_elements, SHARED_LOAD, ()),
+    "form_elements": (extract_form_elements, SHARED_LOAD, ()),
+    "form_input_elements": (extract_form_input_elements, SHARED_LOAD, ()),
+    "headings_with_siblings": (extract_headings_with_siblings, SHARED_LOAD, ()),
+    "headings_under_sections": (extract_headings_under_sections, SHARED_LOAD, ()),
+    "info_relation_elements": (extract_info_relation_elements, SHARED_LOAD, ()),
+    "linearized_tables": (extract_and_linearize_tables, SHARED_LOAD, ()),
+    "specific_role_elements": (extract_specific_role_elements, SHARED_LOAD, ()),
+    "sensory_elements": (extract_sensory_elements, SHARED_LOAD, ()),
+    "event_handlers": (extract_event_handlers, SHARED_LOAD, ()),
+    "change_on_request": (extract_change_on_request_element, SHARED_LOAD, ()),
+    "non_text_contrast": (extract_non_text_contrast, SHARED_LOAD, ()),
+    "text_colors": (extract_text_colors, SHARED_LOAD, ()),
+    "location": (extract_location_related_information, SHARED_LOAD, ()),
+    "multiple_ways": (extract_multiple_ways, SHARED_LOAD, ()),
+    "original_screenshot": (extract_original_screenshot, SHARED_LOAD, ()),
+    # Read the temp folder at call time, pool workers point the extraction module at a folder of their own
+    "initial_screenshots": (lambda driver: find_related_screenshots(driver, extraction.TEMP_FILE_FOLDER),
+                            SHARED_LOAD, ("original_screenshot",)),
+    "text_resizing": (extract_text_resizing, SHARED_LOAD, ("original_screenshot",)),
+    "text_reflow": (extract_text_reflow, SHARED_LOAD, ("original_screenshot",)),
+    "text_blocks": (extract_text_blocks_with_details, SHARED_LOAD, ("text_resizing",)),
+    "orientation": (check_orientation_and_transform, SHARED_LOAD, ()),
+    "link_form_screenshots": (extract_link_form_screenshot, SHARED_LOAD, ()),
+    "target_size": (extract_target_size, SHARED_LOAD, ()),
+    "links": (extract_links, SHARED_LOAD, ()),
+    "label_in_name": (extract_label_in_name, SHARED_LOAD, ()),
+    "name_role_elements": (extract_name_role_elements, SHARED_LOAD, ()),
+    "text_spacing_screenshots": (extract_text_spacing_screenshots, ISOLATED_LOAD, ()),
+}
+
+# Extractors that watch the page move or play. With stabilization, the page is frozen once they have run.
+MOTION_EXTRACTORS = {"compare_screenshots", "moving_and_updating", "audio_elements"}
+
+# Extractors that wait on the page clock. A page keeps its virtual clock to the end, so in virtual time mode they
+# each get an isolated context rather than leave the shared load fast-forwarding the timers of later extractors.
+CLOCK_EXTRACTORS = {"compare_screenshots", "moving_and_updating"}
+
+# Extractors that only read the DOM. In eager mode they run before the page has finished loading.
+DOM_EXTRACTORS = {
+    "meta_refresh", "page_title", "lang_attr", "input_elements", "form_elements", "headings_with_siblings",
+    "headings_under_sections", "info_relation_elements", "linearized_tables", "specific_role_elements",
+    "sensory_elements", "event_handlers", "change_on_request",
+}
+
+# criterion: (names of the extractors it needs, detector called with their results in that order)
+CHECKS = {
+    "1.1.1": (("visual_elements",), detect_non_text_content_aggregated_violation),
+    "1.3.1": (("info_relation_elements", "original_screenshot"), aggregate_info_relation_violation_responses),
+    "1.3.2": (("linearized_tables",), lambda tables: detect_meaningful_sequence_violation(*tables)),
+    "1.3.3": (("sensory_elements",), detect_sensory_characteristics_violation),
+    "1.3.4": (("orientation",), detect_orientation_violation),
+    "1.3.5": (("input_elements",), detect_input_without_purpose),
+    "1.4.1": (("link_form_screenshots",), detect_use_of_color_violation),
+    "1.4.2": (("audio_elements",), detect_no_audio_control),
+    "1.4.3": (("text_colors",), detect_color_contrast_violation_aa),
+    "1.4.4": (("text_resizing",), detect_text_resizing_violation),
+    "1.4.51.4.9": (("img_urls",), lambda urls: detect_misuse_images_of_text(urls, judged_criteria("1.4.51.4.9"))),
+    "1.4.6": (("text_colors",), detect_color_contrast_violation_aaa),
+    "1.4.8": (("text_blocks",), detect_visual_presentation_violation),
+    "1.4.10": (("text_reflow",), detect_reflow_violation),
+    "1.4.11": (("non_text_contrast",),
+               lambda focusable: detect_non_text_contrast_violation(focusable['focusable_elements'])),
+    "1.4.12": (("text_spacing_screenshots",), detect_text_spacing_violation),
+    "2.2.1": (("meta_refresh", "compare_screenshots"),
+              lambda meta, screenshots: detect_timing_adjustable_violation([meta, screenshots])),
+    "2.2.2": (("moving_and_updating",), detect_moving_updating_element_violation),
+    "2.4.1": (("specific_role_elements",), detect_bypass_blocks_violation),
+    "2.4.2": (("page_title",), detect_title_violation),
+    "2.4.4": (("links",), detect_link_purpose_violation_a),
+    "2.4.5": (("multiple_ways",), detect_multiple_ways_violation),
+    "2.4.6": (("form_input_elements", "headings_with_siblings"), detect_heading_label_description_violation),
+    "2.4.8": (("location",), detect_location_violation),
+    "2.4.9": (("links",), detect_link_purpose_violation_aaa),
+    "2.4.10": (("headings_under_sections", "original_screenshot", "initial_screenshots"),
+               lambda sections, screenshots, initial: detect_section_heading_violation(sections,
+                                                                                       screenshots or initial)),
+    "2.5.3": (("label_in_name",), detect_label_in_name_violation),
+    "2.5.5": (("target_size",), detect_target_size_enhanced_violation),
+    "2.5.8": (("target_size",), detect_target_size_minimum_violation),
+    "3.1.1": (("page_title", "lang_attr"),
+              lambda title, lang: detect_lang_violation(title, lang, judged_criteria("3.1.1"))),
+    "3.1.4": (("initial_screenshots",), detect_abbreviations_violation),
+    "3.2.2": (("event_handlers",), lambda handlers: detect_on_input_violation(*handlers)),
+    "3.2.5": (("change_on_request",), lambda events: detect_change_on_request_violation(*events)),
+    "3.3.1": (("initial_screenshots",), detect_error_identified_violation),
+    "3.3.2": (("form_elements",), detect_missing_label_instruction),
+    "3.3.3": (("initial_screenshots",), detect_error_suggestion_violation),
+    "4.1.2": (("name_role_elements", "form_input_elements"), detect_name_role_value_violation),
+}
+
+# WCAG 2.2 conformance level of each criterion
+CRITERION_LEVELS = {
+    "1.1.1": "A", "1.3.1": "A", "1.3.2": "A", "1.3.3": "A", "1.3.4": "AA", "1.3.5": "AA",
+    "1.4.1": "A", "1.4.2": "A", "1.4.3": "AA", "1.4.4": "AA", "1.4.5": "AA", "1.4.6": "AAA",
+    "1.4.8": "AAA", "1.4.9": "AAA", "1.4.10": "AA", "1.4.11": "AA", "1.4.12": "AA", "2.2.1": "A", "2.2.2": "A",
+    "2.4.1": "A", "2.4.2": "A", "2.4.4": "A", "2.4.5": "AA", "2.4.6": "AA", "2.4.8": "AAA",
+    "2.4.9": "AAA", "2.4.10": "AAA", "2.5.3": "A", "2.5.5": "AAA", "2.5.8": "AA", "3.1.1": "A", "3.1.2": "AA",
+    "3.1.4": "AAA", "3.2.2": "A", "3.2.5": "AAA", "3.3.1": "A", "3.3.2": "A", "3.3.3": "AA", "4.1.2": "A",
+}
+LEVELS = ("A", "AA", "AAA")
+# CHECKS keys whose detector judges several criteria at once
+CHECK_CRITERIA = {"1.4.51.4.9": ("1.4.5", "1.4.9"), "3.1.1": ("3.1.1", "3.1.2")}
+# Criteria each of those detectors judges in this run, narrowed by select_criteria before the check processes start
+_judged_criteria = dict(CHECK_CRITERIA)
+
+
+def judged_criteria(key: str) -> tuple:
+    """ Return the criteria the detector of a CHECKS key judges in this run. """
+    return _judged_criteria.get(key, (key,))
+
+
+def required_extractors(criteria) -> list:
+    """ Resolve the extractors needed by the given criteria, including dependencies, in session order. """
+    needed = set()
+    pending = [name for criterion in criteria for name in CHECKS[criterion][0]]
+    while pending:
+        name = pending.pop()
+        if name not in needed:
+            needed.add(name)
+            pending.extend(EXTRACTORS[name][2])
+    return [name for name in EXTRACTORS if name in needed]
+
+
+def select_criteria(criteria=None, level: str = None) -> list:
+    """
+    Return the CHECKS keys of the given criteria, or of all criteria, that are required to conform at the given
+    level (A, AA or AAA), in CHECKS order. Levels are those of the criteria themselves: the detectors judging
+    several criteria are narrowed to the selected ones, so that no verdict above the level is reported. Raises
+    ValueError for an unknown criterion or level, or for a criterion above the level.
+    """
+    if level is not None and level not in LEVELS:
+        raise ValueError(f"Unknown conformance level {level}, expected one of {', '.join(LEVELS)}")
+    if criteria is None:
+        selected = set(CRITERION_LEVELS)
+    else:
+        # A CHECKS key named instead of its criteria stands for all of them
+        selected = {criterion for name in criteria
+                    for criterion in (CHECK_CRITERIA.get(name, (name,)) if name not in CRITERION_LEVELS else (name,))}
+        unknown = selected - set(CRITERION_LEVELS)
+        if unknown:
+            raise ValueError(f"Unknown criteria: {', '.join(sorted(unknown))}")
+    if level is not None:
+        above = {criterion for criterion in selected
+                 if LEVELS.index(CRITERION_LEVELS[criterion]) > LEVELS.index(level)}
+        if criteria is not None and above:
+            raise ValueError(f"Criteria above level {level}: {', '.join(sorted(above))}")
+        selected -= above
+    for key, key_criteria in CHECK_CRITERIA.items():
+        _judged_criteria[key] = tuple(criterion for criterion in key_criteria if criterion in selected)
+    return [key for key in CHECKS if any(criterion in selected for criterion in judged_criteria(key))]
+
+
+def reset_view(driver: webdriver.Chrome):
+    """ Undo the scrolling, zoom, emulation and window resizing an extractor may have left behind. """
+    clear_emulation(driver)
+    driver.maximize_window()
+    set_browser_scale(100, driver)
+    driver.execute_script("window.scrollTo(0, 0);")
+
+
+def extractor_load(name: str) -> int:
+    """ The page load an extractor runs on. """
+    if name in CLOCK_EXTRACTORS and virtual_time_enabled():
+        return ISOLATED_LOAD
+    return EXTRACTORS[name][1]
+
+
+def run_extractor(driver: webdriver.Chrome, url: str, name: str, extracted: dict):
+    """ Run one extractor into extracted, storing None if it fails, and reset the view it leaves behind. """
+    try:
+        extracted[name] = EXTRACTORS[name][0](driver)
+    except Exception as e:
+        print(f"Error running extractor {name} for {url}: {e}")
+        extracted[name] = None
+    try:
+        reset_view(driver)
+    except Exception as e:
+        print(f"Error resetting the view after {name}: {e}")
+
+
+def run_isolated_extractor(driver: webdriver.Chrome, url: str, name: str, extracted: dict):
+    """
+    Run one extractor on a load of the URL in an isolated context, or, if the browser cannot open one, on a
+    reload of the current tab. A clock extractor then runs on the current tab in real time instead, so that the
+    tab does not keep a virtual clock.
+    """
+    try:
+        context = IsolatedContext(driver)
+    except Exception as e:
+        if name in CLOCK_EXTRACTORS:
+            print(f"Error opening an isolated context for {name}, waiting in real time instead: {e}")
+            set_virtual_time(False)
+            try:
+                run_extractor(driver, url, name, extracted)
+            finally:
+                set_virtual_time(True)
+            return
+        print(f"Error opening an isolated context for {name}, reloading the page instead: {e}")
+        driver.get(url)
+        wait_for_load(driver)
+        stabilize_rendering(driver)
+        run_extractor(driver, url, name, extracted)
+        return
+    try:
+        context.load(url)
+        # The extractors that watch the page move need it running
+        if name not in MOTION_EXTRACTORS:
+            stabilize_rendering(driver)
+        run_extractor(driver, url, name, extracted)
+    except Exception as e:
+        print(f"Error loading {url} for extractor {name}: {e}")
+        extracted[name] = None
+    finally:
+        context.close()
+
+
+def run_scan_session(driver: webdriver.Chrome, url: str, extractor_names, eager: bool = False) -> dict:
+    """
+    Run the extractors against one browser that has already loaded the URL.
+    The extractors of the shared load run in the current tab; each of the others gets an isolated context, as do
+    the clock extractors in virtual time mode.
+    With stabilization enabled, the page is frozen as soon as the extractors that watch it move are done.
+    With eager, the browser has only waited for the DOM: the DOM extractors run first, then the session waits
+    for the page to be fully ready before the others.
+    """
+    extracted = {}
+    if eager:
+        for name in extractor_names:
+            if name in DOM_EXTRACTORS:
+                run_extractor(driver, url, name, extracted)
+        wait_for_load(driver)
+        extractor_names = [name for name in extractor_names if name not in DOM_EXTRACTORS]
+
+    motion_pending = MOTION_EXTRACTORS.intersection(extractor_names)
+    if not motion_pending:
+        stabilize_rendering(driver)
+    for name in extractor_names:
+        if extractor_load(name) == SHARED_LOAD:
+            run_extractor(driver, url, name, extracted)
+        else:
+            run_isolated_extractor(driver, url, name, extracted)
+        if name in motion_pending:
+            motion_pending.remove(name)
+            if not motion_pending:
+                stabilize_rendering(driver)
+    return extracted
+
+
+def share_contrast_estimate(extracted: dict, criteria):
+    """
+    When the session detects both 1.4.3 and 1.4.6, point their evidence at a file of its own in the temp folder
+    of this worker, through which the two detectors share one model estimate of the text over background images.
+    The file is kept in a subfolder, which clearing the temp folder for the next URL leaves to the detectors.
+    """
+    text_colors = extracted.get("text_colors")
+    if not text_colors or not text_colors["background_image_elements"] or \
+            not set(CONTRAST_LEVELS.values()) <= set(criteria):
+        return
+    folder = os.path.join(extraction.TEMP_FILE_FOLDER, "contrast")
+    os.makedirs(folder, exist_ok=True)
+    text_colors["estimate_file"] = os.path.join(folder, f"contrast_{uuid.uuid4().hex}.json")
+
+
+def run_detection(criterion: str, extracted: dict):
+    """ Run the detector of a criterion on the session results, or return None if its evidence is missing. """
+    extractor_names, detector = CHECKS[criterion]
+    inputs = [extracted.get(name) for name in extractor_names]
+    if any(value is None for value in inputs):
+        print(f"Skipping {criterion}: missing extracted data.")
+        return None
+    return detector(*inputs)
@@ -0,0 +1,118 @@
+import os
+import signal
+import time
+from collections import Counter, defaultdict
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection, wait
+from A11yDetector.rate_limiter import ConcurrencySlots, set_llm_slots
+
+# Rough wall-clock seconds of each check, used to start the longest checks of a URL first
+CHECK_DURATION_ESTIMATES = {
+    "combined_1.3.1": 300,
+    "combined_1.4.3": 180,
+    "2.5.5": 120,
+    "2.5.8": 120,
+    "1.4.1": 120,
+    "2.2.2": 90,
+    "2.2.1": 60,
+    "combined_4.1.2": 60,
+    "1.4.12": 45,
+    "1.3.4": 30,
+    "1.4.2": 30,
+    "1.3.3": 30,
+}
+DEFAULT_DURATION_ESTIMATE = 20
+# Seconds a terminated job and its browser get to exit before they are killed
+TERMINATE_GRACE_SECONDS = 10
+
+
+def estimate_duration(key: str) -> float:
+    return CHECK_DURATION_ESTIMATES.get(key, DEFAULT_DURATION_ESTIMATE)
+
+
+def stop_job(p: Process):
+    """
+    Terminate a job together with the chromedriver and browser processes it started, which share its process
+    group: SIGTERM first, then SIGKILL for whatever of the group is left after the grace period.
+    """
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(p.pid, sig)
+        except ProcessLookupError:
+            # Every process of the group has exited
+            break
+        p.join(TERMINATE_GRACE_SECONDS)
+    p.join()
+
+
+def run_job(job_id: int, target, args, connection: Connection):
+    """
+    Run a scheduled job in its own process and send back the results it returns, through a pipe of its own
+    so that terminating the job cannot leave a lock or half a message behind for the other jobs. The job leads a
+    process group of its own, which its chromedriver and browser join, so a timed out job is stopped with them.
+    """
+    os.setsid()
+    try:
+        connection.send(target(*args))
+    except Exception as e:
+        print(f"Error running scheduled job {job_id}: {e}")
+    finally:
+        connection.close()
+
+
+def run_scheduled(jobs: list, on_url_complete, browser_slots: int = 8, llm_slots: int = 8,
+                  check_timeout: float = 900):
+    """
+    Run (url_index, key, target, args) jobs with at most browser_slots jobs at a time.
+
+    Jobs are started URL by URL, longest estimated check first, so the slow checks of a URL run alongside its
+    short ones and a slot freed at the end of a URL is taken by a check of the next URL instead of idling.
+    A job running longer than check_timeout is terminated. Each target returns a dictionary, merged with those
+    of the other jobs of its URL; once every job of a URL is over, on_url_complete(url_index, results, timed_out)
+    is called with the merged dictionary and the key: message of the jobs that timed out.
+    """
+    slots = ConcurrencySlots(llm_slots)
+    set_llm_slots(slots)
+
+    pending = sorted(enumerate(jobs), key=lambda item: (item[1][0], -estimate_duration(item[1][1])))
+    jobs_left = Counter(job[0] for job in jobs)
+    results = defaultdict(dict)
+    timed_out = defaultdict(dict)
+    running = {}
+
+    def finish(job_id: int):
+        p, connection, _ = running.pop(job_id)
+        p.join()
+        connection.close()
+        url_index = jobs[job_id][0]
+        jobs_left[url_index] -= 1
+        if jobs_left[url_index] == 0:
+            on_url_complete(url_index, results.pop(url_index, {}), timed_out.pop(url_index, {}))
+
+    while pending or running:
+        while pending and len(running) < browser_slots:
+            job_id, (url_index, key, target, args) = pending.pop(0)
+            reader, writer = Pipe(duplex=False)
+            p = Process(target=run_job, args=(job_id, target, args, writer))
+            p.start()
+            # The job holds the only writing end, so the pipe reads as closed once the job is over
+            writer.close()
+            running[job_id] = (p, reader, time.time() + check_timeout)
+
+        wait([connection for _, connection, _ in running.values()], timeout=0.5)
+
+        for job_id, (p, connection, deadline) in list(running.items()):
+            if connection.poll():
+                try:
+                    results[jobs[job_id][0]].update(connection.recv())
+                except EOFError:
+                    # The job ended without results
+                    pass
+                finish(job_id)
+            elif time.time() > deadline:
+                key = jobs[job_id][1]
+                print(f"Check {key} timed out after {check_timeout} seconds, terminating it.")
+                stop_job(p)
+                slots.reclaim(p.pid)
+                timed_out[jobs[job_id][0]][key] = f"Timed out after {check_timeout} seconds"
+                finish(job_id)
@@ -0,0 +1,106 @@
+import sqlite3
+import time
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+class WorkQueue:
+    """
+    A job queue kept in an SQLite file. A coordinator enqueues (URL, output folder, check key) jobs and any
+    number of workers lease them. A worker must renew its lease with heartbeat() while it works; a job whose
+    lease expires, because its worker died or hung, is handed to the next worker that asks for one.
+
+    SQLite is enough for the workers of one machine, or of machines sharing a network file system with working
+    POSIX locks, e.g. NFS with lockd. The queue keeps the rollback journal, which only needs those locks: WAL
+    shares its index through memory and would corrupt a file opened from several hosts. Open one WorkQueue per
+    process.
+    """
+
+    def __init__(self, db_path: str, max_attempts: int = 3):
+        self.max_attempts = max_attempts
+        self._connection = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+        # Also turns a queue file left in WAL mode back to the rollback journal
+        self._connection.execute("PRAGMA journal_mode=DELETE")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL,
+                folder_name TEXT NOT NULL,
+                check_key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                UNIQUE (url, folder_name, check_key)
+            )""")
+
+    def enqueue(self, jobs: list) -> int:
+        """ Add (url, folder_name, check_key) jobs, ignoring the ones already queued. Returns the number added. """
+        with self._connection:
+            cursor = self._connection.executemany(
+                "INSERT OR IGNORE INTO jobs (url, folder_name, check_key, status) VALUES (?, ?, ?, ?)",
+                [(url, folder_name, key, PENDING) for url, folder_name, key in jobs])
+        return cursor.rowcount
+
+    def lease(self, worker: str, lease_seconds: float):
+        """
+        Take the oldest job that is pending or whose lease has expired.
+        Returns (job_id, url, folder_name, check_key), or None if no job is available right now.
+        """
+        now = time.time()
+        self._connection.execute("BEGIN IMMEDIATE")
+        try:
+            # A job whose last lease expired after its final attempt will not be retried
+            self._connection.execute(
+                "UPDATE jobs SET status = ?, error = 'Lease expired' "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, LEASED, now, self.max_attempts))
+            row = self._connection.execute(
+                "SELECT id, url, folder_name, check_key FROM jobs "
+                "WHERE status = ? OR (status = ? AND lease_expires < ?) ORDER BY id LIMIT 1",
+                (PENDING, LEASED, now)).fetchone()
+            if row is not None:
+                self._connection.execute(
+                    "UPDATE jobs SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                    "WHERE id = ?",
+                    (LEASED, worker, now + lease_seconds, row[0]))
+            self._connection.execute("COMMIT")
+        except Exception:
+            self._connection.execute("ROLLBACK")
+            raise
+        return row
+
+    def heartbeat(self, job_id: int, worker: str, lease_seconds: float) -> bool:
+        """ Extend the lease of a job. Returns False if the worker no longer holds it. """
+        with self._connection:
+            cursor = self._connection.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND status = ?",
+                (time.time() + lease_seconds, job_id, worker, LEASED))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker: str):
+        with self._connection:
+            self._connection.execute("UPDATE jobs SET status = ? WHERE id = ? AND worker = ? AND status = ?",
+                                     (DONE, job_id, worker, LEASED))
+
+    def fail(self, job_id: int, worker: str, error: str):
+        """ Give a job back for another attempt, or mark it failed once it has used all of its attempts. """
+        with self._connection:
+            self._connection.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, error = ?, lease_expires = NULL "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (self.max_attempts, FAILED, PENDING, error, job_id, worker, LEASED))
+
+    def counts(self) -> dict:
+        """ Return the number of jobs in each status. """
+        rows = self._connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def is_finished(self) -> bool:
+        """ Whether every job is done or failed for good. """
+        counts = self.counts()
+        return counts.get(PENDING, 0) == 0 and counts.get(LEASED, 0) == 0
@@ -1,6 +1,12 @@
 import os
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 TEMP_FILE_FOLDER = os.path.join(BASE_DIR, "TEMP_IMAGES")
+# Recorded page loads, replayed by the later browser sessions of the same URL
+ARCHIVE_FOLDER = os.path.join(BASE_DIR, "ARCHIVES")
+# Default rate limits of the model account, overridden by OPENAI_REQUESTS_PER_MINUTE and
+# OPENAI_TOKENS_PER_MINUTE in A11yDetector/.env
+REQUESTS_PER_MINUTE = 500
+TOKENS_PER_MINUTE = 450000
 JSON_FORMAT = {
     "type": "json_schema",
     "json_schema": {
@@ -45,6 +51,46 @@ JSON_FORMAT = {
     }
 }
 
+# Contrast estimates of numbered text elements over background images, judged against each level by the caller
+CONTRAST_JSON_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "contrast_estimate_report",
+        "description": "Estimated contrast ratio of text over its background image",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "elements": {
+                    "type": "array",
+                    "description": "One entry per text element",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "index": {
+                                "type": "integer",
+                                "description": "Number of the element as given"
+                            },
+                            "estimated_contrast_ratio": {
+                                "type": "number",
+                                "description": "Lowest contrast ratio between the text and the background behind it"
+                            },
+                            "reason": {
+                                "type": "string",
+                                "description": "Where and why the contrast is lowest"
+                            }
+                        },
+                        "required": ["index", "estimated_contrast_ratio", "reason"],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": ["elements"],
+            "additionalProperties": False
+        }
+    }
+}
+
 ABLATION_JSON_FORMAT = {
     "type": "json_schema",
     "json_schema": {
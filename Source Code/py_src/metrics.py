@@ -0,0 +1,112 @@
+import functools
+import threading
+import time
+
+# Timing of the work done by the current process. Each check runs in a process of its own, so this is the
+# record of one check; reset_metrics() starts a new one. A thread given a record of its own with
+# use_thread_metrics(), e.g. a detector running in a thread of a pool worker, records into it instead.
+_lock = threading.Lock()
+_metrics = {}
+_thread = threading.local()
+
+
+def new_record() -> dict:
+    return {
+        "prepare_driver_seconds": 0.0,
+        "wait_for_load_seconds": 0.0,
+        "extractor_seconds": {},
+        "screenshots": 0,
+        "llm_chunks": 0,
+        "llm_requests": [],
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "blocked_resources": [],
+    }
+
+
+def _record() -> dict:
+    return getattr(_thread, "metrics", _metrics)
+
+
+def reset_metrics():
+    """ Start a new record, for the current thread if it has a record of its own, else for the process. """
+    global _metrics
+    with _lock:
+        if hasattr(_thread, "metrics"):
+            _thread.metrics = new_record()
+        else:
+            _metrics = new_record()
+
+
+reset_metrics()
+
+
+def use_thread_metrics():
+    """ Give the current thread a new record of its own, so that its timing does not mix with other threads'. """
+    with _lock:
+        _thread.metrics = new_record()
+
+
+def get_metrics() -> dict:
+    with _lock:
+        record = _record()
+        metrics = dict(record)
+        metrics["extractor_seconds"] = dict(record["extractor_seconds"])
+        metrics["llm_requests"] = list(record["llm_requests"])
+        metrics["blocked_resources"] = list(record["blocked_resources"])
+    return metrics
+
+
+def add_time(phase: str, seconds: float):
+    """ Add to the time of a phase: prepare_driver or wait_for_load. """
+    with _lock:
+        _record()[f"{phase}_seconds"] += seconds
+
+
+def add_extractor_time(name: str, seconds: float):
+    with _lock:
+        extractor_seconds = _record()["extractor_seconds"]
+        extractor_seconds[name] = extractor_seconds.get(name, 0.0) + seconds
+
+
+def count_screenshot():
+    with _lock:
+        _record()["screenshots"] += 1
+
+
+def count_llm_chunks(chunks: int):
+    with _lock:
+        _record()["llm_chunks"] += chunks
+
+
+def record_llm_request(latency: float, usage):
+    """ Record the latency of a model request and the tokens of its completion.usage. """
+    prompt_tokens = usage.prompt_tokens if usage is not None else 0
+    completion_tokens = usage.completion_tokens if usage is not None else 0
+    with _lock:
+        record = _record()
+        record["llm_requests"].append({"latency_seconds": latency,
+                                       "prompt_tokens": prompt_tokens,
+                                       "completion_tokens": completion_tokens})
+        record["prompt_tokens"] += prompt_tokens
+        record["completion_tokens"] += completion_tokens
+
+
+def record_blocked_resource(url: str, resource_type: str, reason: str):
+    """ Record a request the resource policy blocked, once per URL. """
+    with _lock:
+        blocked_resources = _record()["blocked_resources"]
+        if all(blocked["url"] != url for blocked in blocked_resources):
+            blocked_resources.append({"url": url, "type": resource_type, "reason": reason})
+
+
+def timed_extractor(func):
+    """ Decorator adding the time spent in an extractor to the record, under the name of the extractor. """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start_time = time.time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            add_extractor_time(func.__name__, time.time() - start_time)
+    return wrapper